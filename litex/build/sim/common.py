@@ -206,6 +206,47 @@ class SimDDRInput:
     def lower(dr):
         return SimDDRInputImpl(dr.i, dr.o1, dr.o2, dr.clk)
 
+# Memory -------------------------------------------------------------------------------------------
+
+class SimMemory:
+    # Memory with runtime preloading: at startup, the memory is loaded with the images registered
+    # for it (SimConfig.add_mem_init), see litex/build/sim/core/mem.c. Only used by the simulations
+    # with images to preload (see SimVerilatorToolchain.build).
+    @staticmethod
+    def emit_verilog(memory, ns, add_data_file):
+        r = Memory.emit_verilog(memory, ns, add_data_file)
+        def gn(e):
+            return ns.get_name(e)
+        name    = gn(memory)
+        nchunks = (memory.width + 31)//32
+        preload = Signal(name_override=name + "_preload")
+        read    = Signal(name_override=name + "_read")
+        block   = Signal(name_override=name + "_preload_block")
+        handle  = Signal(name_override="handle")
+        index   = Signal(name_override="index")
+        word    = Signal(name_override="word")
+        r += "import \"DPI-C\" litex_sim_mem_preload = function int " + gn(preload) + \
+            "(input string mem, input int width, input int depth);\n"
+        r += "import \"DPI-C\" litex_sim_mem_read = function int " + gn(read) + \
+            "(input int handle, input int index, input int chunk);\n"
+        # Executed after the $readmemh initialization (initial blocks are executed in order).
+        r += "initial begin : " + gn(block) + "\n"
+        r += "\tinteger " + gn(handle) + ";\n"
+        r += "\tinteger " + gn(index) + ";\n"
+        r += "\treg [" + str(32*nchunks - 1) + ":0] " + gn(word) + ";\n"
+        r += "\t" + gn(handle) + " = " + gn(preload) + "(\"" + name + "\", " + \
+            str(memory.width) + ", " + str(memory.depth) + ");\n"
+        r += "\tif (" + gn(handle) + " != 0)\n"
+        r += "\t\tfor (" + gn(index) + " = 0; " + gn(index) + " < " + str(memory.depth) + "; " + \
+            gn(index) + " = " + gn(index) + " + 1) begin\n"
+        for chunk in range(nchunks):
+            r += "\t\t\t" + gn(word) + "[" + str(32*chunk + 31) + ":" + str(32*chunk) + "] = " + \
+                gn(read) + "(" + gn(handle) + ", " + gn(index) + ", " + str(chunk) + ");\n"
+        r += "\t\t\t" + name + "[" + gn(index) + "] = " + gn(word) + "[" + str(memory.width - 1) + ":0];\n"
+        r += "\t\tend\n"
+        r += "end\n\n"
+        return r
+
 # Special Overrides --------------------------------------------------------------------------------
 
 sim_special_overrides = {
@@ -5,12 +5,14 @@
 # Copyright (c) 2018 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
 import json
 import math
 
 class SimConfig():
     def __init__(self, default_clk=None, default_clk_freq=int(1e6)):
-        self.modules = []
+        self.modules   = []
+        self.mem_inits = []
         if default_clk is not None:
             self.add_clocker(default_clk, default_clk_freq)
 
@@ -48,16 +50,88 @@ class SimConfig():
             newmod.update({"tickfirst": tickfirst})
         self.modules.append(newmod)
 
+    def add_mem_init(self, memory, filename_or_regions, endianness="big"):
+        """Load memory with binary image(s) at simulation startup
+
+        memory is a Memory of the design (or its Verilog name), filename_or_regions a binary file,
+        a JSON file or a dict of regions ({filename: base}) as for get_mem_data. The images are
+        only read when the simulation starts: they can be changed without rebuilding it.
+        """
+        if isinstance(filename_or_regions, dict):
+            regions = filename_or_regions
+        else:
+            filename = filename_or_regions
+            if os.path.splitext(filename)[1] == ".json":
+                with open(filename, "r") as f:
+                    regions = json.load(f)
+            else:
+                regions = {filename: "0x00000000"}
+        assert endianness in ["big", "little"]
+        for filename, base in regions.items():
+            if not os.path.isfile(filename):
+                raise OSError(f"Unable to find {filename} memory content file.")
+            self.mem_inits.append({
+                "mem"        : memory,
+                "file"       : os.path.abspath(filename),
+                "base"       : int(base, 16) if isinstance(base, str) else base,
+                "endianness" : endianness,
+            })
+
+    def add_checkpoint(self, save=None, restore=None, cycles=None, pattern=None, signal=False, exit=False):
+        """Save the simulation state to a checkpoint and/or restore it at startup
+
+        The checkpoint is saved after a number of sys_clk cycles, when the serial output matches
+        pattern or when the sim_checkpoint signal is set (signal, see SimPlatform.add_checkpoint),
+        exit stops the simulation once saved. Restoring requires the same simulation, built with
+        checkpoints support (savable).
+        """
+        triggers = cycles is not None or pattern is not None or signal
+        if save is None and restore is None:
+            raise ValueError("No checkpoint to save or restore.")
+        if save is not None and not triggers:
+            raise ValueError("No checkpoint trigger (cycles, pattern or signal).")
+        if save is None and (triggers or exit):
+            raise ValueError("Checkpoint triggers require a checkpoint to save.")
+        args = {}
+        interfaces = []
+        if save is not None:
+            args.update({"save": os.path.abspath(save), "exit": exit})
+        if cycles is not None:
+            args["cycles"] = int(cycles)
+        if pattern is not None:
+            args["pattern"] = pattern
+            interfaces.append("serial")
+        if signal:
+            interfaces.append("sim_checkpoint")
+        if restore is not None:
+            if not os.path.isfile(restore):
+                raise OSError(f"Unable to find {restore} checkpoint.")
+            args["restore"] = os.path.abspath(restore)
+        self.add_module("checkpoint", interfaces, args=args)
+
+    def _format_mem_inits(self, ns):
+        images = []
+        for mem_init in self.mem_inits:
+            memory = mem_init["mem"]
+            if not isinstance(memory, str):
+                assert ns is not None, "Memory names can only be resolved with the design namespace."
+                memory = ns.get_name(memory)
+            images.append(dict(mem_init, mem=memory))
+        return {"module": "meminit", "interface": [], "args": {"images": images}}
+
     def has_module(self, name):
         for module in self.modules:
             if module["module"] == name:
                 return True
         return False
 
-    def get_json(self):
+    def get_json(self, ns=None):
         assert "clocker" in (m["module"] for m in self.modules), \
             "No simulation clocker found! Use sim_config.add_clocker() to define one or more clockers."
-        config = self.modules + [self._format_timebase()]
+        config = list(self.modules)
+        if self.mem_inits:
+            config.append(self._format_mem_inits(ns))
+        config += [self._format_timebase()]
         return json.dumps(config, indent=4)
 
 def _calculate_timebase_ps(clockers):
@@ -0,0 +1,12 @@
+#ifndef __CHECKPOINT_H_
+#define __CHECKPOINT_H_
+
+/* Checkpoints: the simulation state (time, sessions states and Verilated model, built with
+ * --savable) is saved to a file at the end of a simulation step, and restored before the first
+ * one. Requested by the checkpoint module. */
+
+int litex_sim_checkpoint_save_request(char *filename, int exit);
+int litex_sim_checkpoint_restore_request(char *filename);
+int litex_sim_checkpoint_restored(void);
+
+#endif
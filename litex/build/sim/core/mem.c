@@ -0,0 +1,179 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "error.h"
+#include "mem.h"
+
+struct mem_image_s {
+  char *mem;
+  char *filename;
+  uint64_t base;
+  int big_endian;
+  int claimed;
+  struct mem_image_s *next;
+};
+
+struct mem_preload_s {
+  uint32_t *data; /* Words split in 32-bit chunks, LSB first. */
+  int nchunks;
+  int depth;
+};
+
+static struct mem_image_s *imagelist=NULL;
+static struct mem_preload_s *preloads=NULL;
+static int npreloads=0;
+
+int litex_sim_mem_add(char *mem, char *filename, uint64_t base, int big_endian)
+{
+  int ret = RC_OK;
+  struct mem_image_s *image=NULL;
+  struct mem_image_s **last;
+
+  if(!mem || !filename)
+  {
+    ret = RC_INVARG;
+    eprintf("Invalid argument\n");
+    goto out;
+  }
+
+  image = (struct mem_image_s *)malloc(sizeof(struct mem_image_s));
+  if(NULL == image)
+  {
+    ret = RC_NOENMEM;
+    eprintf("Not enough mem\n");
+    goto out;
+  }
+  memset(image, 0, sizeof(struct mem_image_s));
+  image->mem = strdup(mem);
+  image->filename = strdup(filename);
+  image->base = base;
+  image->big_endian = big_endian;
+
+  /* Keep the registration order: overlapping images are loaded in this order. */
+  for(last = &imagelist; *last; last = &(*last)->next);
+  *last = image;
+
+out:
+  return ret;
+}
+
+int litex_sim_mem_unclaimed(void)
+{
+  struct mem_image_s *image;
+  int n = 0;
+
+  for(image = imagelist; image; image = image->next)
+  {
+    if(!image->claimed)
+    {
+      fprintf(stderr, "[mem] %s: no memory named %s\n", image->filename, image->mem);
+      n++;
+    }
+  }
+  return n;
+}
+
+static void litex_sim_mem_load_image(struct mem_image_s *image, struct mem_preload_s *p, int word_bytes)
+{
+  FILE *f;
+  unsigned char *bytes;
+  uint64_t size = (uint64_t)word_bytes*p->depth;
+  uint64_t i, k, chunk;
+  long length;
+
+  f = fopen(image->filename, "rb");
+  if(NULL == f)
+  {
+    eprintf("Can't open %s\n", image->filename);
+    exit(EXIT_FAILURE);
+  }
+  fseek(f, 0, SEEK_END);
+  length = ftell(f);
+  fseek(f, 0, SEEK_SET);
+  if(image->base + length > size)
+  {
+    eprintf("%s does not fit in %s (0x%lx bytes at 0x%lx, memory size 0x%lx)\n",
+      image->filename, image->mem, length, (unsigned long)image->base, (unsigned long)size);
+    exit(EXIT_FAILURE);
+  }
+  bytes = (unsigned char *)malloc(length + 1);
+  if(NULL == bytes)
+  {
+    eprintf("Not enough mem\n");
+    exit(EXIT_FAILURE);
+  }
+  if(fread(bytes, 1, length, f) != length)
+  {
+    eprintf("Can't read %s\n", image->filename);
+    exit(EXIT_FAILURE);
+  }
+  fclose(f);
+
+  /* Words are stored in word_bytes bytes with the endianness of the image. */
+  for(i = 0; i < length; i++)
+  {
+    k = (image->base + i) % word_bytes;
+    if(image->big_endian)
+      k = word_bytes - 1 - k;
+    chunk = ((image->base + i)/word_bytes)*p->nchunks + k/4;
+    p->data[chunk] &= ~((uint32_t)0xff << (8*(k%4)));
+    p->data[chunk] |= (uint32_t)bytes[i] << (8*(k%4));
+  }
+  free(bytes);
+
+  image->claimed = 1;
+  printf("[mem] %s: loaded %s (0x%lx bytes at 0x%lx)\n",
+    image->mem, image->filename, length, (unsigned long)image->base);
+}
+
+/* DPI functions ------------------------------------------------------------------------------- */
+
+/* Returns a handle to the preloaded words of the memory (0 when there is no image for it). */
+int litex_sim_mem_preload(const char *mem, int width, int depth)
+{
+  struct mem_image_s *image;
+  struct mem_preload_s *p=NULL;
+
+  for(image = imagelist; image; image = image->next)
+  {
+    if(strcmp(image->mem, mem))
+      continue;
+    if(!p)
+    {
+      preloads = (struct mem_preload_s *)realloc(preloads, (npreloads + 1)*sizeof(struct mem_preload_s));
+      if(NULL == preloads)
+      {
+        eprintf("Not enough mem\n");
+        exit(EXIT_FAILURE);
+      }
+      p = &preloads[npreloads++];
+      p->nchunks = (width + 31)/32;
+      p->depth = depth;
+      p->data = (uint32_t *)calloc((size_t)p->nchunks*depth, sizeof(uint32_t));
+      if(NULL == p->data)
+      {
+        eprintf("Not enough mem\n");
+        exit(EXIT_FAILURE);
+      }
+    }
+    litex_sim_mem_load_image(image, p, (width + 7)/8);
+  }
+
+  return p ? npreloads : 0;
+}
+
+/* Returns 32-bit chunk of a preloaded word; memories are read in order so the words are freed
+ * once the last chunk is read. */
+int litex_sim_mem_read(int handle, int index, int chunk)
+{
+  struct mem_preload_s *p = &preloads[handle - 1];
+  uint32_t r;
+
+  r = p->data[(uint64_t)index*p->nchunks + chunk];
+  if((index == p->depth - 1) && (chunk == p->nchunks - 1))
+  {
+    free(p->data);
+    p->data = NULL;
+  }
+  return (int)r;
+}
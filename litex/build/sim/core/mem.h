@@ -0,0 +1,21 @@
+#ifndef __MEM_H_
+#define __MEM_H_
+
+#include <stdint.h>
+
+/* Memories preloading: images registered (by the meminit module) before the first evaluation are
+ * loaded in the memories of the same Verilog name by the DPI functions called from their initial
+ * blocks (see SimMemory in litex/build/sim/common.py). */
+
+int litex_sim_mem_add(char *mem, char *filename, uint64_t base, int big_endian);
+int litex_sim_mem_unclaimed(void);
+
+#ifdef __cplusplus
+extern "C" int litex_sim_mem_preload(const char *mem, int width, int depth);
+extern "C" int litex_sim_mem_read(int handle, int index, int chunk);
+#else
+int litex_sim_mem_preload(const char *mem, int width, int depth);
+int litex_sim_mem_read(int handle, int index, int chunk);
+#endif
+
+#endif
@@ -28,6 +28,14 @@ struct ext_module_s {
   int (*add_pads)(void *, struct pad_list_s *);
   int (*close)(void*);
   int (*tick)(void*, uint64_t);
+  /* Optional: next time (> time_ps) the module needs a tick. The simulation only steps to the
+   * times requested by the modules (clock edges), modules without next_tick are ticked at every
+   * timebase step. */
+  uint64_t (*next_tick)(void*, uint64_t);
+  /* Optional: session state save/restore for checkpoints (see checkpoint.h), with the given
+   * write/read functions. */
+  int (*save)(void*, void (*)(const void *, size_t));
+  int (*restore)(void*, void (*)(void *, size_t));
 };
 
 struct ext_module_list_s {
@@ -43,6 +51,11 @@ int litex_sim_file_parse(char *filename, struct module_s **mod, uint64_t *timeba
 int litex_sim_load_ext_modules(struct ext_module_list_s **mlist);
 int litex_sim_find_ext_module(struct ext_module_list_s *first, char *name , struct ext_module_list_s **found);
 
+/* next_tick of the modules only acting on the signals (ticked at the times requested by others). */
+static inline uint64_t litex_sim_no_next_tick(void *sess, uint64_t time_ps) {
+  return UINT64_MAX;
+}
+
 static inline bool clk_pos_edge(struct clk_edge_t *edge, int new_clk) {
   bool is_edge = edge->last_clk == 0 && new_clk == 1;
   edge->last_clk = new_clk;
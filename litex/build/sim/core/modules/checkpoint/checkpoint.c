@@ -0,0 +1,213 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <json-c/json.h>
+#include "error.h"
+#include "modules.h"
+#include "checkpoint.h"
+
+/*
+ * Simulation checkpoints: saves the simulation state when a trigger occurs, and/or restores it at
+ * startup (see checkpoint.h).
+ *
+ * Arguments (generated by SimConfig.add_checkpoint):
+ *   "save"    : checkpoint filename to save to.
+ *   "exit"    : stop the simulation once saved.
+ *   "cycles"  : trigger after this number of sys_clk cycles.
+ *   "pattern" : trigger when the serial output ("serial" interface) matches this string.
+ *   "restore" : checkpoint filename to restore at startup.
+ * The "sim_checkpoint" interface (signal) triggers when set.
+ */
+
+struct session_s {
+  char *sys_clk;
+  char *tx;
+  char *tx_valid;
+  char *trigger;
+  struct clk_edge_t edge;
+  char *save;
+  int exit;
+  uint64_t cycles;
+  uint64_t cycle;
+  char *pattern;
+  char *window;
+  size_t window_len;
+  int done;
+};
+
+static int checkpoint_start();
+static int checkpoint_new(void **sess, char *args);
+static int checkpoint_add_pads(void *sess, struct pad_list_s *plist);
+static int checkpoint_close(void *sess);
+static int checkpoint_tick(void *sess, uint64_t time_ps);
+
+static struct ext_module_s ext_mod = {
+  "checkpoint",
+  checkpoint_start,
+  checkpoint_new,
+  checkpoint_add_pads,
+  checkpoint_close,
+  checkpoint_tick,
+  litex_sim_no_next_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
+
+static int checkpoint_start()
+{
+  printf("[checkpoint] loaded\n");
+  return RC_OK;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static int checkpoint_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s=NULL;
+  json_object *jsobj=NULL;
+  json_object *obj=NULL;
+
+  if(!sess || !args) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+
+  jsobj = json_tokener_parse(args);
+  if(!jsobj) {
+    fprintf(stderr, "[checkpoint] Invalid args: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(json_object_object_get_ex(jsobj, "save", &obj))
+    s->save = strdup(json_object_get_string(obj));
+  if(json_object_object_get_ex(jsobj, "exit", &obj))
+    s->exit = json_object_get_boolean(obj);
+  if(json_object_object_get_ex(jsobj, "cycles", &obj))
+    s->cycles = json_object_get_int64(obj);
+  if(json_object_object_get_ex(jsobj, "pattern", &obj) && strlen(json_object_get_string(obj))) {
+    s->pattern = strdup(json_object_get_string(obj));
+    s->window = (char*) calloc(strlen(s->pattern) + 1, 1);
+  }
+  if(json_object_object_get_ex(jsobj, "restore", &obj))
+    ret = litex_sim_checkpoint_restore_request((char*)json_object_get_string(obj));
+
+out:
+  if(jsobj)
+    json_object_put(jsobj);
+  *sess = (void*) s;
+  return ret;
+}
+
+static int checkpoint_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+
+  if(!strcmp(plist->name, "serial")) {
+    litex_sim_module_pads_get(pads, "source_data", (void**) &s->tx);
+    litex_sim_module_pads_get(pads, "source_valid", (void**) &s->tx_valid);
+  }
+
+  if(!strcmp(plist->name, "sim_checkpoint"))
+    litex_sim_module_pads_get(pads, "sim_checkpoint", (void**) &s->trigger);
+
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static int checkpoint_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  free(s->save);
+  free(s->pattern);
+  free(s->window);
+  free(s);
+  return RC_OK;
+}
+
+/* Serial output matching: the last characters are kept in a window of the pattern length. */
+static int checkpoint_match(struct session_s *s, char c)
+{
+  size_t len = strlen(s->pattern);
+
+  if(s->window_len == len) {
+    memmove(s->window, s->window + 1, len - 1);
+    s->window_len--;
+  }
+  s->window[s->window_len++] = c;
+  return (s->window_len == len) && !memcmp(s->window, s->pattern, len);
+}
+
+static int checkpoint_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  int trigger = 0;
+
+  if(s->done || !s->save || !s->sys_clk)
+    return RC_OK;
+
+  if(!clk_pos_edge(&s->edge, *s->sys_clk))
+    return RC_OK;
+
+  s->cycle++;
+  if(s->cycles && (s->cycle >= s->cycles))
+    trigger = 1;
+  if(s->trigger && *s->trigger)
+    trigger = 1;
+  if(s->pattern && s->tx && s->tx_valid && *s->tx_valid)
+    trigger |= checkpoint_match(s, *s->tx);
+
+  if(trigger) {
+    s->done = 1;
+    return litex_sim_checkpoint_save_request(s->save, s->exit);
+  }
+
+  return RC_OK;
+}
@@ -139,16 +139,25 @@ out:
   return ret;
 }
 
-static int clocker_tick(void *sess, uint64_t time_ps)
+// phase-shifted time relative to start of current period
+static uint64_t clocker_rel_time_ps(struct session_s *s, uint64_t time_ps, uint64_t *period_ps)
 {
   static const uint64_t ps_in_sec = 1000000000000ull;
-  struct session_s *s = (struct session_s*) sess;
 
-  uint64_t period_ps = ps_in_sec / s->freq_hz;
-  uint64_t phase_shift_ps = period_ps * s->phase_deg / 360;
+  uint64_t phase_shift_ps;
+
+  *period_ps = ps_in_sec / s->freq_hz;
+  phase_shift_ps = *period_ps * s->phase_deg / 360;
+
+  return (time_ps + *period_ps - phase_shift_ps) % *period_ps;
+}
+
+static int clocker_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  uint64_t period_ps;
 
-  // phase-shifted time relative to start of current period
-  uint64_t rel_time_ps = (time_ps - phase_shift_ps) % period_ps;
+  uint64_t rel_time_ps = clocker_rel_time_ps(s, time_ps, &period_ps);
   if (rel_time_ps < (period_ps/2)) {
     *s->clk = 1;
   } else {
@@ -158,13 +167,55 @@ static int clocker_tick(void *sess, uint64_t time_ps)
   return 0;
 }
 
+static uint64_t clocker_next_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  uint64_t period_ps;
+
+  // next clock edge
+  uint64_t rel_time_ps = clocker_rel_time_ps(s, time_ps, &period_ps);
+  if (rel_time_ps < (period_ps/2)) {
+    return time_ps + period_ps/2 - rel_time_ps;
+  } else {
+    return time_ps + period_ps - rel_time_ps;
+  }
+}
+
+// clocks are computed from the simulation time, only check that they are unchanged on restore
+static int clocker_save(void *sess, void (*write)(const void *, size_t))
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  write(&s->freq_hz, sizeof(s->freq_hz));
+  write(&s->phase_deg, sizeof(s->phase_deg));
+  return RC_OK;
+}
+
+static int clocker_restore(void *sess, void (*read)(void *, size_t))
+{
+  struct session_s *s = (struct session_s*) sess;
+  uint32_t freq_hz;
+  uint16_t phase_deg;
+
+  read(&freq_hz, sizeof(freq_hz));
+  read(&phase_deg, sizeof(phase_deg));
+  if (freq_hz != s->freq_hz || phase_deg != s->phase_deg) {
+    fprintf(stderr, "[clocker] %s: checkpoint with freq_hz=%u, phase_deg=%u\n", s->name, freq_hz, phase_deg);
+    return RC_ERROR;
+  }
+  return RC_OK;
+}
+
 static struct ext_module_s ext_mod = {
   "clocker",
   clocker_start,
   clocker_new,
   clocker_add_pads,
   NULL,
-  clocker_tick
+  clocker_tick,
+  clocker_next_tick,
+  clocker_save,
+  clocker_restore
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
@@ -65,6 +65,7 @@ struct session_s {
   struct event *ev;
   pcap_t *pcap;
   pcap_dumper_t *pcap_dumper;
+  struct clk_edge_t edge;
 };
 
 static struct event_base *base=NULL;
@@ -407,12 +408,11 @@ out:
 
 static int ethernet_tick(void *sess, uint64_t time_ps)
 {
-  static struct clk_edge_t edge;
   char c;
   struct session_s *s = (struct session_s*)sess;
   struct eth_packet_s *pep;
 
-  if(!clk_pos_edge(&edge, *s->sys_clk)) {
+  if(!clk_pos_edge(&s->edge, *s->sys_clk)) {
     return RC_OK;
   }
 
@@ -466,13 +466,42 @@ static int ethernet_close(void *sess)
   return ret;
 }
 
+static int ethernet_save(void *sess, void (*write)(const void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  write(&s->edge, sizeof(s->edge));
+  write(&s->databuf, sizeof(s->databuf));
+  write(&s->datalen, sizeof(s->datalen));
+  write(&s->inbuf, sizeof(s->inbuf));
+  write(&s->inlen, sizeof(s->inlen));
+  write(&s->insent, sizeof(s->insent));
+  return RC_OK;
+}
+
+static int ethernet_restore(void *sess, void (*read)(void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  read(&s->edge, sizeof(s->edge));
+  read(&s->databuf, sizeof(s->databuf));
+  read(&s->datalen, sizeof(s->datalen));
+  read(&s->inbuf, sizeof(s->inbuf));
+  read(&s->inlen, sizeof(s->inlen));
+  read(&s->insent, sizeof(s->insent));
+  return RC_OK;
+}
+
 static struct ext_module_s ext_mod = {
   "ethernet",
   ethernet_start,
   ethernet_new,
   ethernet_add_pads,
   ethernet_close,
-  ethernet_tick
+  ethernet_tick,
+  litex_sim_no_next_tick,
+  ethernet_save,
+  ethernet_restore
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
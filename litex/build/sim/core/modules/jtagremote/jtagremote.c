@@ -254,7 +254,8 @@ static struct ext_module_s ext_mod = {
   jtagremote_new,
   jtagremote_add_pads,
   NULL,
-  jtagremote_tick
+  jtagremote_tick,
+  litex_sim_no_next_tick
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
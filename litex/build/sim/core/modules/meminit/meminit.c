@@ -0,0 +1,137 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <json-c/json.h>
+#include "error.h"
+#include "modules.h"
+#include "mem.h"
+#include "checkpoint.h"
+
+/*
+ * Memories preloading: binary images are loaded in the simulated memories at startup (instead of
+ * being part of the generated Verilog), images can be changed without rebuilding the simulation.
+ *
+ * Arguments (generated by SimConfig.add_mem_init):
+ *   {"images": [{"mem": <Verilog memory name>, "file": <filename>, "base": <byte offset>,
+ *                "endianness": "big"/"little"}, ...]}
+ */
+
+struct session_s {
+  int checked;
+};
+
+static int meminit_start();
+static int meminit_new(void **sess, char *args);
+static int meminit_add_pads(void *sess, struct pad_list_s *plist);
+static int meminit_close(void *sess);
+static int meminit_tick(void *sess, uint64_t time_ps);
+
+static struct ext_module_s ext_mod = {
+  "meminit",
+  meminit_start,
+  meminit_new,
+  meminit_add_pads,
+  meminit_close,
+  meminit_tick,
+  litex_sim_no_next_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
+
+static int meminit_start()
+{
+  printf("[meminit] loaded\n");
+  return RC_OK;
+}
+
+static int meminit_add_image(json_object *image)
+{
+  json_object *mem, *file, *base, *endianness;
+
+  if(!json_object_object_get_ex(image, "mem", &mem) ||
+     !json_object_object_get_ex(image, "file", &file) ||
+     !json_object_object_get_ex(image, "base", &base) ||
+     !json_object_object_get_ex(image, "endianness", &endianness))
+  {
+    fprintf(stderr, "[meminit] Invalid image: %s\n", json_object_to_json_string(image));
+    return RC_JSMISSINGKEY;
+  }
+
+  return litex_sim_mem_add(
+    (char *)json_object_get_string(mem),
+    (char *)json_object_get_string(file),
+    (uint64_t)json_object_get_int64(base),
+    !strcmp(json_object_get_string(endianness), "big"));
+}
+
+static int meminit_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s=NULL;
+  json_object *jsobj=NULL;
+  json_object *images=NULL;
+  int i;
+
+  if(!sess || !args) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+
+  jsobj = json_tokener_parse(args);
+  if(!jsobj || !json_object_object_get_ex(jsobj, "images", &images) ||
+     !json_object_is_type(images, json_type_array)) {
+    fprintf(stderr, "[meminit] Invalid args: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+
+  for(i = 0; i < json_object_array_length(images); i++) {
+    ret = meminit_add_image(json_object_array_get_idx(images, i));
+    if(RC_OK != ret)
+      goto out;
+  }
+
+out:
+  if(jsobj)
+    json_object_put(jsobj);
+  *sess = (void*) s;
+  return ret;
+}
+
+static int meminit_add_pads(void *sess, struct pad_list_s *plist)
+{
+  return RC_OK;
+}
+
+static int meminit_close(void *sess)
+{
+  free(sess);
+  return RC_OK;
+}
+
+static int meminit_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  /* Memories are preloaded by the first evaluation, report the images that were not loaded (the
+   * memories of a restored checkpoint have their saved contents instead). */
+  if(!s->checked) {
+    if(!litex_sim_checkpoint_restored())
+      litex_sim_mem_unclaimed();
+    s->checked = 1;
+  }
+
+  return RC_OK;
+}
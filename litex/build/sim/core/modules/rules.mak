@@ -5,6 +5,8 @@ ifeq ($(UNAME_S),Darwin)
     CFLAGS += -I/usr/local/include -I/opt/brew/include -I/opt/homebrew/include
     LDFLAGS += -L/usr/local/lib -L/opt/brew/lib -L/opt/homebrew/lib -ljson-c -ggdb
     CFLAGS += -Wall -O3 -ggdb -fPIC -Werror
+    # Functions provided by the simulation binary (mem.h, checkpoint.h).
+    LDFLAGS += -undefined dynamic_lookup
 else
     CFLAGS += -Wall -O3 -ggdb -fPIC -Werror
 endif
@@ -22,6 +22,7 @@ struct session_s {
   char databuf[2048];
   int data_start;
   int datalen;
+  struct clk_edge_t edge;
 };
 
 struct event_base *base;
@@ -141,10 +142,9 @@ out:
 }
 
 static int serial2console_tick(void *sess, uint64_t time_ps) {
-  static struct clk_edge_t edge;
   struct session_s *s = (struct session_s*)sess;
 
-  if(!clk_pos_edge(&edge, *s->sys_clk)) {
+  if(!clk_pos_edge(&s->edge, *s->sys_clk)) {
     return RC_OK;
   }
 
@@ -165,13 +165,38 @@ static int serial2console_tick(void *sess, uint64_t time_ps) {
   return RC_OK;
 }
 
+static int serial2console_save(void *sess, void (*write)(const void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  write(&s->edge, sizeof(s->edge));
+  write(&s->databuf, sizeof(s->databuf));
+  write(&s->data_start, sizeof(s->data_start));
+  write(&s->datalen, sizeof(s->datalen));
+  return RC_OK;
+}
+
+static int serial2console_restore(void *sess, void (*read)(void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  read(&s->edge, sizeof(s->edge));
+  read(&s->databuf, sizeof(s->databuf));
+  read(&s->data_start, sizeof(s->data_start));
+  read(&s->datalen, sizeof(s->datalen));
+  return RC_OK;
+}
+
 static struct ext_module_s ext_mod = {
   "serial2console",
   serial2console_start,
   serial2console_new,
   serial2console_add_pads,
   NULL,
-  serial2console_tick
+  serial2console_tick,
+  litex_sim_no_next_tick,
+  serial2console_save,
+  serial2console_restore
 };
 
 int litex_sim_ext_module_init(int (*register_module) (struct ext_module_s *))
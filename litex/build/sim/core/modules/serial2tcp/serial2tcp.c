@@ -24,6 +24,7 @@ struct session_s {
   int data_start;
   int datalen;
   int fd;
+  struct clk_edge_t edge;
 };
 
 struct event_base *base;
@@ -251,12 +252,11 @@ out:
 }
 static int serial2tcp_tick(void *sess, uint64_t time_ps)
 {
-  static struct clk_edge_t edge;
   char c;
   int ret = RC_OK;
 
   struct session_s *s = (struct session_s*)sess;
-  if(!clk_pos_edge(&edge, *s->sys_clk)) {
+  if(!clk_pos_edge(&s->edge, *s->sys_clk)) {
     return RC_OK;
   }
 
@@ -285,13 +285,38 @@ out:
   return ret;
 }
 
+static int serial2tcp_save(void *sess, void (*write)(const void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  write(&s->edge, sizeof(s->edge));
+  write(&s->databuf, sizeof(s->databuf));
+  write(&s->data_start, sizeof(s->data_start));
+  write(&s->datalen, sizeof(s->datalen));
+  return RC_OK;
+}
+
+static int serial2tcp_restore(void *sess, void (*read)(void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  read(&s->edge, sizeof(s->edge));
+  read(&s->databuf, sizeof(s->databuf));
+  read(&s->data_start, sizeof(s->data_start));
+  read(&s->datalen, sizeof(s->datalen));
+  return RC_OK;
+}
+
 static struct ext_module_s ext_mod = {
   "serial2tcp",
   serial2tcp_start,
   serial2tcp_new,
   serial2tcp_add_pads,
   NULL,
-  serial2tcp_tick
+  serial2tcp_tick,
+  litex_sim_no_next_tick,
+  serial2tcp_save,
+  serial2tcp_restore
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
@@ -38,6 +38,7 @@ struct session_s {
   char inbuf[2000];
   int inlen;
   int insent;
+  struct clk_edge_t edge;
 };
 
 struct event_base *base;
@@ -261,14 +262,13 @@ out:
 }
 static int serial2udp_tick(void *sess, uint64_t time_ps)
 {
-  static struct clk_edge_t edge;
   char c;
   int ret = RC_OK;
   ssize_t sent_sz = -1;
   struct udp_packet_s *pup;
 
   struct session_s *s = (struct session_s*)sess;
-  if(!clk_pos_edge(&edge, *s->sys_clk)) {
+  if(!clk_pos_edge(&s->edge, *s->sys_clk)) {
     return RC_OK;
   }
 
@@ -326,13 +326,42 @@ static int serial2udp_tick(void *sess, uint64_t time_ps)
   return ret;
 }
 
+static int serial2udp_save(void *sess, void (*write)(const void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  write(&s->edge, sizeof(s->edge));
+  write(&s->databuf, sizeof(s->databuf));
+  write(&s->datalen, sizeof(s->datalen));
+  write(&s->inbuf, sizeof(s->inbuf));
+  write(&s->inlen, sizeof(s->inlen));
+  write(&s->insent, sizeof(s->insent));
+  return RC_OK;
+}
+
+static int serial2udp_restore(void *sess, void (*read)(void *, size_t))
+{
+  struct session_s *s = (struct session_s*)sess;
+
+  read(&s->edge, sizeof(s->edge));
+  read(&s->databuf, sizeof(s->databuf));
+  read(&s->datalen, sizeof(s->datalen));
+  read(&s->inbuf, sizeof(s->inbuf));
+  read(&s->inlen, sizeof(s->inlen));
+  read(&s->insent, sizeof(s->insent));
+  return RC_OK;
+}
+
 static struct ext_module_s ext_mod = {
   "serial2udp",
   serial2udp_start,
   serial2udp_new,
   serial2udp_add_pads,
   NULL,
-  serial2udp_tick
+  serial2udp_tick,
+  litex_sim_no_next_tick,
+  serial2udp_save,
+  serial2udp_restore
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
@@ -81,7 +81,8 @@ static struct ext_module_s ext_mod = {
   spdeeprom_new,
   spdeeprom_add_pads,
   NULL,
-  spdeeprom_tick
+  spdeeprom_tick,
+  litex_sim_no_next_tick
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
@@ -379,7 +379,8 @@ static struct ext_module_s ext_mod = {
   xgmii_ethernet_new,
   xgmii_ethernet_add_pads,
   NULL,
-  xgmii_ethernet_tick
+  xgmii_ethernet_tick,
+  litex_sim_no_next_tick
 };
 
 int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
@@ -17,6 +17,7 @@
 #include "modules.h"
 #include "pads.h"
 #include "veril.h"
+#include "checkpoint.h"
 
 #include <event2/listener.h>
 #include <event2/util.h>
@@ -171,8 +172,161 @@ int litex_sim_sort_session()
   return RC_OK;
 }
 
+/* Checkpoints --------------------------------------------------------------------------------- */
+
+#define CHECKPOINT_MAGIC 0x4c58434b /* LXCK */
+
+static char *checkpoint_save=NULL;
+static int checkpoint_exit=0;
+static char *checkpoint_restore=NULL;
+static int checkpoint_restored=0;
+
+int litex_sim_checkpoint_save_request(char *filename, int exit)
+{
+  free(checkpoint_save);
+  checkpoint_save = strdup(filename);
+  checkpoint_exit = exit;
+  return RC_OK;
+}
+
+int litex_sim_checkpoint_restore_request(char *filename)
+{
+  free(checkpoint_restore);
+  checkpoint_restore = strdup(filename);
+  return RC_OK;
+}
+
+int litex_sim_checkpoint_restored(void)
+{
+  return checkpoint_restored;
+}
+
+static int litex_sim_checkpoint_save(void *vsim, char *filename)
+{
+  struct session_list_s *s;
+  uint32_t magic = CHECKPOINT_MAGIC;
+  uint32_t len;
+  int ret = RC_OK;
+
+  if(litex_sim_checkpoint_open(filename, 1))
+  {
+    eprintf("Can't create checkpoint %s\n", filename);
+    return RC_ERROR;
+  }
+  litex_sim_checkpoint_write(&magic, sizeof(magic));
+  litex_sim_checkpoint_write(&sim_time_ps, sizeof(sim_time_ps));
+  for(s = sesslist; s; s=s->next)
+  {
+    len = strlen(s->module->name);
+    litex_sim_checkpoint_write(&len, sizeof(len));
+    litex_sim_checkpoint_write(s->module->name, len);
+    if(s->module->save)
+    {
+      ret = s->module->save(s->session, litex_sim_checkpoint_write);
+      if(RC_OK != ret)
+        break;
+    }
+  }
+  litex_sim_checkpoint_model(vsim);
+  litex_sim_checkpoint_close();
+  if(RC_OK == ret)
+    fprintf(stderr, "checkpoint saved to %s (%lu ps)\n", filename, (unsigned long)sim_time_ps);
+  return ret;
+}
+
+static int litex_sim_checkpoint_load(void *vsim, char *filename)
+{
+  struct session_list_s *s;
+  uint32_t magic = 0;
+  uint32_t len;
+  char name[256];
+  int ret = RC_OK;
+
+  if(litex_sim_checkpoint_open(filename, 0))
+  {
+    eprintf("Can't open checkpoint %s\n", filename);
+    return RC_ERROR;
+  }
+  litex_sim_checkpoint_read(&magic, sizeof(magic));
+  if(magic != CHECKPOINT_MAGIC)
+  {
+    eprintf("%s is not a checkpoint\n", filename);
+    ret = RC_ERROR;
+    goto out;
+  }
+  litex_sim_checkpoint_read(&sim_time_ps, sizeof(sim_time_ps));
+  /* Sessions are restored in order, from a simulation with the same modules. */
+  for(s = sesslist; s; s=s->next)
+  {
+    litex_sim_checkpoint_read(&len, sizeof(len));
+    if(len >= sizeof(name))
+      len = sizeof(name) - 1;
+    litex_sim_checkpoint_read(name, len);
+    name[len] = 0;
+    if(strcmp(name, s->module->name))
+    {
+      eprintf("Checkpoint %s has module %s instead of %s\n", filename, name, s->module->name);
+      ret = RC_ERROR;
+      goto out;
+    }
+    if(s->module->restore)
+    {
+      ret = s->module->restore(s->session, litex_sim_checkpoint_read);
+      if(RC_OK != ret)
+        goto out;
+    }
+  }
+  litex_sim_checkpoint_model(vsim);
+  checkpoint_restored = 1;
+  fprintf(stderr, "checkpoint restored from %s (%lu ps)\n", filename, (unsigned long)sim_time_ps);
+out:
+  litex_sim_checkpoint_close();
+  return ret;
+}
+
+/* Main loop ----------------------------------------------------------------------------------- */
+
 struct event *ev;
 
+/* Steps are batched between event loop iterations (I/O): batches are sized to run for about
+ * BATCH_SLICE_US and restart from BATCH_MIN steps when the event loop had I/O to process (time
+ * spent out of the simulation between batches). */
+#define BATCH_MIN       16
+#define BATCH_MAX       (1 << 20)
+#define BATCH_SLICE_US  1000
+#define BATCH_IO_GAP_US 50
+
+static int batch = BATCH_MIN;
+static uint64_t batch_end_us = 0;
+
+static uint64_t litex_sim_wall_time_us(void)
+{
+  struct timeval tv;
+  evutil_gettimeofday(&tv, NULL);
+  return (uint64_t)tv.tv_sec*1000000 + tv.tv_usec;
+}
+
+/* Next simulation time: the earliest tick requested by the modules (e.g. the next clock edge),
+ * the timebase step when a module needs to be ticked at every step. */
+static uint64_t litex_sim_next_time(uint64_t time_ps)
+{
+  struct session_list_s *s;
+  uint64_t next = UINT64_MAX;
+  uint64_t t;
+
+  for(s = sesslist; s; s=s->next)
+  {
+    if(!s->module->next_tick)
+      return time_ps + timebase_ps;
+    t = s->module->next_tick(s->session, time_ps);
+    if(t < next)
+      next = t;
+  }
+  if(next <= time_ps || next == UINT64_MAX)
+    return time_ps + timebase_ps;
+  return next;
+}
+
 static void cb(int sock, short which, void *arg)
 {
   struct session_list_s *s;
@@ -181,8 +335,13 @@ static void cb(int sock, short which, void *arg)
   tv.tv_sec = 0;
   tv.tv_usec = 0;
   int i;
+  uint64_t start_us, end_us;
+
+  start_us = litex_sim_wall_time_us();
+  if(batch_end_us && (start_us - batch_end_us > BATCH_IO_GAP_US))
+    batch = BATCH_MIN;
 
-  for(i = 0; i < 1000; i++)
+  for(i = 0; i < batch; i++)
   {
     for(s = sesslist; s; s=s->next)
     {
@@ -199,7 +358,18 @@ static void cb(int sock, short which, void *arg)
         s->module->tick(s->session, sim_time_ps);
     }
 
-    sim_time_ps += timebase_ps;
+    sim_time_ps = litex_sim_next_time(sim_time_ps);
+
+    if (checkpoint_save) {
+        litex_sim_checkpoint_save(vsim, checkpoint_save);
+        free(checkpoint_save);
+        checkpoint_save = NULL;
+        if (checkpoint_exit) {
+            fprintf(stderr, "got sim finish after checkpoint\n");
+            event_base_loopbreak(base);
+            break;
+        }
+    }
 
     if (litex_sim_got_finish()) {
         fprintf(stderr, "got sim finish event\n");
@@ -214,6 +384,13 @@ static void cb(int sock, short which, void *arg)
     }
   }
 
+  end_us = litex_sim_wall_time_us();
+  if((end_us - start_us > BATCH_SLICE_US) && (batch > BATCH_MIN))
+    batch /= 2;
+  else if((end_us - start_us < BATCH_SLICE_US/2) && (batch < BATCH_MAX))
+    batch *= 2;
+  batch_end_us = end_us;
+
   if (!evtimer_pending(ev, NULL)) {
     event_del(ev);
     evtimer_add(ev, &tv);
@@ -265,6 +442,11 @@ int main(int argc, char *argv[])
     goto out;
   }
 
+  if(checkpoint_restore && (RC_OK != (ret = litex_sim_checkpoint_load(vsim, checkpoint_restore))))
+  {
+    goto out;
+  }
+
   tv.tv_sec = 0;
   tv.tv_usec = 0;
   ev = event_new(base, -1, EV_PERSIST, cb, vsim);
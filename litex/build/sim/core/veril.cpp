@@ -7,6 +7,9 @@
 #include <stdint.h>
 #include "Vsim.h"
 #include "verilated.h"
+#ifdef SAVABLE
+#include "verilated_save.h"
+#endif
 #ifdef TRACE_FST
 #include "verilated_fst_c.h"
 #else
@@ -39,6 +42,69 @@ extern "C" void litex_sim_eval(void *vsim, uint64_t time_ps)
   main_time = time_ps;
 }
 
+#ifdef SAVABLE
+static VerilatedSave *g_save = nullptr;
+static VerilatedRestore *g_restore = nullptr;
+#endif
+
+extern "C" int litex_sim_checkpoint_open(const char *filename, int save)
+{
+#ifdef SAVABLE
+  if(save) {
+    g_save = new VerilatedSave;
+    g_save->open(filename);
+    return g_save->isOpen() ? 0 : -1;
+  }
+  g_restore = new VerilatedRestore;
+  g_restore->open(filename);
+  return g_restore->isOpen() ? 0 : -1;
+#else
+  fprintf(stderr, "Simulation not built with checkpoints support (savable).\n");
+  return -1;
+#endif
+}
+
+extern "C" void litex_sim_checkpoint_write(const void *data, size_t size)
+{
+#ifdef SAVABLE
+  g_save->write(data, size);
+#endif
+}
+
+extern "C" void litex_sim_checkpoint_read(void *data, size_t size)
+{
+#ifdef SAVABLE
+  g_restore->read(data, size);
+#endif
+}
+
+extern "C" void litex_sim_checkpoint_model(void *vsim)
+{
+#ifdef SAVABLE
+  Vsim *sim = (Vsim*)vsim;
+  if(g_save)
+    *g_save << *sim;
+  else
+    *g_restore >> *sim;
+#endif
+}
+
+extern "C" void litex_sim_checkpoint_close()
+{
+#ifdef SAVABLE
+  if(g_save) {
+    g_save->close();
+    delete g_save;
+    g_save = nullptr;
+  }
+  if(g_restore) {
+    g_restore->close();
+    delete g_restore;
+    g_restore = nullptr;
+  }
+#endif
+}
+
 extern "C" void litex_sim_init_cmdargs(int argc, char *argv[])
 {
   Verilated::commandArgs(argc, argv);
@@ -4,6 +4,7 @@
 #define __VERIL_H_
 
 #include <stdint.h>
+#include <stddef.h>
 
 #ifdef __cplusplus
 extern "C" void litex_sim_init_cmdargs(int argc, char *argv[]);
@@ -11,6 +12,11 @@ extern "C" void litex_sim_eval(void *vsim, uint64_t time_ps);
 extern "C" void litex_sim_init_tracer(void *vsim, long start, long end);
 extern "C" void litex_sim_tracer_dump();
 extern "C" int litex_sim_got_finish();
+extern "C" int litex_sim_checkpoint_open(const char *filename, int save);
+extern "C" void litex_sim_checkpoint_write(const void *data, size_t size);
+extern "C" void litex_sim_checkpoint_read(void *data, size_t size);
+extern "C" void litex_sim_checkpoint_model(void *vsim);
+extern "C" void litex_sim_checkpoint_close();
 #if VM_COVERAGE
 extern "C" void litex_sim_coverage_dump();
 #endif
@@ -19,6 +25,11 @@ void litex_sim_eval(void *vsim, uint64_t time_ps);
 void litex_sim_init_tracer(void *vsim);
 void litex_sim_tracer_dump();
 int litex_sim_got_finish();
+int litex_sim_checkpoint_open(const char *filename, int save);
+void litex_sim_checkpoint_write(const void *data, size_t size);
+void litex_sim_checkpoint_read(void *data, size_t size);
+void litex_sim_checkpoint_model(void *vsim);
+void litex_sim_checkpoint_close();
 void litex_sim_init_cmdargs(int argc, char *argv[]);
 #if VM_COVERAGE
 void litex_sim_coverage_dump();
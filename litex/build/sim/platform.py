@@ -20,6 +20,8 @@ class SimPlatform(GenericPlatform):
     def __init__(self, device, io, name="sim", toolchain="verilator", **kwargs):
         if "sim_trace" not in (iface[0] for iface in io):
             io.append(("sim_trace", 0, Pins(1)))
+        if "sim_checkpoint" not in (iface[0] for iface in io):
+            io.append(("sim_checkpoint", 0, Pins(1)))
         GenericPlatform.__init__(self, device, io, name=name, **kwargs)
         self.sim_requested = []
         if toolchain == "verilator":
@@ -67,6 +69,10 @@ class SimPlatform(GenericPlatform):
         module.add_csr("sim_finish")
         self.trace = None
 
+    def add_checkpoint(self, module):
+        module.submodules.sim_checkpoint = SimCheckpoint(self.request("sim_checkpoint"))
+        module.add_csr("sim_checkpoint")
+
 
 # Sim debug modules --------------------------------------------------------------------------------
 
@@ -89,6 +95,19 @@ class SimMarker(Module, AutoCSR):
         # set from software
         self.marker = CSRStorage(size)
 
+class SimCheckpoint(Module, AutoCSR):
+    """Request a simulation checkpoint from software/gateware
+
+    The simulation is saved (checkpoint module, see SimConfig.add_checkpoint) at the end of the
+    cycle where the pin is set.
+    """
+    def __init__(self, pin):
+        # set from software
+        self.checkpoint = CSR()
+        # used by simulator to save the simulation
+        self.pin = pin
+        self.comb += pin.eq(self.checkpoint.re)
+
 class SimFinish(Module, AutoCSR):
     """Finish simulation from software"""
     def __init__(self):
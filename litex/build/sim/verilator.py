@@ -7,13 +7,18 @@
 
 import os
 import sys
+import shutil
+import tarfile
+import hashlib
 import subprocess
 from shutil import which
 
 from migen.fhdl.structure import _Fragment
+from migen.fhdl.specials import Memory
 from litex import get_data_mod
 from litex.build import tools
 from litex.build.generic_platform import *
+from litex.build.sim.common import SimMemory
 
 
 sim_directory = os.path.abspath(os.path.dirname(__file__))
@@ -124,32 +129,115 @@ CFLAGS += -DVL_DEBUG
     tools.write_to_file("variables.mak", content)
 
 
-def _generate_sim_config(config):
-    content = config.get_json()
+def _generate_sim_config(config, ns=None):
+    content = config.get_json(ns)
     tools.write_to_file("sim_config.js", content)
 
 
-def _build_sim(build_name, sources, threads, coverage, opt_level="O3", trace_fst=False):
+def _hash_file(h, filename, name):
+    # Files are identified by a name independent of the install/build location so that the cache
+    # can be shared between machines.
+    h.update(name.encode() + b"\0")
+    with open(filename, "rb") as f:
+        h.update(f.read())
+
+def _hash_directory(h, directory, extensions=None):
+    for root, dirs, files in sorted(os.walk(directory)):
+        dirs.sort()
+        for f in sorted(files):
+            if extensions is None or os.path.splitext(f)[1] in extensions:
+                filename = os.path.join(root, f)
+                _hash_file(h, filename, os.path.relpath(filename, directory))
+
+def _build_hash(build_name, sources, include_paths, threads, coverage, opt_level, trace_fst, savable=False):
+    # Build cache keys: the config key covers the compilation flags (objects compiled with other
+    # flags can't be reused), the build key covers everything the Vsim binary is built from. The
+    # sim config (sim_config.js) is only read at runtime and is not part of it.
+    config = hashlib.sha256(repr((int(threads) if int(threads) > 1 else 1, bool(coverage), opt_level,
+        bool(trace_fst), bool(savable))).encode()).hexdigest()
+    h = hashlib.sha256(config.encode())
+    for filename, language, library in sorted(sources):
+        _hash_file(h, filename, os.path.basename(filename))
+    for path in sorted(include_paths):
+        _hash_directory(h, path, extensions=[".v", ".vh", ".sv", ".svh"])
+    for filename in ["sim_header.h", "sim_init.cpp"]:
+        _hash_file(h, filename, filename)
+    _hash_directory(h, core_directory)
+    tools.write_to_file("build_" + build_name + ".hash", "{} {}\n".format(config, h.hexdigest()))
+
+def _build_sim(build_name, sources, threads, coverage, opt_level="O3", trace_fst=False, savable=False):
     makefile = os.path.join(core_directory, 'Makefile')
     cc_srcs = []
     for filename, language, library in sources:
         cc_srcs.append("--cc " + filename + " ")
     build_script_contents = """\
-rm -rf obj_dir/
-make -C . -f {} {} {} {} {} {}
+make -C . -f {} {} {} {} {} {} {}
 """.format(makefile,
     "CC_SRCS=\"{}\"".format("".join(cc_srcs)),
     "THREADS={}".format(threads) if int(threads) > 1 else "",
     "COVERAGE=1" if coverage else "",
     "OPT_LEVEL={}".format(opt_level),
     "TRACE_FST=1" if trace_fst else "",
+    "SAVABLE=1" if savable else "",
     )
     build_script_file = "build_" + build_name + ".sh"
     tools.write_to_file(build_script_file, build_script_contents, force_unix=True)
 
-def _compile_sim(build_name, verbose):
+def _verilator_version():
+    if which("verilator") is None:
+        return ""
+    return subprocess.check_output(["verilator", "--version"]).decode()
+
+def _cache_members(tar):
+    # The shared cache directory can be written by others: only extract what _compile_sim stores
+    # (regular files obj_dir/Vsim and modules/*.so), None if the archive contains anything else.
+    members = tar.getmembers()
+    for member in members:
+        name = member.name
+        if not member.isfile() or os.path.isabs(name) or os.path.normpath(name) != name:
+            return None
+        if name != os.path.join("obj_dir", "Vsim") and not (
+            os.path.dirname(name) == "modules" and name.endswith(".so")):
+            return None
+    return members
+
+def _compile_sim(build_name, verbose, cache_dir=None):
+    # Build cache: the build is skipped when obj_dir was built from the same inputs (or restored
+    # from cache_dir, shared between builds); otherwise obj_dir is kept unless the compilation
+    # flags changed so that make/ccache only rebuild what changed.
+    with open("build_" + build_name + ".hash", "r") as f:
+        config, key = f.read().split()
+    key   = hashlib.sha256((key + _verilator_version()).encode()).hexdigest()
+    stamp = os.path.join("obj_dir", "build.hash")
+    built = None
+    if os.path.exists(stamp):
+        with open(stamp, "r") as f:
+            built = f.read().split()
+    if built == [config, key] and os.path.exists(os.path.join("obj_dir", "Vsim")):
+        if verbose:
+            print("Verilator build cache hit ({}).".format(key[:16]))
+        return
+    archive = None if cache_dir is None else os.path.join(cache_dir, key + ".tar.gz")
+    if archive is not None and os.path.exists(archive):
+        with tarfile.open(archive, "r:gz") as tar:
+            members = _cache_members(tar)
+            if members is not None:
+                if verbose:
+                    print("Verilator build cache hit ({}), restoring from {}.".format(key[:16], cache_dir))
+                tar.extractall(".", members=members)
+                tools.write_to_file(stamp, "{} {}\n".format(config, key))
+                return
+        print("Ignoring invalid Verilator build cache archive {}.".format(archive))
+    if built is None or built[0] != config:
+        shutil.rmtree("obj_dir", ignore_errors=True)
+
+    env = dict(os.environ)
+    if which("ccache") is not None:
+        env.setdefault("OBJCACHE", "ccache")
+        if cache_dir is not None:
+            env.setdefault("CCACHE_DIR", os.path.join(os.path.abspath(cache_dir), "ccache"))
     build_script_file = "build_" + build_name + ".sh"
-    p = subprocess.Popen(["bash", build_script_file], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    p = subprocess.Popen(["bash", build_script_file], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
     output, _ = p.communicate()
     output = output.decode('utf-8')
     if p.returncode != 0:
@@ -160,6 +248,19 @@ def _compile_sim(build_name, verbose):
         raise OSError("Subprocess failed with {}\n{}".format(p.returncode, "\n".join(error_messages)))
     if verbose:
         print(output)
+    tools.write_to_file(stamp, "{} {}\n".format(config, key))
+
+    # Store the files needed to run the simulation in the shared cache.
+    if archive is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = archive + ".{}.tmp".format(os.getpid())
+        with tarfile.open(tmp, "w:gz") as tar:
+            tar.add(os.path.join("obj_dir", "Vsim"))
+            if os.path.isdir("modules"):
+                for f in sorted(os.listdir("modules")):
+                    if f.endswith(".so"):
+                        tar.add(os.path.join("modules", f))
+        os.replace(tmp, archive)
 
 def _run_sim(build_name, as_root=False, interactive=True):
     if sys.platform == "linux":
@@ -196,6 +297,7 @@ class SimVerilatorToolchain:
             opt_level    = "O0",
             trace        = False,
             trace_fst    = False,
+            savable      = False,
             trace_start  = 0,
             trace_end    = -1,
             trace_cycles = -1,
@@ -203,9 +305,16 @@ class SimVerilatorToolchain:
             sim_end      = -1,
             regular_comb = False,
             interactive  = True,
+            cache_dir    = None,
             module       = None,
             soc          = None):
 
+        # Shared build cache directory
+        if cache_dir is None:
+            cache_dir = os.environ.get("LITEX_SIM_CACHE_DIR", None)
+        if cache_dir is not None:
+            cache_dir = os.path.abspath(cache_dir)
+
         # Create build directory
         os.makedirs(build_dir, exist_ok=True)
         cwd = os.getcwd()
@@ -217,13 +326,17 @@ class SimVerilatorToolchain:
                 fragment = fragment.get_fragment()
             platform.finalize(fragment)
 
-            # Generate verilog
+            # Generate verilog (with the memories preloading only when used)
+            special_overrides = {}
+            if sim_config is not None and sim_config.mem_inits:
+                special_overrides[Memory] = SimMemory
             v_output = platform.get_verilog(fragment,
-                name            = build_name,
-                dummy_signal    = False,
-                regular_comb    = regular_comb,
-                blocking_assign = True,
-                reproducible    = True, # allow for build caching
+                name              = build_name,
+                special_overrides = special_overrides,
+                dummy_signal      = False,
+                regular_comb      = regular_comb,
+                blocking_assign   = True,
+                reproducible      = True, # allow for build caching
             )
             named_sc, named_pc = platform.resolve_signals(v_output.ns)
             v_file = build_name + ".v"
@@ -237,10 +350,12 @@ class SimVerilatorToolchain:
 
             # Generate sim config
             if sim_config:
-                _generate_sim_config(sim_config)
+                _generate_sim_config(sim_config, v_output.ns)
 
             # Build
-            _build_sim(build_name, platform.sources, threads, coverage, opt_level, trace_fst)
+            _build_sim(build_name, platform.sources, threads, coverage, opt_level, trace_fst, savable)
+            _build_hash(build_name, platform.sources, platform.verilog_include_paths,
+                threads, coverage, opt_level, trace_fst, savable)
 
         # Run
         if run:
@@ -249,7 +364,7 @@ class SimVerilatorToolchain:
                 msg += "- Install Verilator.\n"
                 msg += "- Add Verilator toolchain to your $PATH."
                 raise OSError(msg)
-            _compile_sim(build_name, verbose)
+            _compile_sim(build_name, verbose, cache_dir)
             run_as_root = False
             if sim_config.has_module("ethernet"):
                 run_as_root = True
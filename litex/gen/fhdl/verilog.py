@@ -67,14 +67,27 @@ def _printconstant(node):
         return str(node.nbits) + "'d" + str(node.value), False
 
 
-def _printexpr(ns, node):
+def _printexpr(ns, node, cache=None):
+    # Printed expressions are memoized in cache (by node identity, the node is kept in the entry so
+    # that its id can't be reused), shared sub-expressions are then only printed once.
+    if cache is not None:
+        entry = cache.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+        r = _printexpr_uncached(ns, node, cache)
+        cache[id(node)] = (node, r)
+        return r
+    return _printexpr_uncached(ns, node, cache)
+
+
+def _printexpr_uncached(ns, node, cache):
     if isinstance(node, Constant):
         return _printconstant(node)
     elif isinstance(node, Signal):
         return ns.get_name(node), node.signed
     elif isinstance(node, _Operator):
         arity = len(node.operands)
-        r1, s1 = _printexpr(ns, node.operands[0])
+        r1, s1 = _printexpr(ns, node.operands[0], cache)
         if arity == 1:
             if node.op == "-":
                 if s1:
@@ -86,7 +99,7 @@ def _printexpr(ns, node):
                 r = node.op + r1
                 s = s1
         elif arity == 2:
-            r2, s2 = _printexpr(ns, node.operands[1])
+            r2, s2 = _printexpr(ns, node.operands[1], cache)
             if node.op not in ["<<<", ">>>"]:
                 if s2 and not s1:
                     r1 = "$signed({1'd0, " + r1 + "})"
@@ -96,8 +109,8 @@ def _printexpr(ns, node):
             s = s1 or s2
         elif arity == 3:
             assert node.op == "m"
-            r2, s2 = _printexpr(ns, node.operands[1])
-            r3, s3 = _printexpr(ns, node.operands[2])
+            r2, s2 = _printexpr(ns, node.operands[1], cache)
+            r3, s3 = _printexpr(ns, node.operands[2], cache)
             if s2 and not s3:
                 r3 = "$signed({1'd0, " + r3 + "})"
             if s3 and not s2:
@@ -112,19 +125,19 @@ def _printexpr(ns, node):
         if isinstance(node.value, Signal) \
           and len(node.value) == 1 \
           and node.start == 0 and node.stop == 1:
-              return _printexpr(ns, node.value)
+              return _printexpr(ns, node.value, cache)
 
         if node.start + 1 == node.stop:
             sr = "[" + str(node.start) + "]"
         else:
             sr = "[" + str(node.stop-1) + ":" + str(node.start) + "]"
-        r, s = _printexpr(ns, node.value)
+        r, s = _printexpr(ns, node.value, cache)
         return r + sr, s
     elif isinstance(node, Cat):
-        l = [_printexpr(ns, v)[0] for v in reversed(node.l)]
+        l = [_printexpr(ns, v, cache)[0] for v in reversed(node.l)]
         return "{" + ", ".join(l) + "}", False
     elif isinstance(node, Replicate):
-        return "{" + str(node.n) + "{" + _printexpr(ns, node.v)[0] + "}}", False
+        return "{" + str(node.n) + "{" + _printexpr(ns, node.v, cache)[0] + "}}", False
     else:
         raise TypeError("Expression of unrecognized type: '{}'".format(type(node).__name__))
 
@@ -132,9 +145,39 @@ def _printexpr(ns, node):
 (_AT_BLOCKING, _AT_NONBLOCKING, _AT_SIGNAL) = range(3)
 
 
-def _printnode(ns, at, level, node, target_filter=None):
-    if target_filter is not None and target_filter not in list_targets(node):
-        return ""
+def _list_targets(node, targets):
+    # Targets of a statement (tree), memoized in targets for the node and all its sub-statements
+    # so that filtering a statement tree on each of its targets does not walk it again each time.
+    entry = targets.get(id(node))
+    if entry is not None and entry[0] is node:
+        return entry[1]
+    if isinstance(node, _Assign):
+        r = list_targets(node)
+    elif isinstance(node, If):
+        r = _list_targets(node.t, targets) | _list_targets(node.f, targets)
+    elif isinstance(node, Case):
+        r = set()
+        for statements in node.cases.values():
+            r |= _list_targets(statements, targets)
+    elif isinstance(node, collections.abc.Iterable):
+        r = set()
+        for n in node:
+            r |= _list_targets(n, targets)
+    else:
+        r = set()
+    targets[id(node)] = (node, r)
+    return r
+
+
+def _printnode(ns, at, level, node, target_filter=None, targets=None, cache=None):
+    r = []
+    _printnode_into(r, ns, at, level, node, target_filter, dict() if targets is None else targets, cache)
+    return "".join(r)
+
+
+def _printnode_into(r, ns, at, level, node, target_filter, targets, cache):
+    if target_filter is not None and target_filter not in _list_targets(node, targets):
+        return
     elif isinstance(node, _Assign):
         if at == _AT_BLOCKING:
             assignment = " = "
@@ -144,34 +187,31 @@ def _printnode(ns, at, level, node, target_filter=None):
             assignment = " = "
         else:
             assignment = " <= "
-        return "\t"*level + _printexpr(ns, node.l)[0] + assignment + _printexpr(ns, node.r)[0] + ";\n"
+        r.append("\t"*level + _printexpr(ns, node.l, cache)[0] + assignment + _printexpr(ns, node.r, cache)[0] + ";\n")
     elif isinstance(node, collections.abc.Iterable):
-        return "".join(_printnode(ns, at, level, n, target_filter) for n in node)
+        for n in node:
+            _printnode_into(r, ns, at, level, n, target_filter, targets, cache)
     elif isinstance(node, If):
-        r = "\t"*level + "if (" + _printexpr(ns, node.cond)[0] + ") begin\n"
-        r += _printnode(ns, at, level + 1, node.t, target_filter)
+        r.append("\t"*level + "if (" + _printexpr(ns, node.cond, cache)[0] + ") begin\n")
+        _printnode_into(r, ns, at, level + 1, node.t, target_filter, targets, cache)
         if node.f:
-            r += "\t"*level + "end else begin\n"
-            r += _printnode(ns, at, level + 1, node.f, target_filter)
-        r += "\t"*level + "end\n"
-        return r
+            r.append("\t"*level + "end else begin\n")
+            _printnode_into(r, ns, at, level + 1, node.f, target_filter, targets, cache)
+        r.append("\t"*level + "end\n")
     elif isinstance(node, Case):
         if node.cases:
-            r = "\t"*level + "case (" + _printexpr(ns, node.test)[0] + ")\n"
+            r.append("\t"*level + "case (" + _printexpr(ns, node.test, cache)[0] + ")\n")
             css = [(k, v) for k, v in node.cases.items() if isinstance(k, Constant)]
             css = sorted(css, key=lambda x: x[0].value)
             for choice, statements in css:
-                r += "\t"*(level + 1) + _printexpr(ns, choice)[0] + ": begin\n"
-                r += _printnode(ns, at, level + 2, statements, target_filter)
-                r += "\t"*(level + 1) + "end\n"
+                r.append("\t"*(level + 1) + _printexpr(ns, choice, cache)[0] + ": begin\n")
+                _printnode_into(r, ns, at, level + 2, statements, target_filter, targets, cache)
+                r.append("\t"*(level + 1) + "end\n")
             if "default" in node.cases:
-                r += "\t"*(level + 1) + "default: begin\n"
-                r += _printnode(ns, at, level + 2, node.cases["default"], target_filter)
-                r += "\t"*(level + 1) + "end\n"
-            r += "\t"*level + "endcase\n"
-            return r
-        else:
-            return ""
+                r.append("\t"*(level + 1) + "default: begin\n")
+                _printnode_into(r, ns, at, level + 2, node.cases["default"], target_filter, targets, cache)
+                r.append("\t"*(level + 1) + "end\n")
+            r.append("\t"*level + "endcase\n")
     elif isinstance(node, Display):
         s = "\"" + node.s + "\""
         for arg in node.args:
@@ -180,9 +220,9 @@ def _printnode(ns, at, level, node, target_filter=None):
                 s += ns.get_name(arg)
             else:
                 s += str(arg)
-        return "\t"*level + "$display(" + s + ");\n"
+        r.append("\t"*level + "$display(" + s + ");\n")
     elif isinstance(node, Finish):
-        return "\t"*level + "$finish;\n"
+        r.append("\t"*level + "$finish;\n")
     else:
         raise TypeError("Node of unrecognized type: "+str(type(node)))
 
@@ -242,61 +282,62 @@ def _printattrsynth(attr, attr_translate):
     return r
 
 def _printheader(f, ios, name, ns, attr_translate,
-                 reg_initialization):
+                 reg_initialization, cache=None):
     sigs = list_signals(f) | list_special_ios(f, True, True, True)
     special_outs = list_special_ios(f, False, True, True)
     inouts = list_special_ios(f, False, False, True)
     targets = list_targets(f) | special_outs
     wires = _list_comb_wires(f) | special_outs
-    r = "module " + name + "(\n"
+    r = ["module " + name + "(\n"]
     firstp = True
     for sig in sorted(ios, key=lambda x: x.duid):
         if not firstp:
-            r += ",\n"
+            r.append(",\n")
         firstp = False
         attr = _printattr(sig.attr, attr_translate)
         if attr:
-            r += "\t" + attr
+            r.append("\t" + attr)
         sig.type = "wire"
         if sig in inouts:
             sig.direction = "inout"
-            r += "\tinout wire " + _printsig(ns, sig)
+            r.append("\tinout wire " + _printsig(ns, sig))
         elif sig in targets:
             sig.direction = "output"
             if sig in wires:
-                r += "\toutput wire " + _printsig(ns, sig)
+                r.append("\toutput wire " + _printsig(ns, sig))
             else:
                 sig.type = "reg"
-                r += "\toutput reg " + _printsig(ns, sig)
+                r.append("\toutput reg " + _printsig(ns, sig))
         else:
             sig.direction = "input"
-            r += "\tinput wire " + _printsig(ns, sig)
-    r += "\n);\n\n"
+            r.append("\tinput wire " + _printsig(ns, sig))
+    r.append("\n);\n\n")
     for sig in sorted(sigs - ios, key=lambda x: x.duid):
         attr = _printattr(sig.attr, attr_translate)
         if attr:
-            r += attr + " "
+            r.append(attr + " ")
         if sig in wires:
-            r += "wire " + _printsig(ns, sig)
+            r.append("wire " + _printsig(ns, sig))
             if not attr:
-                r += ";\n"
+                r.append(";\n")
             else:
                 attr_synth = _printattrsynth(sig.attr, attr_translate)
-                r += f' {attr_synth} ;\n'
+                r.append(f' {attr_synth} ;\n')
         else:
             if reg_initialization:
-                r += "reg " + _printsig(ns, sig) + " = " + _printexpr(ns, sig.init)[0] + ";\n"
+                r.append("reg " + _printsig(ns, sig) + " = " + _printexpr(ns, sig.init, cache)[0] + ";\n")
             else:
-                r += "reg " + _printsig(ns, sig) + ";\n"
-    r += "\n"
-    return r
+                r.append("reg " + _printsig(ns, sig) + ";\n")
+    r.append("\n")
+    return "".join(r)
 
 
 def _printcomb_simulation(f, ns,
             display_run,
             dummy_signal,
-            blocking_assign):
-    r = ""
+            blocking_assign,
+            cache=None):
+    r = []
     if f.comb:
         if dummy_signal:
             # Generate a dummy event to get the simulator
@@ -304,10 +345,10 @@ def _printcomb_simulation(f, ns,
             syn_off = "// synthesis translate_off\n"
             syn_on = "// synthesis translate_on\n"
             dummy_s = Signal(name_override="dummy_s")
-            r += syn_off
-            r += "reg " + _printsig(ns, dummy_s) + ";\n"
-            r += "initial " + ns.get_name(dummy_s) + " <= 1'd0;\n"
-            r += syn_on
+            r.append(syn_off)
+            r.append("reg " + _printsig(ns, dummy_s) + ";\n")
+            r.append("initial " + ns.get_name(dummy_s) + " <= 1'd0;\n")
+            r.append(syn_on)
 
 
         from collections import defaultdict
@@ -319,71 +360,76 @@ def _printcomb_simulation(f, ns,
             for t in targets:
                 target_stmt_map[t].append(statement)
 
-        groups = group_by_targets(f.comb)
+        # Targets of the sub-statements are computed once and reused when printing each target.
+        targets = dict()
 
         for n, (t, stmts) in enumerate(target_stmt_map.items()):
             assert isinstance(t, Signal)
             if len(stmts) == 1 and isinstance(stmts[0], _Assign):
-                r += "assign " + _printnode(ns, _AT_BLOCKING, 0, stmts[0])
+                r.append("assign ")
+                _printnode_into(r, ns, _AT_BLOCKING, 0, stmts[0], None, targets, cache)
             else:
                 if dummy_signal:
                     dummy_d = Signal(name_override="dummy_d")
-                    r += "\n" + syn_off
-                    r += "reg " + _printsig(ns, dummy_d) + ";\n"
-                    r += syn_on
+                    r.append("\n" + syn_off)
+                    r.append("reg " + _printsig(ns, dummy_d) + ";\n")
+                    r.append(syn_on)
 
-                r += "always @(*) begin\n"
+                r.append("always @(*) begin\n")
                 if display_run:
-                    r += "\t$display(\"Running comb block #" + str(n) + "\");\n"
+                    r.append("\t$display(\"Running comb block #" + str(n) + "\");\n")
                 if blocking_assign:
-                    r += "\t" + ns.get_name(t) + " = " + _printexpr(ns, t.reset)[0] + ";\n"
-                    r += _printnode(ns, _AT_BLOCKING, 1, stmts, t)
+                    r.append("\t" + ns.get_name(t) + " = " + _printexpr(ns, t.reset, cache)[0] + ";\n")
+                    _printnode_into(r, ns, _AT_BLOCKING, 1, stmts, t, targets, cache)
                 else:
-                    r += "\t" + ns.get_name(t) + " <= " + _printexpr(ns, t.reset)[0] + ";\n"
-                    r += _printnode(ns, _AT_NONBLOCKING, 1, stmts, t)
+                    r.append("\t" + ns.get_name(t) + " <= " + _printexpr(ns, t.reset, cache)[0] + ";\n")
+                    _printnode_into(r, ns, _AT_NONBLOCKING, 1, stmts, t, targets, cache)
                 if dummy_signal:
-                    r += syn_off
-                    r += "\t" + ns.get_name(dummy_d) + " = " + ns.get_name(dummy_s) + ";\n"
-                    r += syn_on
-                r += "end\n"
-    r += "\n"
-    return r
+                    r.append(syn_off)
+                    r.append("\t" + ns.get_name(dummy_d) + " = " + ns.get_name(dummy_s) + ";\n")
+                    r.append(syn_on)
+                r.append("end\n")
+    r.append("\n")
+    return "".join(r)
 
 
-def _printcomb_regular(f, ns, blocking_assign):
-    r = ""
+def _printcomb_regular(f, ns, blocking_assign, cache=None):
+    r = []
     if f.comb:
         groups = group_by_targets(f.comb)
+        targets = dict()
 
         for n, g in enumerate(groups):
             if len(g[1]) == 1 and isinstance(g[1][0], _Assign):
-                r += "assign " + _printnode(ns, _AT_BLOCKING, 0, g[1][0])
+                r.append("assign ")
+                _printnode_into(r, ns, _AT_BLOCKING, 0, g[1][0], None, targets, cache)
             else:
-                r += "always @(*) begin\n"
+                r.append("always @(*) begin\n")
                 if blocking_assign:
                     for t in g[0]:
-                        r += "\t" + ns.get_name(t) + " = " + _printexpr(ns, t.reset)[0] + ";\n"
-                    r += _printnode(ns, _AT_BLOCKING, 1, g[1])
+                        r.append("\t" + ns.get_name(t) + " = " + _printexpr(ns, t.reset, cache)[0] + ";\n")
+                    _printnode_into(r, ns, _AT_BLOCKING, 1, g[1], None, targets, cache)
                 else:
                     for t in g[0]:
-                        r += "\t" + ns.get_name(t) + " <= " + _printexpr(ns, t.reset)[0] + ";\n"
-                    r += _printnode(ns, _AT_NONBLOCKING, 1, g[1])
-                r += "end\n"
-    r += "\n"
-    return r
+                        r.append("\t" + ns.get_name(t) + " <= " + _printexpr(ns, t.reset, cache)[0] + ";\n")
+                    _printnode_into(r, ns, _AT_NONBLOCKING, 1, g[1], None, targets, cache)
+                r.append("end\n")
+    r.append("\n")
+    return "".join(r)
 
 
-def _printsync(f, ns):
-    r = ""
+def _printsync(f, ns, cache=None):
+    r = []
+    targets = dict()
     for k, v in sorted(f.sync.items(), key=itemgetter(0)):
-        r += "always @(posedge " + ns.get_name(f.clock_domains[k].clk) + ") begin\n"
-        r += _printnode(ns, _AT_SIGNAL, 1, v)
-        r += "end\n\n"
-    return r
+        r.append("always @(posedge " + ns.get_name(f.clock_domains[k].clk) + ") begin\n")
+        _printnode_into(r, ns, _AT_SIGNAL, 1, v, None, targets, cache)
+        r.append("end\n\n")
+    return "".join(r)
 
 
 def _printspecials(overrides, specials, ns, add_data_file, attr_translate):
-    r = ""
+    r = []
     def sorting_key(s):
         prio = getattr(s, 'priority', 0)
         return (prio, s.duid)
@@ -391,12 +437,12 @@ def _printspecials(overrides, specials, ns, add_data_file, attr_translate):
         if hasattr(special, "attr"):
             attr = _printattr(special.attr, attr_translate)
             if attr:
-                r += attr + " "
+                r.append(attr + " ")
         pr = call_special_classmethod(overrides, special, "emit_verilog", ns, add_data_file)
         if pr is None:
             raise NotImplementedError("Special " + str(special) + " failed to implement emit_verilog")
-        r += pr
-    return r
+        r.append(pr)
+    return "".join(r)
 
 
 class DummyAttrTranslate(dict):
@@ -451,21 +497,27 @@ def convert(f, ios=None, name="top",
     ns.clock_domains = f.clock_domains
     r.ns = ns
 
-    src = generated_banner("//", reproducible=reproducible)
-    src += _printheader(f, ios, name, ns, attr_translate,
-                        reg_initialization=reg_initialization)
+    # Printed expressions are shared by all sections of the module.
+    cache = dict()
+    src = [generated_banner("//", reproducible=reproducible)]
+    src.append(_printheader(f, ios, name, ns, attr_translate,
+                        reg_initialization=reg_initialization,
+                        cache=cache))
     if regular_comb:
-        src += _printcomb_regular(f, ns,
-                      blocking_assign=blocking_assign)
+        src.append(_printcomb_regular(f, ns,
+                      blocking_assign=blocking_assign,
+                      cache=cache))
     else:
-        src += _printcomb_simulation(f, ns,
+        src.append(_printcomb_simulation(f, ns,
                       display_run=display_run,
                       dummy_signal=dummy_signal,
-                      blocking_assign=blocking_assign)
-    src += _printsync(f, ns)
-    src += _printspecials(special_overrides, f.specials - lowered_specials,
-        ns, r.add_data_file, attr_translate)
-    src += "endmodule\n"
+                      blocking_assign=blocking_assign,
+                      cache=cache))
+    src.append(_printsync(f, ns, cache=cache))
+    src.append(_printspecials(special_overrides, f.specials - lowered_specials,
+        ns, r.add_data_file, attr_translate))
+    src.append("endmodule\n")
+    src = "".join(src)
     r.set_main_source(src)
 
     return r
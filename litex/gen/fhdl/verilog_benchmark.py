@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Verilog emission benchmark: converts a generated design (many FSMs/decoders with large comb
+# statement trees) and reports the conversion time and a digest of the output. The digests are
+# checked against the ones of the reference emitter (outputs must be byte-identical).
+
+import sys
+import time
+import hashlib
+import argparse
+
+from migen import *
+from migen.genlib.fsm import FSM, NextState, NextValue
+
+from litex.gen.fhdl.verilog import convert
+
+# Design -------------------------------------------------------------------------------------------
+
+class Core(Module):
+    def __init__(self, n):
+        self.i   = i   = Signal(32)
+        self.sel = sel = Signal(8)
+        self.o   = o   = Signal(32)
+
+        # # #
+
+        # Decoder: a single comb Case driving many targets.
+        outs  = [Signal(32) for k in range(n)]
+        flags = [Signal() for k in range(n)]
+        cond  = (i[:4] == 0b1010) # Shared sub-expression.
+        cases = {}
+        for k in range(n):
+            cases[k] = [
+                outs[k].eq(i + k),
+                If(cond & i[k % 32],
+                    flags[k].eq(1),
+                    outs[(k + 1) % n].eq(Cat(i[8:16], sel, i[:16])),
+                ).Else(
+                    flags[(k + 3) % n].eq(i[k % 32]),
+                )
+            ]
+        cases["default"] = [outs[0].eq(Replicate(sel[0], 32))]
+        self.comb += Case(sel, cases)
+
+        # FSM.
+        self.submodules.fsm = fsm = FSM()
+        count = Signal(16)
+        for k in range(n):
+            fsm.act(k,
+                o.eq(outs[k] ^ Mux(flags[k], i, ~i)),
+                NextValue(count, count + k),
+                If(sel == k, NextState((k + 1) % n))
+            )
+
+
+class Design(Module):
+    def __init__(self, cores, n):
+        self.ios = set()
+        for c in range(cores):
+            core = Core(n)
+            self.submodules += core
+            self.ios |= {core.i, core.sel, core.o}
+
+# Reference -----------------------------------------------------------------------------------------
+
+# sha256 of the outputs of the emitter before the linear-time rewrite: (cores, n, regular_comb).
+# The output also depends on the Migen lowering (FSM, names): to be regenerated with the previous
+# emitter if Migen changes it. The ordering of some statements also depends on the signals created
+# before (Signal hashes), so the digests are the ones of a fresh process converting the design with
+# regular_comb=True then False (as main does).
+reference_digests = {
+    (2,  8,  True)  : "cc6a79b36aa766bd2b691102faadfe280d3d30346edfb086c73dac2f79bd5be1",
+    (2,  8,  False) : "909e177adfaa78c6ad2f95fb63fdcb878f3c93420e7cf6f56947c94b377edd9a",
+    (16, 64, True)  : "e8df543a6a8c162794ec5f6e5c4b6c7ce266ddba9a0566d16647fbb5775b439f",
+    (16, 64, False) : "32328b8fa0d0167c66d3815d7a7c051dc2a057a7064fd5bd5144e7dc5555e607",
+}
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def run(cores, n, regular_comb):
+    """Convert the design, return (duration, size, sha256) of the conversion."""
+    design = Design(cores, n)
+    start  = time.perf_counter()
+    v = convert(design, design.ios, regular_comb=regular_comb, reproducible=True)
+    duration = time.perf_counter() - start
+    src = str(v)
+    return duration, len(src), hashlib.sha256(src.encode()).hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description="Verilog emission benchmark.")
+    parser.add_argument("--cores", default=16, type=int, help="Number of cores in the design.")
+    parser.add_argument("--n",     default=64, type=int, help="Decoder/FSM size of each core.")
+    parser.add_argument("--check", action="store_true", help="Fail if outputs differ from the reference.")
+    args = parser.parse_args()
+
+    errors = 0
+    for regular_comb in [True, False]:
+        duration, size, digest = run(args.cores, args.n, regular_comb)
+        reference = reference_digests.get((args.cores, args.n, regular_comb), None)
+        status    = "no reference" if reference is None else "OK" if digest == reference else "MISMATCH"
+        print("regular_comb={:<5}: {:8.3f}s, {:8d} bytes, sha256 {} ({})".format(
+            str(regular_comb), duration, size, digest, status))
+        errors += (status != "OK")
+    if args.check and errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
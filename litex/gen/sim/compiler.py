@@ -0,0 +1,253 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import operator
+import collections
+
+from migen.fhdl.structure import *
+from migen.fhdl.structure import (_Operator, _Slice, _ArrayProxy, _Assign)
+from migen.fhdl.bitcontainer import value_bits_sign
+from migen.fhdl.specials import _MemoryLocation
+
+# Statement Compiler -------------------------------------------------------------------------------
+
+# The compiled engine turns the statement trees of a fragment into nested Python closures once, at
+# Simulator construction, so that the per-delta-cycle work no longer has to walk the AST and
+# dispatch on node types. Masks, shifts and clock domain lookups are resolved at compile time.
+# Results are bit-exact with Evaluator.eval/assign/execute.
+
+_binary_ops = {
+    "+"   : operator.add,
+    "-"   : operator.sub,
+    "*"   : operator.mul,
+    ">>>" : operator.rshift,
+    "<<<" : operator.lshift,
+    "&"   : operator.and_,
+    "^"   : operator.xor,
+    "|"   : operator.or_,
+    "<"   : operator.lt,
+    "<="  : operator.le,
+    "=="  : operator.eq,
+    "!="  : operator.ne,
+    ">"   : operator.gt,
+    ">="  : operator.ge,
+}
+
+
+def _noop():
+    pass
+
+
+class StatementCompiler:
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+
+    # Expressions ----------------------------------------------------------------------------------
+
+    def _compile_signal(self, node, postcommit):
+        i      = self.evaluator.index(node)
+        values = self.evaluator.signal_values
+        if postcommit:
+            modifications = self.evaluator.modifications
+            dirty         = self.evaluator.dirty
+            def read():
+                return modifications[i] if dirty[i] else values[i]
+        else:
+            def read():
+                return values[i]
+        return read
+
+    def compile_expr(self, node, postcommit=False):
+        if isinstance(node, Constant):
+            value = node.value
+            return lambda: value
+        elif isinstance(node, Signal):
+            return self._compile_signal(node, postcommit)
+        elif isinstance(node, _Operator):
+            operands = [self.compile_expr(o, postcommit) for o in node.operands]
+            if node.op == "m":
+                sel, a, b = operands
+                return lambda: a() if sel() else b()
+            elif len(operands) == 1:
+                a, = operands
+                if node.op == "-":
+                    return lambda: -a()
+                elif node.op == "~":
+                    return lambda: ~a()
+                else:
+                    raise NotImplementedError(node.op)
+            else:
+                a, b = operands
+                op = _binary_ops[node.op]
+                return lambda: op(a(), b())
+        elif isinstance(node, _Slice):
+            value = self.compile_expr(node.value, postcommit)
+            start = node.start
+            mask  = 2**(node.stop - node.start) - 1
+            if start:
+                return lambda: (value() >> start) & mask
+            else:
+                return lambda: value() & mask
+        elif isinstance(node, Cat):
+            parts = []
+            shift = 0
+            for element in node.l:
+                nbits = len(element)
+                parts.append((self.compile_expr(element, postcommit), 2**nbits - 1, shift))
+                shift += nbits
+            parts = tuple(parts)
+            def cat():
+                r = 0
+                for element, mask, shift in parts:
+                    r |= (element() & mask) << shift
+                return r
+            return cat
+        elif isinstance(node, Replicate):
+            nbits = len(node.v)
+            value = self.compile_expr(node.v, postcommit)
+            mask  = 2**nbits - 1
+            # v replicated n times is v multiplied by 0b...0001 0001 (n ones spaced by nbits).
+            factor = sum(1 << i*nbits for i in range(node.n))
+            return lambda: (value() & mask)*factor
+        elif isinstance(node, _ArrayProxy):
+            key     = self.compile_expr(node.key, postcommit)
+            choices = tuple(self.compile_expr(c, postcommit) for c in node.choices)
+            last    = len(choices) - 1
+            return lambda: choices[min(last, key())]()
+        elif isinstance(node, _MemoryLocation):
+            evaluator = self.evaluator
+            return lambda: evaluator.eval(node, postcommit)
+        elif isinstance(node, ClockSignal):
+            return self._compile_signal(self.evaluator.clock_domains[node.cd].clk, postcommit)
+        elif isinstance(node, ResetSignal):
+            rst = self.evaluator.clock_domains[node.cd].rst
+            if rst is None:
+                if node.allow_reset_less:
+                    return lambda: 0
+                else:
+                    def error():
+                        raise ValueError("Attempted to get reset signal of resetless"
+                                         " domain '{}'".format(node.cd))
+                    return error
+            else:
+                return self._compile_signal(rst, postcommit)
+        else:
+            raise NotImplementedError(node)
+
+    # Assignments ----------------------------------------------------------------------------------
+
+    def compile_assign(self, node):
+        if isinstance(node, Signal):
+            assert not node.variable
+            i             = self.evaluator.index(node)
+            modifications = self.evaluator.modifications
+            dirty         = self.evaluator.dirty
+            dirty_indices = self.evaluator.dirty_indices
+            mask = 2**node.nbits - 1
+            if node.signed:
+                sign = 2**(node.nbits - 1)
+                full = 2**node.nbits
+                def assign(value):
+                    value &= mask
+                    if value & sign:
+                        value -= full
+                    modifications[i] = value
+                    if not dirty[i]:
+                        dirty[i] = 1
+                        dirty_indices.append(i)
+            else:
+                def assign(value):
+                    modifications[i] = value & mask
+                    if not dirty[i]:
+                        dirty[i] = 1
+                        dirty_indices.append(i)
+            return assign
+        elif isinstance(node, Cat):
+            parts = tuple((self.compile_assign(element), 2**len(element) - 1, len(element))
+                for element in node.l)
+            def assign(value):
+                for element, mask, nbits in parts:
+                    element(value & mask)
+                    value >>= nbits
+            return assign
+        elif isinstance(node, _Slice):
+            current = self.compile_expr(node.value, True)
+            inner   = self.compile_assign(node.value)
+            start   = node.start
+            clear   = ~((2**node.stop - 1) - (2**node.start - 1))
+            mask    = 2**(node.stop - node.start) - 1
+            def assign(value):
+                inner((current() & clear) | ((value & mask) << start))
+            return assign
+        elif isinstance(node, _ArrayProxy):
+            key     = self.compile_expr(node.key)
+            choices = tuple(self.compile_assign(c) for c in node.choices)
+            last    = len(choices) - 1
+            def assign(value):
+                choices[min(last, key())](value)
+            return assign
+        elif isinstance(node, _MemoryLocation):
+            evaluator = self.evaluator
+            return lambda value: evaluator.assign(node, value)
+        else:
+            raise NotImplementedError(node)
+
+    # Statements -----------------------------------------------------------------------------------
+
+    def _compile_statement(self, s):
+        if isinstance(s, _Assign):
+            target = self.compile_assign(s.l)
+            value  = self.compile_expr(s.r)
+            return lambda: target(value())
+        elif isinstance(s, If):
+            cond = self.compile_expr(s.cond)
+            mask = 2**len(s.cond) - 1
+            t    = self.compile_statements(s.t)
+            f    = self.compile_statements(s.f)
+            def if_():
+                if cond() & mask:
+                    t()
+                else:
+                    f()
+            return if_
+        elif isinstance(s, Case):
+            nbits, signed = value_bits_sign(s.test)
+            test  = self.compile_expr(s.test)
+            mask  = 2**nbits - 1
+            sign  = 2**(nbits - 1) if signed else 0
+            full  = 2**nbits
+            cases = dict()
+            for k, v in s.cases.items():
+                # First matching choice wins, as in Evaluator.execute.
+                if isinstance(k, Constant) and k.value not in cases:
+                    cases[k.value] = self.compile_statements(v)
+            default = _noop
+            if "default" in s.cases:
+                default = self.compile_statements(s.cases["default"])
+            cget = cases.get
+            def case():
+                value = test() & mask
+                if value & sign:
+                    value -= full
+                cget(value, default)()
+            return case
+        elif isinstance(s, collections.abc.Iterable):
+            return self.compile_statements(s)
+        elif isinstance(s, Display):
+            evaluator = self.evaluator
+            return lambda: evaluator.execute([s])
+        else:
+            raise NotImplementedError
+
+    def compile_statements(self, statements):
+        compiled = tuple(self._compile_statement(s) for s in statements)
+        if not compiled:
+            return _noop
+        if len(compiled) == 1:
+            return compiled[0]
+        def execute():
+            for s in compiled:
+                s()
+        return execute
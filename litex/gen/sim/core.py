@@ -9,6 +9,8 @@
 # This file is Copyright (c) 2018 Robin Ole Heinemann <robin.ole.heinemann@t-online.de>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import heapq
+import math
 import operator
 import collections
 import inspect
@@ -19,14 +21,16 @@ from migen.fhdl.structure import (_Value, _Statement,
                                   _Operator, _Slice, _ArrayProxy,
                                   _Assign, _Fragment)
 from migen.fhdl.bitcontainer import value_bits_sign
-from migen.fhdl.tools import (list_targets, list_signals,
+from migen.fhdl.tools import (list_targets, list_signals, group_by_targets,
                               insert_resets, lower_specials)
+from migen.fhdl.visit import NodeVisitor
 from migen.fhdl.simplify import MemoryToArray
 from migen.fhdl.specials import _MemoryLocation
 from migen.fhdl.module import Module
 from migen.genlib.resetsync import AsyncResetSynchronizer
 
 from litex.gen.sim.vcd import VCDWriter, DummyVCDWriter
+from litex.gen.sim.compiler import StatementCompiler
 
 
 class ClockState:
@@ -37,6 +41,12 @@ class ClockState:
 
 
 class TimeManager:
+    # Clock edges are precomputed over one hyperperiod (LCM of the clock
+    # periods) and replayed from that table when it is small enough, or
+    # generated from a heap of next transition times otherwise. One-shot
+    # timers (generator delays) are kept in a second heap.
+    max_table_size = 4096
+
     def __init__(self, description):
         self.clocks = collections.OrderedDict()
 
@@ -54,21 +64,84 @@ class TimeManager:
                 high = False
             self.clocks[k] = ClockState(high, half_period, half_period - phase)
 
-    def tick(self):
-        rising = set()
-        falling = set()
-        dt = min(cs.time_before_trans for cs in self.clocks.values())
-        for k, cs in self.clocks.items():
-            if cs.time_before_trans == dt:
-                cs.high = not cs.high
-                if cs.high:
-                    rising.add(k)
+        self.now = 0
+        self.timers = []
+        self.timer_count = 0
+
+        hyperperiod = 1
+        for cs in self.clocks.values():
+            period = 2*cs.half_period
+            hyperperiod = hyperperiod*period//math.gcd(hyperperiod, period)
+        table_size = sum(hyperperiod//cs.half_period for cs in self.clocks.values())
+        self.edges = self._edges()
+        if table_size <= self.max_table_size:
+            # All clocks are back in their initial state after one
+            # hyperperiod: the edge pattern repeats with that period.
+            self.table = []
+            for edge in self.edges:
+                self.table.append(edge)
+                if edge[0] >= self.table[0][0] + hyperperiod:
+                    break
+            self.table_period = hyperperiod
+            self.table_base = 0
+            self.table_index = 0
+            self.table.pop()
+        else:
+            self.table = None
+        self._next_edge()
+
+    def _edges(self):
+        # (time, rising, falling) for every time at which clocks transition.
+        heap = [(cs.time_before_trans, n) for n, cs in enumerate(self.clocks.values())]
+        heapq.heapify(heap)
+        clocks = [(k, cs.half_period) for k, cs in self.clocks.items()]
+        high = [cs.high for cs in self.clocks.values()]
+        while True:
+            t = heap[0][0]
+            rising = []
+            falling = []
+            while heap and heap[0][0] == t:
+                _, n = heapq.heappop(heap)
+                k, half_period = clocks[n]
+                high[n] = not high[n]
+                if high[n]:
+                    rising.append(k)
                 else:
-                    falling.add(k)
-            cs.time_before_trans -= dt
-            if not cs.time_before_trans:
-                cs.time_before_trans += cs.half_period
-        return dt, rising, falling
+                    falling.append(k)
+                heapq.heappush(heap, (t + half_period, n))
+            yield t, tuple(sorted(rising)), tuple(sorted(falling))
+
+    def _next_edge(self):
+        if self.table is None:
+            self.edge = next(self.edges)
+        else:
+            t, rising, falling = self.table[self.table_index]
+            self.edge = (self.table_base + t, rising, falling)
+            self.table_index += 1
+            if self.table_index == len(self.table):
+                self.table_index = 0
+                self.table_base += self.table_period
+
+    def schedule(self, delay, event):
+        if delay < 0:
+            raise ValueError("Negative delay: {}".format(delay))
+        heapq.heappush(self.timers, (self.now + delay, self.timer_count, event))
+        self.timer_count += 1
+
+    def tick(self):
+        # Returns the time step and the clock domains with a rising/falling
+        # edge and the timer events due at the new time.
+        t, rising, falling = self.edge
+        if self.timers and self.timers[0][0] < t:
+            t, rising, falling = self.timers[0][0], (), ()
+        else:
+            self._next_edge()
+        events = []
+        while self.timers and self.timers[0][0] == t:
+            events.append(heapq.heappop(self.timers)[2])
+        dt = t - self.now
+        self.now = t
+        return dt, rising, falling, events
 
 
 str2op = {
@@ -101,34 +174,59 @@ def _truncate(value, nbits, signed):
 
 
 class Evaluator:
-    def __init__(self, clock_domains, replaced_memories):
+    def __init__(self, clock_domains, replaced_memories, signals=()):
         self.clock_domains = clock_domains
         self.replaced_memories = replaced_memories
-        self.signal_values = dict()
-        self.modifications = dict()
+        # Signals are given dense indices (in the order of signals, then on
+        # first access); values and pending modifications are kept in lists
+        # indexed by them, with a dirty flag per index and the list of dirty
+        # indices to commit.
+        self.signals = []
+        self.signal_index = dict()
+        self.signal_values = []
+        self.modifications = []
+        self.dirty = bytearray()
+        self.dirty_indices = []
+        for signal in signals:
+            self.index(signal)
+
+    def index(self, signal):
+        try:
+            return self.signal_index[signal]
+        except KeyError:
+            i = len(self.signals)
+            self.signal_index[signal] = i
+            self.signals.append(signal)
+            self.signal_values.append(signal.reset.value)
+            self.modifications.append(None)
+            self.dirty.append(0)
+            return i
 
     def commit(self):
-        r = set()
-        for k, v in self.modifications.items():
-            if k not in self.signal_values or self.signal_values[k] != v:
-                self.signal_values[k] = v
-                r.add(k)
-        self.modifications.clear()
+        r = []
+        values = self.signal_values
+        modifications = self.modifications
+        dirty = self.dirty
+        for i in self.dirty_indices:
+            dirty[i] = 0
+            v = modifications[i]
+            if values[i] != v:
+                values[i] = v
+                r.append(i)
+        self.dirty_indices.clear()
         return r
 
+    def value(self, signal):
+        return self.signal_values[self.index(signal)]
+
     def eval(self, node, postcommit=False):
         if isinstance(node, Constant):
             return node.value
         elif isinstance(node, Signal):
-            if postcommit:
-                try:
-                    return self.modifications[node]
-                except KeyError:
-                    pass
-            try:
-                return self.signal_values[node]
-            except KeyError:
-                return node.reset.value
+            i = self.index(node)
+            if postcommit and self.dirty[i]:
+                return self.modifications[i]
+            return self.signal_values[i]
         elif isinstance(node, _Operator):
             operands = [self.eval(o, postcommit) for o in node.operands]
             if node.op == "-":
@@ -181,8 +279,11 @@ class Evaluator:
     def assign(self, node, value):
         if isinstance(node, Signal):
             assert not node.variable
-            self.modifications[node] = _truncate(value,
-                                                 node.nbits, node.signed)
+            i = self.index(node)
+            self.modifications[i] = _truncate(value, node.nbits, node.signed)
+            if not self.dirty[i]:
+                self.dirty[i] = 1
+                self.dirty_indices.append(i)
         elif isinstance(node, Cat):
             for element in node.l:
                 nbits = len(element)
@@ -231,15 +332,101 @@ class Evaluator:
                 args = []
                 for arg in s.args:
                     assert isinstance(arg, _Value)
-                    try:
-                        args.append(self.signal_values[arg])
-                    except: # not yet evaluated
-                        args.append(arg.reset.value)
+                    args.append(self.eval(arg))
                 print(s.s %(*args,))
             else:
                 raise NotImplementedError
 
 
+class _SensitivityLister(NodeVisitor):
+    # Signals whose value a statement depends on: right-hand sides, conditions,
+    # Array keys (also on the target side), clock/reset signals and Display args.
+    def __init__(self, clock_domains, replaced_memories):
+        self.clock_domains = clock_domains
+        self.replaced_memories = replaced_memories
+        self.output_list = set()
+
+    def visit_Signal(self, node):
+        self.output_list.add(node)
+
+    def visit_ClockSignal(self, node):
+        self.output_list.add(self.clock_domains[node.cd].clk)
+
+    def visit_ResetSignal(self, node):
+        rst = self.clock_domains[node.cd].rst
+        if rst is not None:
+            self.output_list.add(rst)
+
+    def visit_Assign(self, node):
+        self.visit(node.r)
+        self.visit_target(node.l)
+
+    def visit_target(self, node):
+        if isinstance(node, Cat):
+            for element in node.l:
+                self.visit_target(element)
+        elif isinstance(node, _Slice):
+            self.visit_target(node.value)
+        elif isinstance(node, _ArrayProxy):
+            self.visit(node.key)
+            for choice in node.choices:
+                self.visit_target(choice)
+        elif isinstance(node, _MemoryLocation):
+            self.visit(node.index)
+
+    def visit_unknown(self, node):
+        if isinstance(node, Display):
+            for arg in node.args:
+                self.visit(arg)
+        elif isinstance(node, _MemoryLocation):
+            self.visit(node.index)
+            self.output_list |= set(self.replaced_memories[node.memory])
+
+
+def _topological_order(nodes, edges):
+    # Tarjan's strongly connected components, iterative to cope with deep
+    # comb chains. Components are emitted sinks first; return nodes sources
+    # first, nodes of a same component (comb loops) kept adjacent.
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(edges[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(edges[successor])))
+                    break
+                elif successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member is node:
+                            break
+                    components.append(sorted(component))
+    return [node for component in reversed(components) for node in component]
+
+
 class DummyAsyncResetSynchronizerImpl(Module):
     def __init__(self, cd, async_reset):
         # TODO: asynchronous set
@@ -256,8 +443,14 @@ class DummyAsyncResetSynchronizer:
 
 # TODO: instances via Iverilog/VPI
 class Simulator:
+    engines = ["interpretive", "compiled"]
+
     def __init__(self, fragment_or_module, generators, clocks={"sys": 10}, vcd_name=None,
-                 special_overrides={}):
+                 special_overrides={}, engine="interpretive"):
+        if engine not in self.engines:
+            raise ValueError("Unknown simulation engine: '{}' (available: {})"
+                             .format(engine, ", ".join(self.engines)))
+
         if isinstance(fragment_or_module, _Fragment):
             self.fragment = fragment_or_module
         else:
@@ -276,6 +469,7 @@ class Simulator:
             generators = {"sys": generators}
         self.generators = dict()
         self.passive_generators = set()
+        self.delayed_generators = set()
         for k, v in generators.items():
             if (isinstance(v, collections.abc.Iterable)
                     and not inspect.isgenerator(v)):
@@ -293,27 +487,74 @@ class Simulator:
                 self.fragment.clock_domains.append(cd)
 
         insert_resets(self.fragment)
-        # comb signals return to their reset value if nothing assigns them
-        self.fragment.comb[0:0] = [s.eq(s.reset)
-                                   for s in list_targets(self.fragment.comb)]
+
+        signals = list_signals(self.fragment)
+        for cd in self.fragment.clock_domains:
+            signals.add(cd.clk)
+            if cd.rst is not None:
+                signals.add(cd.rst)
+        for memory_array in mta.replacements.values():
+            signals |= set(memory_array)
+        signals = sorted(signals, key=lambda x: x.duid)
         self.evaluator = Evaluator(self.fragment.clock_domains,
-                                   mta.replacements)
+                                   mta.replacements, signals)
+
+        # comb statements are grouped by target; each group is only re-run
+        # when one of the signals it reads (or drives, for generator writes)
+        # changes, in topological order of the group dependency graph.
+        groups = []
+        for targets, statements in group_by_targets(self.fragment.comb):
+            targets = sorted(targets, key=lambda x: x.duid)
+            # comb signals return to their reset value if nothing assigns them
+            groups.append((targets, [t.eq(t.reset) for t in targets] + statements))
+        readers = collections.defaultdict(set)
+        drivers = dict()
+        for n, (targets, statements) in enumerate(groups):
+            lister = _SensitivityLister(self.fragment.clock_domains, mta.replacements)
+            lister.visit(statements)
+            for signal in lister.output_list:
+                readers[signal].add(n)
+            for signal in targets:
+                drivers[signal] = n
+        edges = [set() for _ in groups]
+        for signal, n in drivers.items():
+            edges[n] |= readers.get(signal, set())
+        order = _topological_order(range(len(groups)), edges)
+        rank = {n: r for r, n in enumerate(order)}
+        groups = [groups[n] for n in order]
+        # indexed by the evaluator's signal indices
+        index = self.evaluator.index
+        self._comb_readers = [()]*len(signals)
+        for signal, ns in readers.items():
+            self._comb_readers[index(signal)] = tuple(sorted(rank[n] for n in ns))
+        self._comb_drivers = [None]*len(signals)
+        for signal, n in drivers.items():
+            self._comb_drivers[index(signal)] = rank[n]
+
+        # comb/sync statements are either re-walked by the Evaluator on every
+        # delta cycle or compiled once to closures and reused for the whole run.
+        if engine == "compiled":
+            compiler = StatementCompiler(self.evaluator)
+            self._execute_comb = [compiler.compile_statements(statements)
+                                  for targets, statements in groups]
+            self._execute_sync = {cd: compiler.compile_statements(statements)
+                                  for cd, statements in self.fragment.sync.items()}
+        else:
+            evaluator = self.evaluator
+            self._execute_comb = [(lambda statements=statements: evaluator.execute(statements))
+                                  for targets, statements in groups]
+            self._execute_sync = {cd: (lambda statements=statements: evaluator.execute(statements))
+                                  for cd, statements in self.fragment.sync.items()}
 
+        # vcd_name is a filename or a VCDWriter (for signal filters/time window)
         if vcd_name is None:
             self.vcd = DummyVCDWriter()
         else:
-            self.vcd = VCDWriter(vcd_name)
-
-            signals = list_signals(self.fragment)
-            for cd in self.fragment.clock_domains:
-                signals.add(cd.clk)
-                if cd.rst is not None:
-                    signals.add(cd.rst)
-            for memory_array in mta.replacements.values():
-                signals |= set(memory_array)
+            if isinstance(vcd_name, VCDWriter):
+                self.vcd = vcd_name
+            else:
+                self.vcd = VCDWriter(vcd_name)
             self.vcd.init(signals)
-            for signal in sorted(signals, key=lambda x: x.duid):
-                self.vcd.set(signal, signal.reset.value)
 
     def __enter__(self):
         return self
@@ -324,17 +565,42 @@ class Simulator:
     def close(self):
         self.vcd.close()
 
-    def _commit_and_comb_propagate(self):
-        # TODO: optimize
-        all_modified = set()
+    def _commit_and_comb_propagate(self, queue=None):
+        readers = self._comb_readers
+        drivers = self._comb_drivers
+        nsignals = len(readers)
+        execute = self._execute_comb
+        queue = [] if queue is None else queue
+        queued = set(queue)
+        heapq.heapify(queue)
+
         modified = self.evaluator.commit()
-        all_modified |= modified
-        while modified:
-            self.evaluator.execute(self.fragment.comb)
+        all_modified = set(modified)
+        for i in modified:
+            # a comb-driven signal written from outside (e.g. by a generator)
+            # is re-driven by its group, as a full comb re-execution would do
+            n = drivers[i] if i < nsignals else None
+            if n is not None and n not in queued:
+                queued.add(n)
+                heapq.heappush(queue, n)
+        while True:
+            for i in modified:
+                if i < nsignals:
+                    for n in readers[i]:
+                        if n not in queued:
+                            queued.add(n)
+                            heapq.heappush(queue, n)
+            if not queue:
+                break
+            n = heapq.heappop(queue)
+            queued.discard(n)
+            execute[n]()
             modified = self.evaluator.commit()
-            all_modified |= modified
-        for signal in all_modified:
-            self.vcd.set(signal, self.evaluator.signal_values[signal])
+            all_modified.update(modified)
+        signals = self.evaluator.signals
+        values = self.evaluator.signal_values
+        for i in all_modified:
+            self.vcd.set(signals[i], values[i])
 
     def _evalexec_nested_lists(self, x):
         if isinstance(x, list):
@@ -347,60 +613,87 @@ class Simulator:
         else:
             raise ValueError
 
-    def _process_generators(self, cd):
-        exhausted = []
-        for generator in self.generators[cd]:
-            reply = None
-            while True:
-                try:
-                    request = generator.send(reply)
-                    if request is None:
-                        break  # next cycle
-                    elif isinstance(request, str):
-                        if request == "passive":
-                            self.passive_generators.add(generator)
-                        elif request == "active":
-                            self.passive_generators.discard(generator)
-                        else:
-                            raise ValueError("Unknown simulator command: '{}'"
-                                             .format(request))
+    def _process_generator(self, cd, generator):
+        # Runs generator until it waits for the next cycle (returns True),
+        # waits for a delay or is exhausted (returns False).
+        reply = None
+        while True:
+            try:
+                request = generator.send(reply)
+                if request is None:
+                    return True  # next cycle
+                elif isinstance(request, str):
+                    if request == "passive":
+                        self.passive_generators.add(generator)
+                    elif request == "active":
+                        self.passive_generators.discard(generator)
                     else:
-                        reply = self._evalexec_nested_lists(request)
-                except StopIteration:
-                    exhausted.append(generator)
-                    break
-        for generator in exhausted:
-            self.generators[cd].remove(generator)
+                        raise ValueError("Unknown simulator command: '{}'"
+                                         .format(request))
+                elif isinstance(request, tuple):
+                    if request[0] == "delay":
+                        # resumed by the TimeManager after the delay, outside
+                        # of any clock edge, then back to cd's cycles
+                        self.time.schedule(request[1], (cd, generator))
+                        self.delayed_generators.add(generator)
+                        return False
+                    else:
+                        raise ValueError("Unknown simulator command: '{}'"
+                                         .format(request[0]))
+                else:
+                    reply = self._evalexec_nested_lists(request)
+            except StopIteration:
+                return False
+
+    def _process_generators(self, cd):
+        self.generators[cd] = [generator for generator in self.generators[cd]
+                               if self._process_generator(cd, generator)]
+
+    def _process_delayed(self, cd, generator):
+        self.delayed_generators.discard(generator)
+        if self._process_generator(cd, generator):
+            self.generators[cd].append(generator)
 
     def _continue_simulation(self):
+        if self.delayed_generators - self.passive_generators:
+            return True
         for cd_generators in self.generators.values():
             if set(cd_generators) - self.passive_generators:
                 return True
         return False
 
     def run(self):
-        self.evaluator.execute(self.fragment.comb)
-        self._commit_and_comb_propagate()
+        self._commit_and_comb_propagate(list(range(len(self._execute_comb))))
 
         while True:
-            dt, rising, falling = self.time.tick()
+            dt, rising, falling, events = self.time.tick()
             self.vcd.delay(dt)
             for cd in rising:
                 self.evaluator.assign(self.fragment.clock_domains[cd].clk, 1)
-                if cd in self.fragment.sync:
-                    self.evaluator.execute(self.fragment.sync[cd])
+                if cd in self._execute_sync:
+                    self._execute_sync[cd]()
                 if cd in self.generators:
                     self._process_generators(cd)
             for cd in falling:
                 self.evaluator.assign(self.fragment.clock_domains[cd].clk, 0)
+            for cd, generator in events:
+                self._process_delayed(cd, generator)
             self._commit_and_comb_propagate()
 
             if not self._continue_simulation():
                 break
 
 
-def run_simulation(*args, **kwargs):
-    with Simulator(*args, **kwargs) as s:
+def run_simulation(*args, backend="python", **kwargs):
+    # backend: "python" (Simulator) or "verilator" (VerilatorSimulator, same generators).
+    if backend == "python":
+        simulator = Simulator
+    elif backend == "verilator":
+        from litex.gen.sim.verilator import VerilatorSimulator as simulator
+    else:
+        raise ValueError("Unknown simulation backend: '{}' (available: python, verilator)"
+                         .format(backend))
+    with simulator(*args, **kwargs) as s:
         s.run()
 
 
@@ -7,10 +7,11 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 from itertools import count
-import tempfile
+from fnmatch import fnmatchcase
+import gzip
 import os
-from collections import OrderedDict
 import shutil
+import subprocess
 
 from migen.fhdl.namer import build_namespace
 
@@ -26,89 +27,188 @@ def vcd_codes():
         yield code
 
 
-class VCDWriter:
-    def __init__(self, filename):
-        self.filename = filename
-        self.out_file = None
-        self.buffer_file = tempfile.TemporaryFile(
-            dir=os.path.dirname(filename), mode="w+")
-        self.initialized = False
-        self.codegen = vcd_codes()
-        self.codes = OrderedDict()
-        self.signal_values = dict()
-        self.t = 0
-
-    def _write_value(self, signal, value):
-        l = len(signal)
-        if value < 0:
-            value += 2**l
-        if l > 1:
-            fmtstr = "b{:0" + str(l) + "b} {}\n"
-        else:
-            fmtstr = "{}{}\n"
-        try:
-            code = self.codes[signal]
-        except KeyError:
-            code = next(self.codegen)
-            self.codes[signal] = code
-            self.init(self.codes.keys())
+def _value_formatter(nbits, code):
+    # Precomputed per-signal template, returns the VCD value change line.
+    if nbits > 1:
+        spec   = "0" + str(nbits) + "b"
+        suffix = " " + code + "\n"
+        limit  = 2**nbits
+        def formatter(value):
+            if value < 0:
+                value += limit
+            return "b" + format(value, spec) + suffix
+    else:
+        lines = ("0" + code + "\n", "1" + code + "\n")
+        def formatter(value):
+            return lines[value & 1]
+    return formatter
 
-        return fmtstr.format(value, code)
 
-    def _write(self, s):
-        self.out_file.write(s)
-        self.buffer_file.write(s)
-
-    def init(self, signals):
-        self.out_file = open(self.filename, "w")
-
-        # generate codes
-        for signal in signals:
-            try:
-                code = self.codes[signal]
-            except KeyError:
-                code = next(self.codegen)
-                self.codes[signal] = code
-
-        # write vcd header
-        header = ""
-        ns = build_namespace(self.codes.keys())
+class VCDWriter:
+    """Value Change Dump writer for the LiteX simulator.
+
+    Value changes are buffered in memory and written in chunks. Output is gzip-compressed when
+    filename ends with ".gz" and converted to FST (with GTKWave's vcd2fst) when it ends with ".fst".
+
+    Parameters
+    ----------
+    filename : str
+        Output file.
+    include : list of str, None
+        Glob patterns on signal names, only matching signals are dumped (default: all).
+    exclude : list of str, None
+        Glob patterns on signal names, matching signals are not dumped.
+    start : int, None
+        Simulation time at which dumping starts (default: 0).
+    end : int, None
+        Simulation time after which dumping stops (default: end of simulation).
+    chunk_size : int
+        Number of buffered value changes before writing them to the file.
+    """
+    def __init__(self, filename, include=None, exclude=None, start=None, end=None, chunk_size=8192):
+        self.filename   = filename
+        self.include    = include
+        self.exclude    = exclude
+        self.start      = 0 if start is None else start
+        self.end        = end
+        self.chunk_size = chunk_size
+        if filename.endswith(".fst"):
+            if shutil.which("vcd2fst") is None:
+                raise OSError("vcd2fst (from GTKWave) is required to write FST files.")
+            self.vcd_filename = filename[:-len(".fst")] + ".vcd"
+        else:
+            self.vcd_filename = filename
+        self.out_file = None
+        self.codegen  = vcd_codes()
+        self.codes    = dict()
+        self.names    = dict()
+        self.entries  = dict() # signal -> [value, formatter] or None when filtered out.
+        self.late     = False  # Signals were added after the header was written.
+        self.chunks   = []
+        self.t        = 0
+        self.written_t   = None
+        self.dumpvars    = dict()
+        self.recording   = False
+        self.body_offset = 0
+
+    def _open(self, filename, mode):
+        if filename.endswith(".gz"):
+            return gzip.open(filename, mode + "t")
+        return open(filename, mode)
+
+    def _filtered(self, name):
+        if self.include is not None and not any(fnmatchcase(name, p) for p in self.include):
+            return True
+        if self.exclude is not None and any(fnmatchcase(name, p) for p in self.exclude):
+            return True
+        return False
+
+    def _add(self, signal, name):
+        if self._filtered(name):
+            self.entries[signal] = None
+            return None
+        code = next(self.codegen)
+        self.codes[signal] = code
+        self.names[signal] = name
+        entry = [signal.reset.value, _value_formatter(len(signal), code)]
+        self.entries[signal] = entry
+        if self.out_file is not None:
+            self.late = True
+        return entry
+
+    def _header(self):
+        header = []
         for signal, code in self.codes.items():
-            name = ns.get_name(signal)
-            header += "$var wire {len} {code} {name} $end\n".format(name=name, code=code, len=len(signal))
-        header += "$dumpvars\n"
+            header.append("$var wire {len} {code} {name} $end\n".format(
+                name=self.names[signal], code=code, len=len(signal)))
+        header.append("$dumpvars\n")
         for signal in self.codes.keys():
-            header += self._write_value(signal, signal.reset.value)
-        header += "$end\n"
+            value = self.dumpvars.get(signal, signal.reset.value)
+            header.append(self.entries[signal][1](value))
+        header.append("$end\n")
+        return "".join(header)
+
+    def _flush(self):
+        if self.chunks:
+            self.out_file.write("".join(self.chunks))
+            self.chunks.clear()
+
+    def _timestamp(self, t):
+        if self.written_t != t:
+            self.chunks.append("#{}\n".format(t))
+            self.written_t = t
+
+    def _begin(self):
+        # Window start: write the header with the current values as $dumpvars.
+        self.recording = True
+        self.dumpvars  = {signal: entry[0] for signal, entry in self.entries.items()
+            if entry is not None}
+        self.out_file  = self._open(self.vcd_filename, "w")
+        header = self._header()
+        self.body_offset = len(header)
         self.out_file.write(header)
+        self._timestamp(self.t)
 
-        if self.initialized:
-            self.buffer_file.seek(0)
-            shutil.copyfileobj(self.buffer_file, self.out_file)
-            self.buffer_file.seek(0, 2)
-        else:
-            # init time
-            self._write("#0\n")
-
-        self.initialized = True
+    def init(self, signals):
+        ns = build_namespace(signals)
+        for signal in signals:
+            if signal not in self.entries:
+                self._add(signal, ns.get_name(signal))
+        if self.start <= 0:
+            self._begin()
 
     def set(self, signal, value):
-        if (signal not in self.signal_values
-                or self.signal_values[signal] != value):
-            self._write(self._write_value(signal, value))
-            self.signal_values[signal] = value
+        try:
+            entry = self.entries[signal]
+        except KeyError:
+            entry = self._add(signal, build_namespace([signal]).get_name(signal))
+        if entry is None or entry[0] == value:
+            return
+        entry[0] = value
+        if self.recording:
+            if self.written_t != self.t:
+                self._timestamp(self.t)
+            self.chunks.append(entry[1](value))
+            if len(self.chunks) >= self.chunk_size:
+                self._flush()
 
     def delay(self, delay):
         self.t += delay
-        self._write("#{}\n".format(self.t))
+        if self.end is not None and self.t > self.end:
+            if self.recording:
+                # Window end: mark it and stop dumping.
+                self.recording = False
+                self._timestamp(self.end)
+        elif self.out_file is None and self.t >= self.start:
+            self._begin()
+
+    def _rewrite_header(self):
+        # Signals first seen after the header was written: re-emit the header and copy the body.
+        tmp_filename = self.vcd_filename + ".tmp"
+        with self._open(self.vcd_filename, "r") as old, self._open(tmp_filename, "w") as new:
+            old.read(self.body_offset)
+            new.write(self._header())
+            shutil.copyfileobj(old, new, 1 << 20)
+        os.replace(tmp_filename, self.vcd_filename)
 
     def close(self):
+        if self.out_file is None:
+            # Window never reached: still produce a (header only) file.
+            self.out_file = self._open(self.vcd_filename, "w")
+            self.out_file.write(self._header())
+        elif self.recording:
+            self._timestamp(self.t)
+        self._flush()
         self.out_file.close()
-        self.buffer_file.close()
+        if self.late:
+            self._rewrite_header()
+        if self.vcd_filename != self.filename:
+            subprocess.check_call(["vcd2fst", self.vcd_filename, self.filename])
+            os.remove(self.vcd_filename)
 
 
 class DummyVCDWriter:
-    def init(self):
+    def init(self, signals):
         pass
 
     def set(self, signal, value):
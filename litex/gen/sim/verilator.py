@@ -0,0 +1,394 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Verilator backend of run_simulation: the fragment is converted to Verilog, compiled with Verilator
+# to a shared library (with a small C++ shim giving VPI access to all the signals by name) and driven
+# from the generators through ctypes, with the generator protocol and timing of the Python Simulator.
+
+import os
+import ctypes
+import shutil
+import inspect
+import hashlib
+import operator
+import tempfile
+import subprocess
+import collections
+import multiprocessing
+from shutil import which
+
+from migen.fhdl.structure import *
+from migen.fhdl.structure import _Fragment
+from migen.fhdl.specials import _MemoryLocation
+from migen.genlib.resetsync import AsyncResetSynchronizer
+
+from litex.gen.fhdl.verilog import convert
+from litex.gen.sim.core import (Simulator, TimeManager, Evaluator, DummyAsyncResetSynchronizer,
+                                _truncate)
+from litex.gen.sim.vcd import VCDWriter
+
+# Shim ---------------------------------------------------------------------------------------------
+
+_shim = """\
+#include <stdint.h>
+#include <vector>
+#include "Vsim.h"
+#include "verilated.h"
+#include "verilated_vpi.h"
+#ifdef SIM_TRACE
+#include "verilated_vcd_c.h"
+#endif
+
+static VerilatedContext *context;
+static Vsim *top;
+#ifdef SIM_TRACE
+static VerilatedVcdC *tfp;
+#endif
+
+double sc_time_stamp() {
+    return context ? context->time() : 0;
+}
+
+extern "C" {
+
+void sim_init(const char *vcd) {
+    context = new VerilatedContext;
+    top     = new Vsim{context};
+#ifdef SIM_TRACE
+    if (vcd) {
+        context->traceEverOn(true);
+        tfp = new VerilatedVcdC;
+        top->trace(tfp, 99);
+        tfp->open(vcd);
+    }
+#endif
+}
+
+void *sim_handle(const char *name) {
+    return vpi_handle_by_name((PLI_BYTE8 *)name, NULL);
+}
+
+void *sim_handle_by_index(void *handle, int index) {
+    return vpi_handle_by_index((vpiHandle)handle, index);
+}
+
+void sim_read(void *handle, uint32_t *words, int n) {
+    s_vpi_value value;
+    value.format = vpiVectorVal;
+    vpi_get_value((vpiHandle)handle, &value);
+    for (int i = 0; i < n; i++)
+        words[i] = value.value.vector[i].aval;
+}
+
+void sim_write(void *handle, const uint32_t *words, int n) {
+    std::vector<s_vpi_vecval> vector(n);
+    s_vpi_value value;
+    for (int i = 0; i < n; i++) {
+        vector[i].aval = words[i];
+        vector[i].bval = 0;
+    }
+    value.format       = vpiVectorVal;
+    value.value.vector = vector.data();
+    vpi_put_value((vpiHandle)handle, &value, NULL, vpiNoDelay);
+}
+
+void sim_eval(uint64_t time) {
+    context->time(time);
+    top->eval();
+#ifdef SIM_TRACE
+    if (tfp)
+        tfp->dump(time);
+#endif
+}
+
+void sim_final(void) {
+    top->final();
+#ifdef SIM_TRACE
+    if (tfp) {
+        tfp->close();
+        delete tfp;
+        tfp = NULL;
+    }
+#endif
+    delete top;
+    delete context;
+    top     = NULL;
+    context = NULL;
+}
+
+}
+"""
+
+# Build --------------------------------------------------------------------------------------------
+
+def _build(verilog, trace, cache_dir):
+    # Builds are cached in cache_dir by content (Verilog, memory init files, shim, flags, Verilator
+    # version): testbenches re-run with an unchanged design don't recompile it.
+    from litex.build.sim.verilator import _verilator_version
+    if which("verilator") is None:
+        raise OSError("Unable to find Verilator, please install it or use the Python backend.")
+    h = hashlib.sha256()
+    for content in [verilog.main_source, _shim, repr(trace), _verilator_version()]:
+        h.update(content.encode() + b"\0")
+    for filename, content in sorted(verilog.data_files.items()):
+        h.update(filename.encode() + b"\0" + content.encode() + b"\0")
+    build_dir = os.path.join(cache_dir, h.hexdigest()[:32])
+    library   = os.path.join(build_dir, "obj_dir", "libsim.so")
+    if os.path.exists(library):
+        return build_dir
+
+    # Build in a temporary directory, published when complete (concurrent test runs).
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        with open(os.path.join(tmp, "sim.v"), "w") as f:
+            f.write(verilog.main_source)
+        for filename, content in verilog.data_files.items():
+            with open(os.path.join(tmp, filename), "w") as f:
+                f.write(content)
+        with open(os.path.join(tmp, "shim.cpp"), "w") as f:
+            f.write(_shim)
+        cmd = ["verilator", "--cc", "sim.v", "--exe", "shim.cpp", "--top-module", "sim",
+            "--vpi", "--public-flat-rw", "-Wno-fatal", "-Wno-lint", "-Wno-style",
+            "--x-assign", "0", "--x-initial", "0",
+            "-CFLAGS", "-fPIC", "-LDFLAGS", "-shared", "-o", "libsim.so"]
+        if trace:
+            cmd += ["--trace", "-CFLAGS", "-DSIM_TRACE"]
+        for cmd in [cmd, ["make", "-C", "obj_dir", "-f", "Vsim.mk", "-j{}".format(multiprocessing.cpu_count())]]:
+            p = subprocess.run(cmd, cwd=tmp, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if p.returncode != 0:
+                raise OSError("Verilator build failed:\n{}".format(p.stdout.decode()))
+        try:
+            os.rename(tmp, build_dir)
+        except OSError:
+            pass # Built concurrently.
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return build_dir
+
+# Model --------------------------------------------------------------------------------------------
+
+class _VerilatedModel:
+    def __init__(self, build_dir, vcd_name=None):
+        self.lib = lib = ctypes.CDLL(os.path.join(build_dir, "obj_dir", "libsim.so"))
+        lib.sim_init.argtypes            = [ctypes.c_char_p]
+        lib.sim_handle.argtypes          = [ctypes.c_char_p]
+        lib.sim_handle.restype           = ctypes.c_void_p
+        lib.sim_handle_by_index.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.sim_handle_by_index.restype  = ctypes.c_void_p
+        lib.sim_read.argtypes            = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        lib.sim_write.argtypes           = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        lib.sim_eval.argtypes            = [ctypes.c_uint64]
+        self.buffers = {}
+        # Memories are initialized from their data files (relative to the build directory) by the
+        # first evaluation.
+        cwd = os.getcwd()
+        vcd = None if vcd_name is None else os.path.abspath(vcd_name).encode()
+        os.chdir(build_dir)
+        try:
+            lib.sim_init(vcd)
+            lib.sim_eval(0)
+        finally:
+            os.chdir(cwd)
+
+    def handle(self, name):
+        # Top module scope naming differs between Verilator versions.
+        for path in ["sim." + name, "TOP.sim." + name]:
+            handle = self.lib.sim_handle(path.encode())
+            if handle:
+                return handle
+        raise KeyError("Signal {} not found in the Verilated model".format(name))
+
+    def handle_by_index(self, handle, index):
+        return self.lib.sim_handle_by_index(handle, index)
+
+    def _buffer(self, nbits):
+        n = (nbits + 31)//32
+        try:
+            return self.buffers[n]
+        except KeyError:
+            buffer = self.buffers[n] = (ctypes.c_uint32*n)()
+            return buffer
+
+    def read(self, handle, nbits):
+        buffer = self._buffer(nbits)
+        self.lib.sim_read(handle, buffer, len(buffer))
+        return sum(w << 32*i for i, w in enumerate(buffer))
+
+    def write(self, handle, nbits, value):
+        buffer = self._buffer(nbits)
+        for i in range(len(buffer)):
+            buffer[i] = (value >> 32*i) & 0xffffffff
+        self.lib.sim_write(handle, buffer, len(buffer))
+
+    def eval(self, time):
+        self.lib.sim_eval(time)
+
+    def close(self):
+        self.lib.sim_final()
+
+# Evaluator ----------------------------------------------------------------------------------------
+
+class _VerilatorEvaluator(Evaluator):
+    # Values of the signals of the design are read from the model, the others (only used by the
+    # generators) are kept here. Generator writes are pending until commit, as for the Python
+    # Simulator.
+    def __init__(self, clock_domains, model, ns):
+        Evaluator.__init__(self, clock_domains, dict())
+        self.model   = model
+        self.ns      = ns
+        self.handles = dict()
+        self.values  = dict()
+        self.pending = dict()
+
+    def handle(self, node):
+        try:
+            return self.handles[node]
+        except KeyError:
+            if isinstance(node, tuple):
+                memory, index = node
+                handle = self.model.handle_by_index(self.handle(memory), index)
+                if not handle:
+                    raise IndexError("Memory {} has no location {}".format(memory.name_override, index))
+            elif isinstance(node, Signal) and node not in self.ns.pnd:
+                handle = None
+            else:
+                handle = self.model.handle(self.ns.get_name(node))
+            self.handles[node] = handle
+            return handle
+
+    def read(self, node, nbits, signed):
+        handle = self.handle(node)
+        if handle is None:
+            return self.values.get(node, node.reset.value)
+        return _truncate(self.model.read(handle, nbits), nbits, signed)
+
+    def eval(self, node, postcommit=False):
+        if isinstance(node, Signal):
+            if postcommit and node in self.pending:
+                return self.pending[node]
+            return self.read(node, node.nbits, node.signed)
+        elif isinstance(node, _MemoryLocation):
+            location = (node.memory, self.eval(node.index, postcommit))
+            if postcommit and location in self.pending:
+                return self.pending[location]
+            return self.read(location, node.memory.width, False)
+        return Evaluator.eval(self, node, postcommit)
+
+    def assign(self, node, value):
+        if isinstance(node, Signal):
+            assert not node.variable
+            self.pending[node] = _truncate(value, node.nbits, node.signed)
+        elif isinstance(node, _MemoryLocation):
+            location = (node.memory, self.eval(node.index))
+            self.pending[location] = _truncate(value, node.memory.width, False)
+        else:
+            Evaluator.assign(self, node, value)
+
+    def commit(self):
+        for node, value in self.pending.items():
+            handle = self.handle(node)
+            if handle is None:
+                self.values[node] = value
+            else:
+                nbits = node[0].width if isinstance(node, tuple) else node.nbits
+                self.model.write(handle, nbits, value)
+        self.pending.clear()
+
+# Simulator ----------------------------------------------------------------------------------------
+
+class VerilatorSimulator(Simulator):
+    """Simulator running the design compiled with Verilator.
+
+    Generators are handled as with the Python Simulator (same protocol and timing); simultaneous
+    edges of several clock domains follow the Verilog scheduling. The builds are cached in cache_dir
+    (default: $LITEX_SIM_CACHE_DIR or a directory in the system temporary directory).
+    """
+    def __init__(self, fragment_or_module, generators, clocks={"sys": 10}, vcd_name=None,
+                 special_overrides={}, cache_dir=None):
+        if isinstance(fragment_or_module, _Fragment):
+            self.fragment = fragment_or_module
+        else:
+            self.fragment = fragment_or_module.get_fragment()
+        if isinstance(vcd_name, VCDWriter):
+            raise ValueError("The Verilator backend only supports VCD filenames")
+
+        if not isinstance(generators, dict):
+            generators = {"sys": generators}
+        self.generators = dict()
+        self.passive_generators = set()
+        self.delayed_generators = set()
+        for k, v in generators.items():
+            if (isinstance(v, collections.abc.Iterable)
+                    and not inspect.isgenerator(v)):
+                self.generators[k] = list(v)
+            else:
+                self.generators[k] = [v]
+
+        clocks = collections.OrderedDict(sorted(clocks.items(),
+                                                key=operator.itemgetter(0)))
+        self.time = TimeManager(clocks)
+        for clock in clocks.keys():
+            if clock not in self.fragment.clock_domains:
+                cd = ClockDomain(name=clock, reset_less=True)
+                cd.clk.reset = C(self.time.clocks[clock].high)
+                self.fragment.clock_domains.append(cd)
+
+        # Clocks and resets are the inputs of the model, all the other signals are accessed through
+        # VPI (as the memories).
+        ios = set()
+        for cd in self.fragment.clock_domains:
+            ios.add(cd.clk)
+            if cd.rst is not None:
+                ios.add(cd.rst)
+        overrides = {AsyncResetSynchronizer: DummyAsyncResetSynchronizer}
+        overrides.update(special_overrides)
+        verilog = convert(self.fragment, ios, name="sim",
+            special_overrides    = overrides,
+            create_clock_domains = False,
+            reproducible         = True)
+
+        if cache_dir is None:
+            cache_dir = os.environ.get("LITEX_SIM_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "litex_sim_verilator"))
+        build_dir = _build(verilog, vcd_name is not None, cache_dir)
+        self.model     = _VerilatedModel(build_dir, vcd_name)
+        self.evaluator = _VerilatorEvaluator(self.fragment.clock_domains, self.model, verilog.ns)
+        for cd in self.fragment.clock_domains:
+            self.evaluator.assign(cd.clk, self.time.clocks[cd.name].high if cd.name in clocks else 0)
+        self._commit_and_eval()
+
+    def close(self):
+        if self.model is not None:
+            self.model.close()
+            self.model = None
+
+    def _commit_and_eval(self):
+        self.evaluator.commit()
+        self.model.eval(self.time.now)
+
+    def run(self):
+        while True:
+            dt, rising, falling, events = self.time.tick()
+            # Generators see the values before the edges, their writes are applied after the sync
+            # logic of the edges.
+            for cd in rising:
+                if cd in self.generators:
+                    self._process_generators(cd)
+            for cd, generator in events:
+                self._process_delayed(cd, generator)
+            pending = self.evaluator.pending
+            self.evaluator.pending = dict()
+            for cd in rising:
+                self.evaluator.assign(self.fragment.clock_domains[cd].clk, 1)
+            for cd in falling:
+                self.evaluator.assign(self.fragment.clock_domains[cd].clk, 0)
+            self._commit_and_eval()
+            if pending:
+                self.evaluator.pending = pending
+                self._commit_and_eval()
+
+            if not self._continue_simulation():
+                break
@@ -6,8 +6,10 @@
 
 import logging
 import math
+import functools
 
-from migen import Record
+from migen import Record, ClockDomain
+from migen.fhdl.structure import _Value
 
 from litex.soc.integration.soc import colorer
 
@@ -56,3 +58,68 @@ def clkdiv_range(start, stop, step=1):
     while current < stop:
         yield int(current) if math.floor(current) == current else current
         current += step
+
+def clkdiv_lookup(vco_freq, freq, margin, d_range, best=False):
+    """Find the divider of clkdiv_range(*d_range) generating freq (+-margin) from vco_freq.
+
+    Return (d, clk_freq) for the first valid divider (or the one with the lowest error when best is
+    set), None if there is none. The search starts from vco_freq/freq instead of the range start.
+    """
+    start, stop, step = [float(v) for v in (tuple(d_range) + (1,))[:3]]
+    k = max(0, math.floor((vco_freq/(freq*(1 + margin)) - start)/step) - 1)
+    r = None
+    while start + k*step < stop:
+        d        = start + k*step
+        clk_freq = vco_freq/d
+        error    = abs(clk_freq - freq)
+        if error <= freq*margin:
+            if not best:
+                return (int(d) if math.floor(d) == d else d, clk_freq)
+            if r is None or error < abs(r[1] - freq):
+                r = (int(d) if math.floor(d) == d else d, clk_freq)
+        elif clk_freq < freq:
+            break
+        k += 1
+    return r
+
+def config_error(config, clkouts, fmt):
+    """Total error (in ppm) of the clkouts frequencies of config (fmt: name of clkout freqs)."""
+    return sum(abs(config[fmt.format(n)] - clkout[1])/clkout[1]*1e6
+        for n, clkout in clkouts.items() if fmt.format(n) in config)
+
+# Config Cache -------------------------------------------------------------------------------------
+
+_configs = {}
+
+def clear_config_cache():
+    """Forget the configs computed so far (tests, sweeps over PLL constraints)."""
+    _configs.clear()
+
+def _config_key(v):
+    # Signals, ClockDomains, loggers, etc. are unique per elaboration: only their type matters.
+    if isinstance(v, (bool, int, float, str, type(None))):
+        return v
+    if isinstance(v, (tuple, list)):
+        return tuple(_config_key(e) for e in v)
+    if isinstance(v, dict):
+        return tuple(sorted(((repr(k), _config_key(e)) for k, e in v.items()), key=lambda i: i[0]))
+    if isinstance(v, (_Value, ClockDomain, logging.Logger)):
+        return type(v).__name__
+    return repr(v)
+
+def cached_config(compute_config):
+    """Memoize compute_config on the PLL type and all its public attributes (clkin, clkouts, ...).
+
+    SoCs elaborated several times (sweeps, variants) share the same configs: only the first one is
+    computed. Use clear_config_cache to start from an empty cache.
+    """
+    @functools.wraps(compute_config)
+    def wrapper(self):
+        key = (type(self), _config_key({k: v for k, v in vars(self).items()
+            if not k.startswith("_")}))
+        if key not in _configs:
+            _configs[key] = compute_config(self)
+        config = dict(_configs[key])
+        compute_config_log(self.logger, config)
+        return config
+    return wrapper
@@ -51,6 +51,7 @@ class GW1NSRPLL(Module):
         create_clkout_log(self.logger, cd.name, freq, margin, self.nclkouts)
         self.nclkouts += 1
 
+    @cached_config
     def compute_config(self):
         config = {}
         for idiv in range(1, 64):
@@ -61,19 +62,20 @@ class GW1NSRPLL(Module):
                 continue
             for fdiv in range(1, 64):
                 out_freq = self.clkin_freq*fdiv/idiv
+                # Output frequency does not depend on ODIV: skip ODIVs when not valid.
+                outs = [_n for _n, (clk, f, p, _m) in sorted(self.clkouts.items()) if abs(out_freq - f) <= f*_m]
+                if not outs:
+                    continue
                 for odiv in [2, 4, 8, 16, 32, 48, 64, 80, 96, 112, 128]:
                     config["odiv"] = odiv
                     vco_freq = out_freq*odiv
                     (vco_freq_min, vco_freq_max) = self.vco_freq_range
                     if (vco_freq >= vco_freq_min*(1 + self.vco_margin) and
                         vco_freq <= vco_freq_max*(1 - self.vco_margin)):
-                            for _n, (clk, f, p, _m) in sorted(self.clkouts.items()):
-                                if abs(out_freq - f) <= f*_m:
-                                    config["clk{}_freq".format(_n)] = out_freq
-                                    config["vco"]  = vco_freq
-                                    config["fdiv"] = fdiv
-                                    compute_config_log(self.logger, config)
-                                    return config
+                            config["clk{}_freq".format(outs[0])] = out_freq
+                            config["vco"]  = vco_freq
+                            config["fdiv"] = fdiv
+                            return config
         raise ValueError("No PLL config found")
 
     def do_finalize(self):
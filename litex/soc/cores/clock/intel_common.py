@@ -16,8 +16,9 @@ from litex.soc.cores.clock.common import *
 # Intel / Generic ---------------------------------------------------------------------------------
 
 class IntelClocking(Module, AutoCSR):
-    def __init__(self, vco_margin=0):
+    def __init__(self, vco_margin=0, optimize=False):
         self.vco_margin = vco_margin
+        self.optimize   = optimize # Select the config with the lowest error instead of the first one.
         self.reset      = Signal()
         self.locked     = Signal()
         self.clkin_freq = None
@@ -56,37 +57,35 @@ class IntelClocking(Module, AutoCSR):
         create_clkout_log(self.logger, cd.name, freq, margin, self.nclkouts)
         self.nclkouts += 1
 
+    @cached_config
     def compute_config(self):
-        config = {}
+        (vco_freq_min, vco_freq_max) = self.vco_freq_range
+        best = None
         for n in range(*self.n_div_range):
-            config["n"] = n
             for m in reversed(range(*self.m_div_range)):
-                all_valid = True
                 vco_freq = self.clkin_freq*m/n
-                (vco_freq_min, vco_freq_max) = self.vco_freq_range
-                if (vco_freq >= vco_freq_min*(1 + self.vco_margin) and
-                    vco_freq <= vco_freq_max*(1 - self.vco_margin)):
-                    for _n, (clk, f, p, _m) in sorted(self.clkouts.items()):
-                        valid = False
-                        for c in clkdiv_range(*self.c_div_range):
-                            clk_freq = vco_freq/c
-                            if abs(clk_freq - f) <= f*_m:
-                                config["clk{}_freq".format(_n)]   = clk_freq
-                                config["clk{}_divide".format(_n)] = c
-                                config["clk{}_phase".format(_n)]  = p
-                                valid = True
-                                break
-                            if valid:
-                                break
-                    if not valid:
-                        all_valid = False
+                if not (vco_freq >= vco_freq_min*(1 + self.vco_margin) and
+                        vco_freq <= vco_freq_max*(1 - self.vco_margin)):
+                    continue
+                config = {"n": n}
+                for _n, (clk, f, p, _m) in sorted(self.clkouts.items()):
+                    r = clkdiv_lookup(vco_freq, f, _m, self.c_div_range, best=self.optimize)
+                    if r is None:
+                        break
+                    config["clk{}_freq".format(_n)]   = r[1]
+                    config["clk{}_divide".format(_n)] = r[0]
+                    config["clk{}_phase".format(_n)]  = p
                 else:
-                    all_valid = False
-                if all_valid:
                     config["vco"] = vco_freq
                     config["m"]   = m
-                    compute_config_log(self.logger, config)
-                    return config
+                    if not self.optimize:
+                        return config
+                    # Lowest error, then highest VCO frequency (lowest jitter).
+                    score = (config_error(config, self.clkouts, "clk{}_freq"), -vco_freq)
+                    if best is None or score < best[0]:
+                        best = (score, config)
+        if best is not None:
+            return best[1]
         raise ValueError("No PLL config found")
 
     def do_finalize(self):
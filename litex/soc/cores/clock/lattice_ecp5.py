@@ -61,61 +61,59 @@ class ECP5PLL(Module):
         create_clkout_log(self.logger, cd.name, freq, margin, self.nclkouts)
         self.nclkouts += 1
 
-    def compute_config(self):
-        config = {}
+    @cached_config
+    def _compute_config(self):
         # Iterate on CLKI dividers...
         for clki_div in range(*self.clki_div_range):
             # Check if in PFD range.
             (pfd_freq_min, pfd_freq_max) = self.pfd_freq_range
             if not (pfd_freq_min <= self.clkin_freq/clki_div <= pfd_freq_max):
                 continue
-            config["clki_div"] = clki_div
             # Iterate on CLKO dividers... (to get us in VCO range)
             for clkofb_div in range(*self.clko_div_range):
                 # Iterate on CLKFB dividers...
                 for clkfb_div in range(*self.clkfb_div_range):
                     vco_freq = (self.clkin_freq/clki_div)*clkfb_div*clkofb_div
                     (vco_freq_min, vco_freq_max) = self.vco_freq_range
-                    all_valid = True
                     # If in VCO range, find dividers for all outputs.
-                    if vco_freq_min <= vco_freq <= vco_freq_max:
-                        config["clkfb"] = None
-                        for n, (clk, f, p, m, dpa) in sorted(self.clkouts.items()):
-                            valid = False
-                            for d in range(*self.clko_div_range):
-                                clk_freq = vco_freq/d
-                                # If output is valid, save config.
-                                if abs(clk_freq - f) <= f*m:
-                                    config["clko{}_freq".format(n)]  = clk_freq
-                                    config["clko{}_div".format(n)]   = d
-                                    config["clko{}_phase".format(n)] = p
-                                    valid = True
-                                    # Check if ouptut can be used as feedback, if so use it.
-                                    # (We cannot use clocks with dynamic phase adjustment enabled)
-                                    if (d == clkofb_div) and (not (dpa and self.dpa_en)):
-                                        config["clkfb"] = n
-                                    break
-                            if not valid:
-                                all_valid = False
+                    if not (vco_freq_min <= vco_freq <= vco_freq_max):
+                        continue
+                    config = {"clki_div": clki_div, "clkfb": None}
+                    for n, (clk, f, p, m, dpa) in sorted(self.clkouts.items()):
+                        r = clkdiv_lookup(vco_freq, f, m, self.clko_div_range)
+                        if r is None:
+                            break
+                        # If output is valid, save config.
+                        d, clk_freq = r
+                        config["clko{}_freq".format(n)]  = clk_freq
+                        config["clko{}_div".format(n)]   = d
+                        config["clko{}_phase".format(n)] = p
+                        # Check if ouptut can be used as feedback, if so use it.
+                        # (We cannot use clocks with dynamic phase adjustment enabled)
+                        if (d == clkofb_div) and (not (dpa and self.dpa_en)):
+                            config["clkfb"] = n
+                    else:
                         if self.nclkouts == self.nclkouts_max and not config["clkfb"]:
                             # If there is no output suitable for feedback and no spare, not valid
-                            all_valid = False
-                    else:
-                        all_valid = False
-                    if all_valid:
-                        # If no output suitable for feedback, create a new output for it.
+                            continue
+                        # If no output suitable for feedback, use a new output for it.
                         if config["clkfb"] is None:
                             # We need at least a free output...
                             assert self.nclkouts < self.nclkouts_max
                             config["clkfb"] = self.nclkouts
-                            self.clkouts[self.nclkouts] = (Signal(), 0, 0, 0, 0)
                             config[f"clko{self.nclkouts}_div"] = int((vco_freq*clki_div)/(self.clkin_freq*clkfb_div))
                         config["vco"]       = vco_freq
                         config["clkfb_div"] = clkfb_div
-                        compute_config_log(self.logger, config)
                         return config
         raise ValueError("No PLL config found")
 
+    def compute_config(self):
+        config = self._compute_config()
+        # Create the output used for feedback when not an existing one.
+        if config["clkfb"] == self.nclkouts:
+            self.clkouts[self.nclkouts] = (Signal(), 0, 0, 0, 0)
+        return config
+
     def expose_dpa(self):
         self.dpa_en     = True
         self.phase_sel  = Signal(2)
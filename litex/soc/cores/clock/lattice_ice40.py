@@ -63,6 +63,7 @@ class iCE40PLL(Module):
         create_clkout_log(self.logger, cd.name, freq, margin, self.nclkouts)
         self.nclkouts += 1
 
+    @cached_config
     def compute_config(self):
         config = {}
         for divr in range(*self.divr_range):
@@ -88,7 +89,6 @@ class iCE40PLL(Module):
                     config["vco"] = vco_freq
                     config["divr"] = divr
                     config["divf"] = divf
-                    compute_config_log(self.logger, config)
                     return config
         raise ValueError("No PLL config found")
 
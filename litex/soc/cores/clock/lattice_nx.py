@@ -158,33 +158,25 @@ class NXPLL(Module):
         create_clkout_log(self.logger, cd.name, freq, margin, self.nclkouts)
         self.nclkouts += 1
 
+    @cached_config
     def compute_config(self):
-        config = {}
         for clki_div in range(*self.clki_div_range):
-            config["clki_div"] = clki_div
             for clkfb_div in range(*self.clkfb_div_range):
-                all_valid = True
                 vco_freq = self.clkin_freq/clki_div*clkfb_div
                 (vco_freq_min, vco_freq_max) = self.vco_out_freq_range
-                if vco_freq >= vco_freq_min and vco_freq <= vco_freq_max:
-                    for n, (clk, f, p, m) in sorted(self.clkouts.items()):
-                        valid = False
-                        for d in range(*self.clko_div_range):
-                            clk_freq = vco_freq/d
-                            if abs(clk_freq - f) <= f*m:
-                                config["clko{}_freq".format(n)]  = clk_freq
-                                config["clko{}_div".format(n)]   = d
-                                config["clko{}_phase".format(n)] = p
-                                valid = True
-                                break
-                        if not valid:
-                            all_valid = False
+                if not (vco_freq >= vco_freq_min and vco_freq <= vco_freq_max):
+                    continue
+                config = {"clki_div": clki_div}
+                for n, (clk, f, p, m) in sorted(self.clkouts.items()):
+                    r = clkdiv_lookup(vco_freq, f, m, self.clko_div_range)
+                    if r is None:
+                        break
+                    config["clko{}_freq".format(n)]  = r[1]
+                    config["clko{}_div".format(n)]   = r[0]
+                    config["clko{}_phase".format(n)] = p
                 else:
-                    all_valid = False
-                if all_valid:
                     config["vco"] = vco_freq
                     config["clkfb_div"] = clkfb_div
-                    compute_config_log(self.logger, config)
                     return config
         raise ValueError("No PLL config found")
 
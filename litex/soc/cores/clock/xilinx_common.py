@@ -19,8 +19,9 @@ class XilinxClocking(Module, AutoCSR):
     clkfbout_mult_frange = (2,  64+1)
     clkout_divide_range  = (1, 128+1)
 
-    def __init__(self, vco_margin=0):
+    def __init__(self, vco_margin=0, optimize=False):
         self.vco_margin = vco_margin
+        self.optimize   = optimize # Select the config with the lowest error instead of the first one.
         self.reset      = Signal()
         self.power_down = Signal()
         self.locked     = Signal()
@@ -68,41 +69,49 @@ class XilinxClocking(Module, AutoCSR):
         create_clkout_log(self.logger, cd.name, freq, margin, self.nclkouts)
         self.nclkouts += 1
 
+    @cached_config
     def compute_config(self):
-        config = {}
-        for divclk_divide in range(*self.divclk_divide_range):
-            config["divclk_divide"] = divclk_divide
-            for clkfbout_mult in reversed(range(*self.clkfbout_mult_frange)):
-                all_valid = True
-                vco_freq = self.clkin_freq*clkfbout_mult/divclk_divide
-                (vco_freq_min, vco_freq_max) = self.vco_freq_range
-                if (vco_freq >= vco_freq_min*(1 + self.vco_margin) and
+        # VCO configs, in search order.
+        (vco_freq_min, vco_freq_max) = self.vco_freq_range
+        vcos = ((divclk_divide, clkfbout_mult, self.clkin_freq*clkfbout_mult/divclk_divide)
+            for divclk_divide in range(*self.divclk_divide_range)
+            for clkfbout_mult in reversed(range(*self.clkfbout_mult_frange)))
+
+        # Divider ranges of each output (the specific range is only used when no divider is found
+        # in the generic one).
+        d_ranges = {}
+        for n in self.clkouts.keys():
+            d_ranges[n] = [self.clkout_divide_range]
+            if getattr(self, "clkout{}_divide_range".format(n), None) is not None:
+                d_ranges[n].append(getattr(self, "clkout{}_divide_range".format(n)))
+
+        best = None
+        for divclk_divide, clkfbout_mult, vco_freq in vcos:
+            if not (vco_freq >= vco_freq_min*(1 + self.vco_margin) and
                     vco_freq <= vco_freq_max*(1 - self.vco_margin)):
-                    for n, (clk, f, p, m) in sorted(self.clkouts.items()):
-                        valid = False
-                        d_ranges = [self.clkout_divide_range]
-                        if getattr(self, "clkout{}_divide_range".format(n), None) is not None:
-                            d_ranges += [getattr(self, "clkout{}_divide_range".format(n))]
-                        for d_range in d_ranges:
-                            for d in clkdiv_range(*d_range):
-                                clk_freq = vco_freq/d
-                                if abs(clk_freq - f) <= f*m:
-                                    config["clkout{}_freq".format(n)]   = clk_freq
-                                    config["clkout{}_divide".format(n)] = d
-                                    config["clkout{}_phase".format(n)]  = p
-                                    valid = True
-                                    break
-                                if valid:
-                                    break
-                        if not valid:
-                            all_valid = False
-                else:
-                    all_valid = False
-                if all_valid:
-                    config["vco"]           = vco_freq
-                    config["clkfbout_mult"] = clkfbout_mult
-                    compute_config_log(self.logger, config)
+                continue
+            config = {"divclk_divide": divclk_divide}
+            for n, (clk, f, p, m) in sorted(self.clkouts.items()):
+                for d_range in d_ranges[n]:
+                    r = clkdiv_lookup(vco_freq, f, m, d_range, best=self.optimize)
+                    if r is not None:
+                        break
+                if r is None:
+                    break
+                config["clkout{}_freq".format(n)]   = r[1]
+                config["clkout{}_divide".format(n)] = r[0]
+                config["clkout{}_phase".format(n)]  = p
+            else:
+                config["vco"]           = vco_freq
+                config["clkfbout_mult"] = clkfbout_mult
+                if not self.optimize:
                     return config
+                # Lowest error, then highest VCO frequency (lowest jitter).
+                score = (config_error(config, self.clkouts, "clkout{}_freq"), -vco_freq)
+                if best is None or score < best[0]:
+                    best = (score, config)
+        if best is not None:
+            return best[1]
         raise ValueError("No PLL config found")
 
     def expose_drp(self):
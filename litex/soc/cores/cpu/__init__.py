@@ -5,6 +5,10 @@
 # Copyright (c) 2017-2018 Tim 'mithro' Ansell <me@mith.ro>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import sys
+import importlib
+import collections.abc
+
 from migen import *
 
 # CPU ----------------------------------------------------------------------------------------------
@@ -63,63 +67,76 @@ CPU_GCC_TRIPLE_RISCV64 = (
 
 # CPUS ---------------------------------------------------------------------------------------------
 
-# LM32
-from litex.soc.cores.cpu.lm32 import LM32
+# CPU wrappers are only imported when used: CPUS resolves a CPU name to its class on access and the
+# CPU classes are available as attributes of this module (ex: cpu.VexRiscv) through __getattr__.
+
+_cpus = {
+    # LM32
+    "lm32"        : ("lm32",         "LM32"),
+
+    # OpenRisc
+    "mor1kx"      : ("mor1kx",       "MOR1KX"),
+
+    # OpenPower
+    "microwatt"   : ("microwatt",    "Microwatt"),
+
+    # RISC-V (32-bit)
+    "serv"        : ("serv",         "SERV"),
+    "femtorv"     : ("femtorv",      "FemtoRV"),
+    "picorv32"    : ("picorv32",     "PicoRV32"),
+    "minerva"     : ("minerva",      "Minerva"),
+    "vexriscv"    : ("vexriscv",     "VexRiscv"),
+    "vexriscv_smp": ("vexriscv_smp", "VexRiscvSMP"),
+    "ibex"        : ("ibex",         "Ibex"),
+    "cv32e40p"    : ("cv32e40p",     "CV32E40P"),
 
-# OpenRisc
-from litex.soc.cores.cpu.mor1kx import MOR1KX
+    # RISC-V (64-bit)
+    "rocket"      : ("rocket",       "RocketRV64"),
+    "blackparrot" : ("blackparrot",  "BlackParrotRV64"),
 
-# OpenPower
-from litex.soc.cores.cpu.microwatt import Microwatt
+    # Zynq
+    "zynq7000"    : ("zynq7000",     "Zynq7000"),
+}
 
-# RISC-V (32-bit)
-from litex.soc.cores.cpu.serv import SERV
-from litex.soc.cores.cpu.femtorv import FemtoRV
-from litex.soc.cores.cpu.picorv32 import PicoRV32
-from litex.soc.cores.cpu.minerva import Minerva
-from litex.soc.cores.cpu.vexriscv import VexRiscv
-from litex.soc.cores.cpu.vexriscv_smp import VexRiscvSMP
-from litex.soc.cores.cpu.ibex import Ibex
-from litex.soc.cores.cpu.cv32e40p import CV32E40P
 
-# RISC-V (64-bit)
-from litex.soc.cores.cpu.rocket import RocketRV64
-from litex.soc.cores.cpu.blackparrot import BlackParrotRV64
+class CPURegistry(collections.abc.Mapping):
+    """CPU name -> CPU class mapping, importing the CPU wrapper on first access."""
+    def __init__(self, cpus):
+        self._cpus = cpus
 
-# Zynq
-from litex.soc.cores.cpu.zynq7000 import Zynq7000
+    def __getitem__(self, name):
+        cpu = self._cpus[name]
+        if isinstance(cpu, tuple):
+            module, cls = cpu
+            cpu = getattr(importlib.import_module(__name__ + "." + module), cls)
+            self._cpus[name] = cpu
+        return cpu
 
+    def __iter__(self):
+        return iter(self._cpus)
 
-CPUS = {
+    def __len__(self):
+        return len(self._cpus)
+
+
+CPUS = CPURegistry({
     # None
     "None"        : CPUNone,
 
     # External (CPU class provided externally by design/user)
     "external"    : None,
 
-    # LM32
-    "lm32"        : LM32,
+    **_cpus,
+})
 
-    # OpenRisc
-    "mor1kx"      : MOR1KX,
 
-    # OpenPower
-    "microwatt"   : Microwatt,
+def __getattr__(name):
+    for cpu_name, (module, cls) in _cpus.items():
+        if cls == name:
+            return CPUS[cpu_name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
-    # RISC-V (32-bit)
-    "serv"        : SERV,
-    "femtorv"     : FemtoRV,
-    "picorv32"    : PicoRV32,
-    "minerva"     : Minerva,
-    "vexriscv"    : VexRiscv,
-    "vexriscv_smp": VexRiscvSMP,
-    "ibex"        : Ibex,
-    "cv32e40p"    : CV32E40P,
-
-    # RISC-V (64-bit)
-    "rocket"      : RocketRV64,
-    "blackparrot" : BlackParrotRV64,
-
-    # Zynq
-    "zynq7000"    : Zynq7000,
-}
+# Module __getattr__ requires Python 3.7, import all CPUs on older versions.
+if sys.version_info < (3, 7):
+    for cpu_name, (module, cls) in _cpus.items():
+        globals()[cls] = CPUS[cpu_name]
@@ -436,24 +436,35 @@ class Stream2Wishbone(Module):
 
 
 class UARTBone(Stream2Wishbone):
-    def __init__(self, phy, clk_freq, cd="sys"):
-        if cd == "sys":
+    def __init__(self, phy, clk_freq, cd="sys", rx_fifo_depth=0):
+        if cd == "sys" and rx_fifo_depth == 0:
             self.submodules.phy = phy
             Stream2Wishbone.__init__(self, self.phy, clk_freq=clk_freq)
         else:
-            self.submodules.phy = ClockDomainsRenamer(cd)(phy)
-            self.submodules.tx_cdc = stream.ClockDomainCrossing([("data", 8)], cd_from="sys", cd_to=cd)
-            self.submodules.rx_cdc = stream.ClockDomainCrossing([("data", 8)], cd_from=cd,    cd_to="sys")
-            self.comb += self.phy.source.connect(self.rx_cdc.sink)
-            self.comb += self.tx_cdc.source.connect(self.phy.sink)
+            if cd == "sys":
+                self.submodules.phy = phy
+                rx, tx = self.phy.source, self.phy.sink
+            else:
+                self.submodules.phy = ClockDomainsRenamer(cd)(phy)
+                self.submodules.tx_cdc = stream.ClockDomainCrossing([("data", 8)], cd_from="sys", cd_to=cd)
+                self.submodules.rx_cdc = stream.ClockDomainCrossing([("data", 8)], cd_from=cd,    cd_to="sys")
+                self.comb += self.phy.source.connect(self.rx_cdc.sink)
+                self.comb += self.tx_cdc.source.connect(self.phy.sink)
+                rx, tx = self.rx_cdc.source, self.tx_cdc.sink
+            # RX FIFO: buffers the commands received while a read is answered (allows the host to
+            # pipeline commands, see CommUART's window).
+            if rx_fifo_depth:
+                self.submodules.rx_fifo = stream.SyncFIFO([("data", 8)], rx_fifo_depth, buffered=True)
+                self.comb += rx.connect(self.rx_fifo.sink)
+                rx = self.rx_fifo.source
             Stream2Wishbone.__init__(self, clk_freq=clk_freq)
-            self.comb += self.rx_cdc.source.connect(self.sink)
-            self.comb += self.source.connect(self.tx_cdc.sink)
+            self.comb += rx.connect(self.sink)
+            self.comb += self.source.connect(tx)
 
 class UARTWishboneBridge(UARTBone):
-    def __init__(self, pads, clk_freq, baudrate=115200, cd="sys"):
+    def __init__(self, pads, clk_freq, baudrate=115200, cd="sys", rx_fifo_depth=0):
         self.submodules.phy = RS232PHY(pads, clk_freq, baudrate)
-        UARTBone.__init__(self, self.phy, clk_freq, cd)
+        UARTBone.__init__(self, self.phy, clk_freq, cd, rx_fifo_depth)
 
 # UART Multiplexer ---------------------------------------------------------------------------------
 
@@ -14,9 +14,16 @@
 
 import multiprocessing
 import os
+import re
+import sys
+import time
+import json
+import hashlib
 import subprocess
 import struct
 import shutil
+import concurrent.futures
+from contextlib import contextmanager
 
 from litex import get_data_mod
 from litex.build.tools import write_to_file
@@ -28,6 +35,9 @@ from litex.soc.cores import cpu
 def _makefile_escape(s):
     return s.replace("\\", "\\\\")
 
+# Banner of the generated files (generated_banner), with the generation date and git revisions.
+_generated_banner_re = re.compile(rb"^(//|#) Auto-generated by Migen .*\n", re.MULTILINE)
+
 def _create_dir(d, remove_if_exists=False):
     dir_path = os.path.realpath(d)
     if remove_if_exists and os.path.exists(dir_path):
@@ -66,14 +76,17 @@ class Builder:
         generated_dir    = None,
 
         # Compile Options.
-        compile_software = True,
-        compile_gateware = True,
+        compile_software   = True,
+        compile_gateware   = True,
+        jobs               = None,
+        software_cache_dir = None,
 
         # Exports.
         csr_json         = None,
         csr_csv          = None,
         csr_svd          = None,
         memory_x         = None,
+        build_timings    = None,
 
         # BIOS Options.
         bios_options     = [],
@@ -91,8 +104,10 @@ class Builder:
         self.generated_dir = os.path.abspath(generated_dir or os.path.join(self.include_dir,  "generated"))
 
         # Compile Options.
-        self.compile_software = compile_software
-        self.compile_gateware = compile_gateware
+        self.compile_software   = compile_software
+        self.compile_gateware   = compile_gateware
+        self.jobs               = jobs or multiprocessing.cpu_count() # Software make jobs.
+        self.software_cache_dir = software_cache_dir or os.environ.get("LITEX_SOFTWARE_CACHE_DIR", None)
 
         # Exports.
         self.csr_csv  = csr_csv
@@ -100,6 +115,10 @@ class Builder:
         self.csr_svd  = csr_svd
         self.memory_x = memory_x
 
+        # Per-stage build timings (in seconds), written to build_timings JSON file if specified.
+        self.build_timings = build_timings
+        self.timings       = {}
+
         # BIOS Options.
         self.bios_options = bios_options
 
@@ -234,6 +253,12 @@ class Builder:
             _create_dir(os.path.join(self.software_dir, name))
 
     def _generate_rom_software(self, compile_bios=True):
+        if self.software_cache_dir is not None and self.compile_software and compile_bios:
+            self._cached_rom_software(self._compile_rom_software)
+        else:
+            self._compile_rom_software(compile_bios)
+
+    def _compile_rom_software(self, compile_bios=True):
         # Compile all software packages.
          for name, src_dir in self.software_packages:
             # Skip BIOS compilation when disabled.
@@ -243,7 +268,110 @@ class Builder:
             dst_dir  = os.path.join(self.software_dir, name)
             makefile = os.path.join(src_dir, "Makefile")
             if self.compile_software:
-                subprocess.check_call(["make", "-C", dst_dir, "-f", makefile, "-j", str(multiprocessing.cpu_count())])
+                subprocess.check_call(["make", "-C", dst_dir, "-f", makefile, "-j", str(self.jobs)])
+
+    def _get_toolchain_version(self, variables):
+        # Version of the compiler selected by variables.mak (see common.mak).
+        triple = variables.get("TRIPLE", "--native--")
+        if variables.get("CLANG", "0") == "1":
+            cmd = ["clang", "-target", triple, "--version"]
+        else:
+            cmd = [("" if triple == "--native--" else triple + "-") + "gcc", "--version"]
+        try:
+            return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode()
+        except OSError:
+            return ""
+
+    def _get_software_key(self):
+        # The software only depends on the generated files (csr.h, soc.h, mem.h, variables.mak...),
+        # the software sources and the toolchain: SoCs with the same ones (the include directory of
+        # each SoC apart) share the same software build. The banners are ignored: they change on each
+        # generation.
+        h = hashlib.sha256()
+        variables = {}
+        for f in sorted(os.listdir(self.generated_dir)):
+            with open(os.path.join(self.generated_dir, f), "rb") as fd:
+                contents = fd.read().replace(self.include_dir.encode(), b"$(BUILDINC_DIRECTORY)")
+            contents = _generated_banner_re.sub(b"", contents)
+            h.update(f.encode() + b"\0" + contents + b"\0")
+            if f == "variables.mak":
+                variables = dict(l.split("=", 1) for l in contents.decode().splitlines() if "=" in l)
+        h.update(self._get_toolchain_version(variables).encode() + b"\0")
+        src_dirs = [os.path.join(soc_directory, "software")]
+        src_dirs += [src_dir for name, src_dir in self.software_packages if src_dir not in src_dirs]
+        for src_dir in src_dirs:
+            h.update(src_dir.encode() + b"\0")
+            for root, dirs, files in sorted(os.walk(src_dir)):
+                for f in sorted(files):
+                    with open(os.path.join(root, f), "rb") as fd:
+                        h.update(os.path.relpath(os.path.join(root, f), src_dir).encode() + b"\0")
+                        h.update(hashlib.sha256(fd.read()).digest())
+        return h.hexdigest()
+
+    def _cache_directories(self, reverse=False):
+        # Directories of the SoC referenced by the make dependency files (.d), replaced by
+        # placeholders in the cache.
+        directories = [
+            (self.include_dir,  "@BUILDINC_DIRECTORY@"),
+            (self.software_dir, "@SOFTWARE_DIRECTORY@"),
+        ]
+        return [(new, old) for old, new in directories] if reverse else directories
+
+    @staticmethod
+    def _rewrite_dependencies(directory, replacements):
+        # The dependency files (generated with -MD -MP and included by the Makefiles) name the
+        # generated headers with absolute paths: make them point to the headers of the SoC using
+        # the build, not to the ones of the SoC that built it.
+        for root, dirs, files in os.walk(directory):
+            for f in files:
+                if not f.endswith(".d"):
+                    continue
+                filename = os.path.join(root, f)
+                with open(filename, "r") as fd:
+                    contents = fd.read()
+                for old, new in replacements:
+                    contents = contents.replace(old, new)
+                with open(filename, "w") as fd:
+                    fd.write(contents)
+
+    def _cached_rom_software(self, compile_software, lock_timeout=3600):
+        # Software builds are cached in software_cache_dir (and shared between SoCs): on a miss,
+        # the software packages are built (by a single SoC at a time for a given key) and stored;
+        # on a hit, they are copied to the software directory.
+        cache_dir = os.path.join(self.software_cache_dir, self._get_software_key())
+        lock_dir  = cache_dir + ".lock"
+        os.makedirs(self.software_cache_dir, exist_ok=True)
+        while True:
+            if os.path.exists(os.path.join(cache_dir, ".done")):
+                for name, src_dir in self.software_packages:
+                    dst_dir = os.path.join(self.software_dir, name)
+                    shutil.rmtree(dst_dir, ignore_errors=True)
+                    shutil.copytree(os.path.join(cache_dir, name), dst_dir, symlinks=True)
+                    self._rewrite_dependencies(dst_dir, self._cache_directories(reverse=True))
+                return
+            try:
+                os.mkdir(lock_dir)
+            except FileExistsError:
+                # Another SoC is building it (or died while doing so: remove stale locks).
+                try:
+                    if time.time() - os.path.getmtime(lock_dir) > lock_timeout:
+                        os.rmdir(lock_dir)
+                except OSError:
+                    pass
+                time.sleep(1)
+                continue
+            try:
+                compile_software()
+                tmp_dir = cache_dir + ".{}.tmp".format(os.getpid())
+                for name, src_dir in self.software_packages:
+                    shutil.copytree(os.path.join(self.software_dir, name), os.path.join(tmp_dir, name),
+                        symlinks=True)
+                    self._rewrite_dependencies(os.path.join(tmp_dir, name), self._cache_directories())
+                open(os.path.join(tmp_dir, ".done"), "w").close()
+                os.replace(tmp_dir, cache_dir)
+            finally:
+                os.rmdir(lock_dir)
+            return
 
     def _initialize_rom_software(self):
         # Get BIOS data from compiled BIOS binary.
@@ -253,6 +381,12 @@ class Builder:
         # Initialize SoC with with BIOS data.
         self.soc.initialize_rom(bios_data)
 
+    @contextmanager
+    def _timed(self, stage):
+        start = time.time()
+        yield
+        self.timings[stage] = self.timings.get(stage, 0) + time.time() - start
+
     def build(self, skip_sw_build=False, **kwargs):
         # Pass Output Directory to Platform.
         self.soc.platform.output_dir = self.output_dir
@@ -277,54 +411,168 @@ class Builder:
             _create_dir(self.software_dir, remove_if_exists=software_full_rebuild)
 
         # Finalize the SoC.
-        self.soc.finalize()
+        with self._timed("finalize"):
+            self.soc.finalize()
 
-        # Generate Software Includes/Files.
-        self._generate_includes(with_bios=with_bios)
+        with self._timed("includes"):
+            # Generate Software Includes/Files.
+            self._generate_includes(with_bios=with_bios)
 
-        # Export SoC Mapping.
-        self._generate_csr_map()
+            # Export SoC Mapping.
+            self._generate_csr_map()
 
         # Compile the BIOS when the SoC uses it.
         if self.soc.cpu_type is not None and not skip_sw_build:
             if self.soc.cpu.use_rom:
-                # Prepare/Generate ROM software.
-                use_bios = (
-                    # BIOS compilation enabled.
-                    self.compile_software and
-                    # ROM contents has not already been initialized.
-                    (not self.soc.integrated_rom_initialized)
-                )
-                if use_bios:
-                    self.soc.check_bios_requirements()
-                self._prepare_rom_software()
-                self._generate_rom_software(compile_bios=use_bios)
-
-                # Initialize ROM.
-                if use_bios and self.soc.integrated_rom_size:
-                    self._initialize_rom_software()
+                with self._timed("software"):
+                    # Prepare/Generate ROM software.
+                    use_bios = (
+                        # BIOS compilation enabled.
+                        self.compile_software and
+                        # ROM contents has not already been initialized.
+                        (not self.soc.integrated_rom_initialized)
+                    )
+                    if use_bios:
+                        self.soc.check_bios_requirements()
+                    self._prepare_rom_software()
+                    self._generate_rom_software(compile_bios=use_bios)
+
+                    # Initialize ROM.
+                    if use_bios and self.soc.integrated_rom_size:
+                        self._initialize_rom_software()
 
         # Translate compile_gateware to run.
         if "run" not in kwargs:
             kwargs["run"] = self.compile_gateware
 
-        if not kwargs["run"]:
-            # Build SoC and pass Verilog Name Space to do_exit.
-            vns = self.soc.build(build_dir=self.gateware_dir, **kwargs)
-            self.soc.do_exit(vns=vns)
-        else:
-            # Run (probably Sim)SoC.
-            vns = self.soc.build(build_dir=self.gateware_dir, **kwargs)
+        with self._timed("gateware"):
+            if not kwargs["run"]:
+                # Build SoC and pass Verilog Name Space to do_exit.
+                vns = self.soc.build(build_dir=self.gateware_dir, **kwargs)
+                self.soc.do_exit(vns=vns)
+            else:
+                # Run (probably Sim)SoC.
+                vns = self.soc.build(build_dir=self.gateware_dir, **kwargs)
 
         # Generate SoC Documentation.
         if self.generate_doc:
-            from litex.soc.doc import generate_docs
-            doc_dir = os.path.join(self.output_dir, "doc")
-            generate_docs(self.soc, doc_dir)
-            os.system(f"sphinx-build -M html {doc_dir} {doc_dir}/_build")
+            with self._timed("doc"):
+                from litex.soc.doc import generate_docs
+                doc_dir = os.path.join(self.output_dir, "doc")
+                generate_docs(self.soc, doc_dir)
+                os.system(f"sphinx-build -M html {doc_dir} {doc_dir}/_build")
+
+        # Export Build Timings.
+        if self.build_timings is not None:
+            write_to_file(os.path.realpath(self.build_timings), json.dumps(self.timings, indent=4))
 
         return vns
 
+# Batch Build --------------------------------------------------------------------------------------
+
+class BuildVariant:
+    """SoC variant of a batch build: soc_cls(**soc_kwargs) built with Builder(soc, **builder_kwargs)
+    and builder.build(**build_kwargs) in output_dir/name. soc_cls is called in a worker process and
+    has to be importable (module level class or function)."""
+    def __init__(self, name, soc_cls, soc_kwargs={}, builder_kwargs={}, build_kwargs={}):
+        self.name           = name
+        self.soc_cls        = soc_cls
+        self.soc_kwargs     = soc_kwargs
+        self.builder_kwargs = builder_kwargs
+        self.build_kwargs   = build_kwargs
+
+    def build(self, build_dir, software_cache_dir, jobs):
+        builder_kwargs = dict(output_dir=build_dir, software_cache_dir=software_cache_dir, jobs=jobs)
+        builder_kwargs.update(self.builder_kwargs)
+        start     = time.time()
+        soc       = self.soc_cls(**self.soc_kwargs)
+        elaborate = time.time() - start
+        builder   = Builder(soc, **builder_kwargs)
+        builder.build(**self.build_kwargs)
+        return {"elaborate": elaborate, **builder.timings}
+
+
+class TargetBuildVariant:
+    """SoC variant of a batch build built by a target script (python -m target args) in
+    output_dir/name, with its output in output_dir/name/build.log (unless verbose)."""
+    def __init__(self, name, target, args=[], verbose=False):
+        self.name    = name
+        self.target  = target
+        self.args    = args
+        self.verbose = verbose
+
+    def build(self, build_dir, software_cache_dir, jobs):
+        timings = os.path.join(build_dir, "build_timings.json")
+        log     = os.path.join(build_dir, "build.log")
+        cmd = [sys.executable, "-m", self.target] + self.args + [
+            "--output-dir",    build_dir,
+            "--jobs",          str(jobs),
+            "--build-timings", timings,
+        ]
+        if software_cache_dir is not None:
+            cmd += ["--software-cache-dir", software_cache_dir]
+        with open(log, "w") as f:
+            r = subprocess.run(cmd, stdout=None if self.verbose else f, stderr=subprocess.STDOUT)
+        if r.returncode != 0:
+            raise OSError("build failed, see {}".format(log))
+        with open(timings) as f:
+            return json.load(f)
+
+
+def _build_variant(variant, output_dir, software_cache_dir, jobs):
+    build_dir = os.path.join(output_dir, variant.name)
+    os.makedirs(build_dir, exist_ok=True)
+    start   = time.time()
+    timings = variant.build(build_dir, software_cache_dir, jobs)
+    timings["total"] = time.time() - start
+    return timings
+
+
+def build_variants(variants, jobs=None, output_dir="build", software_cache_dir=None, share=True):
+    """Build SoC variants (BuildVariant/TargetBuildVariant) concurrently in a pool of jobs processes.
+
+    Identical software (BIOS) builds are shared between variants through software_cache_dir
+    (default: output_dir/.software) unless share is False. Returns {name: timings or exception} and
+    prints a per-stage timings report.
+    """
+    jobs       = jobs or multiprocessing.cpu_count()
+    make_jobs  = max(1, multiprocessing.cpu_count()//jobs)
+    output_dir = os.path.abspath(output_dir)
+    cache_dir  = None
+    if share:
+        cache_dir = os.path.abspath(software_cache_dir or os.path.join(output_dir, ".software"))
+    results    = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_build_variant, variant, output_dir, cache_dir, make_jobs): variant
+            for variant in variants}
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future].name
+            try:
+                results[name] = future.result()
+                print("{}: done in {:.1f}s.".format(name, results[name]["total"]))
+            except Exception as e:
+                results[name] = e
+                print("{}: failed: {}".format(name, e))
+    print(build_report(results))
+    return results
+
+
+def build_report(results):
+    stages = []
+    for timings in results.values():
+        if isinstance(timings, dict):
+            stages += [stage for stage in timings if stage not in stages]
+    r = "{:<24}".format("variant") + "".join("{:>12}".format(stage) for stage in stages) + "\n"
+    for name, timings in sorted(results.items()):
+        r += "{:<24}".format(name)
+        if isinstance(timings, dict):
+            r += "".join("{:>11.1f}s".format(timings[stage]) if stage in timings else "{:>12}".format("-")
+                for stage in stages)
+        else:
+            r += "  failed: {}".format(timings)
+        r += "\n"
+    return r
+
 # Builder Arguments --------------------------------------------------------------------------------
 
 def builder_args(parser):
@@ -340,6 +588,9 @@ def builder_args(parser):
     parser.add_argument("--csr-svd",             default=None,        help="Write SoC mapping to the specified SVD file.")
     parser.add_argument("--memory-x",            default=None,        help="Write SoC Memory Regions to the specified Memory-X file.")
     parser.add_argument("--doc",                 action="store_true", help="Generate SoC Documentation.")
+    parser.add_argument("--jobs",                default=None,        type=int, help="Number of parallel Software compilation jobs (default=number of CPUs).")
+    parser.add_argument("--software-cache-dir",  default=None,        help="Cache (and share between SoCs) Software builds in the specified directory (default=$LITEX_SOFTWARE_CACHE_DIR).")
+    parser.add_argument("--build-timings",       default=None,        help="Write per-stage build timings to the specified JSON file.")
 
 
 def builder_argdict(args):
@@ -356,4 +607,7 @@ def builder_argdict(args):
         "csr_svd":          args.csr_svd,
         "memory_x":         args.memory_x,
         "generate_doc":     args.doc,
+        "jobs":               args.jobs,
+        "software_cache_dir": args.software_cache_dir,
+        "build_timings":      args.build_timings,
     }
@@ -5,10 +5,12 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import os
+import sys
 import math
 import json
+import mmap
 import time
-import struct
+import array
 import datetime
 
 from migen import *
@@ -19,7 +21,13 @@ def get_version(with_time=True):
     fmt = "%Y-%m-%d %H:%M:%S" if with_time else "%Y-%m-%d"
     return datetime.datetime.fromtimestamp(time.time()).strftime(fmt)
 
+# 32-bit words array type code.
+_word_typecode = "I" if array.array("I").itemsize == 4 else "L"
+
 def get_mem_data(filename_or_regions, endianness="big", mem_size=None):
+    # Returns the memory content as an array of 32-bit words (accepted as Memory init), the gaps
+    # between regions being zeros.
+
     # Create memory regions.
     if isinstance(filename_or_regions, dict):
         regions = filename_or_regions
@@ -47,21 +55,20 @@ def get_mem_data(filename_or_regions, endianness="big", mem_size=None):
             "file is too big: {}/{} bytes".format(
              data_size, mem_size))
 
-    # Fill data.
-    data = [0]*math.ceil(data_size/4)
+    # Fill data (files are mapped and converted to words in one pass, last word zero-padded).
+    data = array.array(_word_typecode, bytes(4*math.ceil(data_size/4)))
     for filename, base in regions.items():
+        size = os.path.getsize(filename)
+        if size == 0:
+            continue
+        words = array.array(_word_typecode)
         with open(filename, "rb") as f:
-            i = 0
-            while True:
-                w = f.read(4)
-                if not w:
-                    break
-                if len(w) != 4:
-                    for _ in range(len(w), 4):
-                        w += b'\x00'
-                if endianness == "little":
-                    data[int(base, 16)//4 + i] = struct.unpack("<I", w)[0]
-                else:
-                    data[int(base, 16)//4 + i] = struct.unpack(">I", w)[0]
-                i += 1
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                words.frombytes(m[:size - size%4])
+                if size%4:
+                    words.frombytes(m[size - size%4:] + bytes(4 - size%4))
+        if endianness != sys.byteorder:
+            words.byteswap()
+        offset = int(base, 16)//4
+        data[offset:offset + len(words)] = words
     return data
@@ -298,6 +298,12 @@ def get_csr_json(csr_regions={}, constants={}, mem_regions={}):
                     "size": _size,
                     "type": _type
                 }
+                if hasattr(csr, "fields"):
+                    d["csr_registers"][name + "_" + csr.name]["fields"] = [{
+                        "name":   field.name,
+                        "offset": field.offset,
+                        "size":   field.size,
+                    } for field in csr.fields.fields]
                 region_origin += alignment//8*_size
         else:
             mem = region.obj
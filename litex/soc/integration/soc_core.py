@@ -162,7 +162,7 @@ class SoCCore(LiteXSoC):
             integrated_rom_init = []
             integrated_rom_size = 0
         self.integrated_rom_size        = integrated_rom_size
-        self.integrated_rom_initialized = integrated_rom_init != []
+        self.integrated_rom_initialized = len(integrated_rom_init) > 0
 
         # SRAM.
         self.integrated_sram_size = integrated_sram_size
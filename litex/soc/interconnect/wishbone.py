@@ -6,7 +6,11 @@
 # Copyright (c) 2018 Tim 'mithro' Ansell <me@mith.ro>
 # SPDX-License-Identifier: BSD-2-Clause
 
-"""Wishbone Classic support for LiteX (Standard HandShaking/Synchronous Feedback)"""
+"""Wishbone Classic support for LiteX (Standard HandShaking/Synchronous Feedback)
+
+Registered feedback bursts (Wishbone B4 constant address and incrementing bursts) are supported by
+SRAM, Wishbone2CSR and the converters.
+"""
 
 from math import log2
 
@@ -38,6 +42,28 @@ _layout = [
     ("err",              1, DIR_S_TO_M)
 ]
 
+CTI_BURST_NONE         = 0b000
+CTI_BURST_CONSTANT     = 0b001
+CTI_BURST_INCREMENTING = 0b010
+CTI_BURST_END          = 0b111
+
+BTE_LINEAR  = 0b00
+BTE_WRAP_4  = 0b01
+BTE_WRAP_8  = 0b10
+BTE_WRAP_16 = 0b11
+
+def _burst(cti):
+    # A constant address or incrementing burst continues after the current access.
+    return (cti == CTI_BURST_CONSTANT) | (cti == CTI_BURST_INCREMENTING)
+
+def _burst_next_adr(adr, cti, bte):
+    # Address of the next access of a burst: constant or incremented (linear or wrapped on 4/8/16
+    # accesses).
+    adr_next = adr + 1
+    for n, wrap in [(2, BTE_WRAP_4), (3, BTE_WRAP_8), (4, BTE_WRAP_16)]:
+        adr_next = Mux(bte == wrap, Cat((adr + 1)[:n], adr[n:]), adr_next)
+    return Mux(cti == CTI_BURST_CONSTANT, adr, adr_next)
+
 
 class Interface(Record):
     def __init__(self, data_width=32, adr_width=30):
@@ -80,6 +106,41 @@ class Interface(Record):
         yield from self._do_transaction()
         return (yield self.dat_r)
 
+    def _do_burst(self, adr, length, bte, datas=None, sel=None):
+        # Registered feedback incrementing burst: the next access is presented after each ack.
+        if sel is None:
+            sel = 2**len(self.sel) - 1
+        r = []
+        yield self.we.eq(datas is not None)
+        yield self.sel.eq(sel)
+        yield self.bte.eq(bte)
+        yield self.cyc.eq(1)
+        yield self.stb.eq(1)
+        for i in range(length):
+            yield self.adr.eq(adr)
+            if datas is not None:
+                yield self.dat_w.eq(datas[i])
+            yield self.cti.eq(CTI_BURST_END if i == (length - 1) else CTI_BURST_INCREMENTING)
+            yield
+            while not (yield self.ack):
+                yield
+            r.append((yield self.dat_r))
+            if bte == BTE_LINEAR:
+                adr += 1
+            else:
+                wrap = 2**(bte + 1)
+                adr  = (adr & ~(wrap - 1)) | ((adr + 1) & (wrap - 1))
+        yield self.cyc.eq(0)
+        yield self.stb.eq(0)
+        yield self.cti.eq(CTI_BURST_NONE)
+        return r
+
+    def burst_write(self, adr, datas, sel=None, bte=BTE_LINEAR):
+        yield from self._do_burst(adr, len(datas), bte, datas, sel)
+
+    def burst_read(self, adr, length, bte=BTE_LINEAR):
+        return (yield from self._do_burst(adr, length, bte))
+
     def get_ios(self, bus_name="wb"):
         subsignals = []
         for name, width, direction in self.layout:
@@ -234,6 +295,9 @@ class DownConverter(Module):
         Read from master are splitted in N reads to the the slave. Read datas from
         the slave are cached before being presented concatenated on the last access.
 
+    Bursts:
+        The N accesses to the slave are done with an incrementing burst, continued on the next
+        access of a linear incrementing burst of the master.
     """
     def __init__(self, master, slave):
         dw_from = len(master.dat_w)
@@ -242,21 +306,14 @@ class DownConverter(Module):
 
         # # #
 
-        skip    = Signal()
-        counter = Signal(max=ratio)
+        skip      = Signal()
+        skip_next = Signal()
+        last      = Signal()
+        counter   = Signal(max=ratio)
 
         # Control Path
-        fsm = FSM(reset_state="IDLE")
-        fsm = ResetInserter()(fsm)
-        self.submodules.fsm = fsm
-        self.comb += fsm.reset.eq(~master.cyc)
-        fsm.act("IDLE",
-            NextValue(counter, 0),
-            If(master.stb & master.cyc,
-                NextState("CONVERT"),
-            )
-        )
-        fsm.act("CONVERT",
+        self.comb += [
+            last.eq(counter == (ratio - 1)),
             slave.adr.eq(Cat(counter, master.adr)),
             Case(counter, {i: slave.sel.eq(master.sel[i*dw_to//8:]) for i in range(ratio)}),
             If(master.stb & master.cyc,
@@ -264,15 +321,37 @@ class DownConverter(Module):
                 slave.we.eq(master.we),
                 slave.cyc.eq(~skip),
                 slave.stb.eq(~skip),
-                If(slave.ack | skip,
-                    NextValue(counter, counter + 1),
-                    If(counter == (ratio - 1),
-                        master.ack.eq(1),
-                        NextState("IDLE")
-                    )
+                If((slave.ack | skip) & last,
+                    master.ack.eq(1)
                 )
             )
-        )
+        ]
+        self.sync += [
+            If(master.stb & master.cyc & (slave.ack | skip),
+                counter.eq(counter + 1)
+            ),
+            If(~master.cyc,
+                counter.eq(0)
+            )
+        ]
+
+        # Burst Path (skipped accesses end the burst)
+        self.comb += [
+            Case(counter, {i: skip_next.eq(master.sel[(i + 1)*dw_to//8:(i + 2)*dw_to//8] == 0)
+                for i in range(ratio - 1)}),
+            slave.bte.eq(BTE_LINEAR),
+            If(last,
+                If((master.cti == CTI_BURST_INCREMENTING) & (master.bte == BTE_LINEAR),
+                    slave.cti.eq(CTI_BURST_INCREMENTING)
+                ).Else(
+                    slave.cti.eq(CTI_BURST_END)
+                )
+            ).Elif(skip_next,
+                slave.cti.eq(CTI_BURST_END)
+            ).Else(
+                slave.cti.eq(CTI_BURST_INCREMENTING)
+            )
+        ]
 
         # Write Datapath
         self.comb += Case(counter, {i: slave.dat_w.eq(master.dat_w[i*dw_to:]) for i in range(ratio)})
@@ -283,7 +362,11 @@ class DownConverter(Module):
         self.sync += If(slave.ack | skip, dat_r.eq(master.dat_r))
 
 class UpConverter(Module):
-    """UpConverter"""
+    """UpConverter
+
+    Bursts of the master are converted to constant address bursts of the slave for the accesses
+    to the same slave word and continue as incrementing bursts on the next word.
+    """
     def __init__(self, master, slave):
         dw_from = len(master.dat_w)
         dw_to   = len(slave.dat_w)
@@ -291,7 +374,23 @@ class UpConverter(Module):
 
         # # #
 
-        self.comb += master.connect(slave, omit={"adr", "sel", "dat_w", "dat_r"})
+        self.comb += master.connect(slave, omit={"adr", "sel", "dat_w", "dat_r", "cti", "bte"})
+
+        adr_next = Signal(len(master.adr))
+        self.comb += [
+            adr_next.eq(_burst_next_adr(master.adr, master.cti, master.bte)),
+            slave.cti.eq(master.cti),
+            slave.bte.eq(BTE_LINEAR),
+            If(_burst(master.cti),
+                If(adr_next[int(log2(ratio)):] == master.adr[int(log2(ratio)):],
+                    slave.cti.eq(CTI_BURST_CONSTANT)
+                ).Elif(adr_next[int(log2(ratio)):] == (master.adr[int(log2(ratio)):] + 1),
+                    slave.cti.eq(CTI_BURST_INCREMENTING)
+                ).Else(
+                    slave.cti.eq(CTI_BURST_END)
+                )
+            )
+        ]
         cases = {}
         for i in range(ratio):
             cases[i] = [
@@ -355,18 +454,38 @@ class SRAM(Module):
         if not read_only:
             self.comb += [port.we[i].eq(self.bus.cyc & self.bus.stb & self.bus.we & self.bus.sel[i])
                 for i in range(bus_data_width//8)]
-        # address and data
+        # address and data: during the ack of a burst read, the memory is read at the predicted
+        # address of the next access
+        burst       = Signal()
+        adr_next    = Signal(len(self.bus.adr))
+        adr_r       = Signal(len(port.adr))
+        predicted_r = Signal()
+        predicted_w = Signal()
         self.comb += [
-            port.adr.eq(self.bus.adr[:len(port.adr)]),
+            burst.eq(_burst(self.bus.cti)),
+            adr_next.eq(_burst_next_adr(self.bus.adr, self.bus.cti, self.bus.bte)),
+            If(self.bus.ack & burst & ~self.bus.we,
+                port.adr.eq(adr_next[:len(port.adr)])
+            ).Else(
+                port.adr.eq(self.bus.adr[:len(port.adr)])
+            ),
             self.bus.dat_r.eq(port.dat_r)
         ]
         if not read_only:
             self.comb += port.dat_w.eq(self.bus.dat_w),
-        # generate ack
+        # generate ack: registered for classic accesses (and the first access of a burst), the next
+        # accesses of a burst are acked on the cycle they are presented when they follow the burst
+        # (reads at the predicted address, writes)
+        ack = Signal()
         self.sync += [
-            self.bus.ack.eq(0),
-            If(self.bus.cyc & self.bus.stb & ~self.bus.ack, self.bus.ack.eq(1))
+            ack.eq(self.bus.cyc & self.bus.stb & ~self.bus.ack),
+            adr_r.eq(adr_next[:len(port.adr)]),
+            predicted_r.eq(self.bus.ack & burst & ~self.bus.we),
+            predicted_w.eq(self.bus.ack & burst &  self.bus.we),
         ]
+        self.comb += self.bus.ack.eq(ack | (self.bus.cyc & self.bus.stb & (
+            (predicted_r & ~self.bus.we & (adr_r == self.bus.adr[:len(port.adr)])) |
+            (predicted_w &  self.bus.we))))
 
 # Wishbone To CSR ----------------------------------------------------------------------------------
 
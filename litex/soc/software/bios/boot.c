@@ -148,6 +148,39 @@ static uint32_t get_uint32(unsigned char* data)
 			(uint32_t) data[3];
 }
 
+/* Decompress a SFL_CMD_LOAD_LZ4 payload (LZ4 block format sequences) to dst. Matches can reference
+ * the data loaded before dst by the previous frames. */
+static void sfl_lz4_decompress(char *dst, const unsigned char *src, int length)
+{
+	const unsigned char *end = src + length;
+	const char *match;
+	unsigned int token;
+	unsigned int n;
+
+	while(src < end) {
+		token = *src++;
+
+		/* Literals */
+		n = token >> 4;
+		if(n == 15)
+			do n += *src; while(*src++ == 255);
+		while(n--)
+			*dst++ = *src++;
+		if(src >= end)
+			break;
+
+		/* Match */
+		match = dst - (src[0] | (src[1] << 8));
+		src += 2;
+		n = token & 0xf;
+		if(n == 15)
+			do n += *src; while(*src++ == 255);
+		n += 4;
+		while(n--)
+			*dst++ = *match++;
+	}
+}
+
 #define MAX_FAILED 5
 
 /* Returns 1 if other boot methods should be tried */
@@ -225,6 +258,20 @@ int serialboot(void)
 					uart_write(SFL_ACK_SUCCESS);
 				break;
 			}
+			case SFL_CMD_LOAD_LZ4: {
+				failed = 0;
+				sfl_lz4_decompress((char *)(uintptr_t) get_uint32(&frame.payload[0]),
+					&frame.payload[4], frame.payload_length - 4);
+				uart_write(SFL_ACK_SUCCESS);
+				break;
+			}
+			case SFL_CMD_FEATURES:
+				failed = 0;
+				if((frame.payload_length == 1) && !(frame.payload[0] & ~SFL_FEATURES))
+					uart_write(SFL_ACK_SUCCESS);
+				else
+					uart_write(SFL_ACK_UNKNOWN);
+				break;
 			case SFL_CMD_JUMP: {
 				uint32_t addr;
 
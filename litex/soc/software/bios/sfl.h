@@ -19,6 +19,12 @@ struct sfl_frame {
 #define SFL_CMD_ABORT		0x00
 #define SFL_CMD_LOAD		0x01
 #define SFL_CMD_JUMP		0x02
+#define SFL_CMD_FEATURES	0x03
+#define SFL_CMD_LOAD_LZ4	0x04
+
+/* Features (requested by the host with SFL_CMD_FEATURES) */
+#define SFL_FEATURE_LZ4		0x01
+#define SFL_FEATURES		(SFL_FEATURE_LZ4)
 
 /* Replies */
 #define SFL_ACK_SUCCESS		'K'
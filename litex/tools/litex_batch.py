@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Batch build of SoC variants: runs LiteX target scripts concurrently, shares identical software
+# (BIOS) builds between them and reports per-stage build timings.
+#
+# The batch description is a JSON list of variants:
+# [
+#     {"name": "arty_vex",  "target": "litex_boards.targets.digilent_arty", "args": ["--build"]},
+#     {"name": "arty_serv", "target": "litex_boards.targets.digilent_arty", "args": ["--build", "--cpu-type=serv"]}
+# ]
+
+import os
+import sys
+import json
+import argparse
+
+from litex.soc.integration.builder import TargetBuildVariant, build_variants
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="LiteX batch build of SoC variants.")
+    parser.add_argument("batch",                                             help="Batch description (JSON).")
+    parser.add_argument("-j", "--jobs",         default=None, type=int,      help="Number of variants built in parallel (default=number of CPUs).")
+    parser.add_argument("--output-dir",         default="build",             help="Base output directory (variants are built in output-dir/name).")
+    parser.add_argument("--software-cache-dir", default=None,                help="Software builds cache directory (default=$LITEX_SOFTWARE_CACHE_DIR or output-dir/.software).")
+    parser.add_argument("--no-share",           action="store_true",         help="Disable Software builds sharing between variants.")
+    parser.add_argument("--only",               default=None, nargs="+",     help="Only build the specified variants.")
+    parser.add_argument("--verbose",            action="store_true",         help="Show build outputs (instead of output-dir/name/build.log).")
+    args = parser.parse_args()
+
+    with open(args.batch) as f:
+        variants = json.load(f)
+    if args.only is not None:
+        variants = [v for v in variants if v["name"] in args.only]
+
+    cache_dir = args.software_cache_dir or os.environ.get("LITEX_SOFTWARE_CACHE_DIR", None)
+    results   = build_variants(
+        variants           = [TargetBuildVariant(v["name"], v["target"], v.get("args", []), args.verbose)
+            for v in variants],
+        jobs               = args.jobs,
+        output_dir         = args.output_dir,
+        software_cache_dir = cache_dir,
+        share              = not args.no_share)
+    sys.exit(any(isinstance(r, Exception) for r in results.values()))
+
+if __name__ == "__main__":
+    main()
@@ -10,22 +10,112 @@
 import os
 import argparse
 import socket
+import collections
 
 from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
 from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
 from litex.tools.remote.etherbone import EtherboneIPC
 from litex.tools.remote.csr_builder import CSRBuilder
+from litex.tools.remote.comm_bulk import CommBulk
+
+# Etherbone Future --------------------------------------------------------------------------------
+
+class EtherboneFuture:
+    """Result of a pipelined/batched read, filled when the Etherbone replies are received."""
+    def __init__(self, wait, addr, length=None):
+        self._wait     = wait
+        self.addr      = addr
+        self.length    = length
+        self.datas     = []
+        self.remaining = 1 if length is None else length
+
+    def done(self):
+        return self.remaining == 0
+
+    def result(self):
+        while not self.done():
+            self._wait()
+        return self.datas[0] if self.length is None else self.datas
+
+# Remote Client Batch ------------------------------------------------------------------------------
+
+class RemoteClientBatch:
+    """Collect reads/writes and send them as few Etherbone records as possible.
+
+    Consecutive writes to consecutive addresses are merged in a single write, reads are merged in
+    read records of up to 255 addresses (a record does its writes before its reads, so a read
+    followed by a write starts a new record). Reads return EtherboneFuture objects, resolved when
+    the batch is flushed (on context exit or when a result is requested).
+    """
+    def __init__(self, client):
+        self.client  = client
+        self.records = [] # [base_addr, write_datas, read_addrs, [(future, n), ...]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.flush()
+
+    def _record(self):
+        record = [0, [], [], []]
+        self.records.append(record)
+        return record
+
+    def write(self, addr, datas):
+        datas = datas if isinstance(datas, list) else [datas]
+        addr  = self.client.base_address + addr
+        record = self.records[-1] if self.records else self._record()
+        if record[2] or (record[1] and addr != record[0] + 4*len(record[1])):
+            record = self._record()
+        for data in datas:
+            if len(record[1]) == 255:
+                record = self._record()
+            if not record[1]:
+                record[0] = addr
+            record[1].append(data)
+            addr += 4
+
+    def read(self, addr, length=None, burst="incr"):
+        future = EtherboneFuture(self.flush_and_receive, addr, length)
+        incr   = (burst == "incr")
+        addrs  = [self.client.base_address + addr + 4*incr*j for j in range(future.remaining)]
+        record = self.records[-1] if self.records else self._record()
+        while addrs:
+            if len(record[2]) == 255:
+                record = self._record()
+            n = min(len(addrs), 255 - len(record[2]))
+            record[2].extend(addrs[:n])
+            record[3].append((future, n))
+            addrs = addrs[n:]
+        return future
+
+    def flush(self):
+        records, self.records = self.records, []
+        for base_addr, write_datas, read_addrs, futures in records:
+            self.client._send_record(base_addr, write_datas, read_addrs, futures)
+
+    def flush_and_receive(self):
+        if self.records:
+            self.flush()
+        else:
+            self.client._receive_reply()
 
 # Remote Client ------------------------------------------------------------------------------------
 
-class RemoteClient(EtherboneIPC, CSRBuilder):
-    def __init__(self, host="localhost", port=1234, base_address=0, csr_csv=None, csr_data_width=None, debug=False):
+class RemoteClient(EtherboneIPC, CSRBuilder, CommBulk):
+    max_burst = 255
+
+    def __init__(self, host="localhost", port=1234, base_address=0, csr_csv=None, csr_data_width=None, debug=False, window=16, csr_json=None):
         # If csr_csv set to None and local csr.csv file exists, use it.
         if csr_csv is None and os.path.exists("csr.csv"):
             csr_csv = "csr.csv"
+        # If csr_json set to None and local csr.json file exists, use it (for CSR fields).
+        if csr_json is None and os.path.exists("csr.json"):
+            csr_json = "csr.json"
         # If valid csr_csv file found, build the CSRs.
         if csr_csv is not None:
-            CSRBuilder.__init__(self, self, csr_csv, csr_data_width)
+            CSRBuilder.__init__(self, self, csr_csv, csr_data_width, csr_json)
         # Else if csr_data_width set to None, force to csr_data_width 32-bit.
         elif csr_data_width is None:
             csr_data_width = 32
@@ -33,56 +123,101 @@ class RemoteClient(EtherboneIPC, CSRBuilder):
         self.port         = port
         self.debug        = debug
         self.base_address = base_address if base_address is not None else 0
+        self.window       = window # Maximum number of read records awaiting a reply.
+        self.pending      = collections.deque()
 
     def open(self):
         if hasattr(self, "socket"):
             return
         self.socket = socket.create_connection((self.host, self.port), 5.0)
         self.socket.settimeout(5.0)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     def close(self):
         if not hasattr(self, "socket"):
             return
         self.socket.close()
         del self.socket
+        self.pending.clear()
 
-    def read(self, addr, length=None, burst="incr"):
-        length_int = 1 if length is None else length
-        # Prepare packet
+    def _send_record(self, base_addr, write_datas, read_addrs, futures=[]):
+        # Keep at most window read records in flight, replies come back in order.
+        if read_addrs:
+            while len(self.pending) >= self.window:
+                self._receive_reply()
         record = EtherboneRecord()
-        incr = (burst == "incr")
-        record.reads  = EtherboneReads(addrs=[self.base_address + addr + 4*incr*j for j in range(length_int)])
-        record.rcount = len(record.reads)
+        if write_datas:
+            record.writes = EtherboneWrites(base_addr=base_addr, datas=write_datas)
+            record.wcount = len(record.writes)
+        if read_addrs:
+            record.reads  = EtherboneReads(addrs=read_addrs)
+            record.rcount = len(record.reads)
 
-        # Send packet
         packet = EtherbonePacket()
         packet.records = [record]
         packet.encode()
         self.send_packet(self.socket, packet)
 
-        # Receive response
-        packet = EtherbonePacket(self.receive_packet(self.socket))
+        if self.debug:
+            for i, data in enumerate(write_datas):
+                print("write 0x{:08x} @ 0x{:08x}".format(data, base_addr + 4*i))
+        if read_addrs:
+            self.pending.append((read_addrs, futures))
+
+    def _receive_reply(self):
+        packet = self.receive_packet(self.socket)
+        if packet == 0:
+            raise ConnectionError("Connection closed by server.")
+        packet = EtherbonePacket(packet)
         packet.decode()
         datas = packet.records.pop().writes.get_datas()
+        read_addrs, futures = self.pending.popleft()
         if self.debug:
-            for i, data in enumerate(datas):
-                print("read 0x{:08x} @ 0x{:08x}".format(data, self.base_address + addr + 4*i))
-        return datas[0] if length is None else datas
+            for data, addr in zip(datas, read_addrs):
+                print("read 0x{:08x} @ 0x{:08x}".format(data, addr))
+        offset = 0
+        for future, n in futures:
+            future.datas     += datas[offset:offset + n]
+            future.remaining -= n
+            offset += n
+
+    def read_async(self, addr, length=None, burst="incr"):
+        """Send a read without waiting for its reply, returns an EtherboneFuture."""
+        future = EtherboneFuture(self._receive_reply, addr, length)
+        incr   = (burst == "incr")
+        addrs  = [self.base_address + addr + 4*incr*j for j in range(future.remaining)]
+        for i in range(0, len(addrs), 255):
+            chunk = addrs[i:i + 255]
+            self._send_record(0, [], chunk, [(future, len(chunk))])
+        return future
+
+    def read(self, addr, length=None, burst="incr"):
+        return self.read_async(addr, length, burst).result()
+
+    def _read_chunks(self, addr, length):
+        # Bulk reads: keep up to window chunks in flight.
+        futures = collections.deque()
+        for offset in range(0, length, self.max_burst):
+            futures.append(self.read_async(addr + 4*offset, min(self.max_burst, length - offset)))
+            if len(futures) > self.window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
 
     def write(self, addr, datas):
         datas = datas if isinstance(datas, list) else [datas]
-        record = EtherboneRecord()
-        record.writes = EtherboneWrites(base_addr=self.base_address + addr, datas=[d for d in datas])
-        record.wcount = len(record.writes)
-
-        packet = EtherbonePacket()
-        packet.records = [record]
-        packet.encode()
-        self.send_packet(self.socket, packet)
-
-        if self.debug:
-            for i, data in enumerate(datas):
-                print("write 0x{:08x} @ 0x{:08x}".format(data, self.base_address + addr + 4*i))
+        addr  = self.base_address + addr
+        for i in range(0, len(datas), 255):
+            self._send_record(addr + 4*i, datas[i:i + 255], [])
+
+    def batch(self):
+        """Return a RemoteClientBatch context collecting reads/writes, sent on exit."""
+        return RemoteClientBatch(self)
+
+    def wait(self):
+        """Wait for the replies of all outstanding reads."""
+        while self.pending:
+            self._receive_reply()
 
 # Utils --------------------------------------------------------------------------------------------
 
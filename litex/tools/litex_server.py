@@ -15,6 +15,7 @@ import sys
 import socket
 import time
 import threading
+import collections
 
 from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord, EtherboneWrites
 from litex.tools.remote.etherbone import EtherboneIPC
@@ -69,12 +70,44 @@ def _read_merger(addrs, max_length=256, bursts=["incr", "fixed"]):
 
 # Remote Server ------------------------------------------------------------------------------------
 
+class RemoteServerClient:
+    def __init__(self, socket, addr):
+        self.socket   = socket
+        self.name     = "{}:{}".format(*addr)
+        self.requests = collections.deque() # (enqueue time, record)
+        # Metrics.
+        self.count         = 0
+        self.latency_total = 0.0
+        self.latency_max   = 0.0
+
+    def metrics(self):
+        return {
+            "requests"    : self.count,
+            "latency_avg" : self.latency_total/self.count if self.count else 0.0,
+            "latency_max" : self.latency_max,
+        }
+
+
 class RemoteServer(EtherboneIPC):
-    def __init__(self, comm, bind_ip, bind_port=1234):
+    """Etherbone TCP server bridging clients to a Comm (UART, UDP, PCIe, USB...).
+
+    Client threads only receive and queue records; a single bridge worker owns the Comm and serves
+    clients in rounds, taking one record from each client with pending records (so a busy client
+    can't starve the others). The reads of a round are merged (with _read_merger) into as few Comm
+    accesses as possible, then split back into one reply per record.
+    """
+    def __init__(self, comm, bind_ip, bind_port=1234, debug=False):
         self.comm      = comm
         self.bind_ip   = bind_ip
         self.bind_port = bind_port
-        self.lock      = False
+        self.debug     = debug
+        self.condition = threading.Condition()
+        self.ready     = collections.deque() # Clients with pending records, in service order.
+        self.worker    = None
+        # Metrics.
+        self.queue_depth     = 0
+        self.queue_depth_max = 0
+        self.clients_metrics = {}
 
     def open(self):
         if hasattr(self, "socket"):
@@ -85,7 +118,7 @@ class RemoteServer(EtherboneIPC):
         if hasattr(socket, "SO_REUSEPORT"):
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.socket.bind((self.bind_ip, self.bind_port))
-        print("tcp port: {:d}".format(self.bind_port))
+        print("tcp port: {:d}".format(self.socket.getsockname()[1]))
         self.socket.listen(1)
         self.comm.open()
 
@@ -96,10 +129,112 @@ class RemoteServer(EtherboneIPC):
         self.socket.close()
         del self.socket
 
+    def metrics(self):
+        with self.condition:
+            return {
+                "queue_depth"     : self.queue_depth,
+                "queue_depth_max" : self.queue_depth_max,
+                "clients"         : {k: dict(v) for k, v in self.clients_metrics.items()},
+            }
+
+    def _enqueue(self, client, record):
+        with self.condition:
+            if not client.requests:
+                self.ready.append(client)
+            client.requests.append((time.time(), record))
+            self.queue_depth    += 1
+            self.queue_depth_max = max(self.queue_depth_max, self.queue_depth)
+            self.condition.notify()
+
+    def _read_params(self):
+        max_length = getattr(self.comm, "max_burst", 1)
+        bursts = {
+            "CommUART": ["incr", "fixed"]
+        }.get(self.comm.__class__.__name__, ["incr"])
+        return max_length, bursts
+
+    def _serve_round(self, requests):
+        # Writes first (in service order), then all reads merged.
+        addrs = []
+        for client, t, record in requests:
+            if record.writes != None:
+                self.comm.write(record.writes.base_addr, record.writes.get_datas())
+            if record.reads != None:
+                addrs += record.reads.get_addrs()
+        reads = []
+        if addrs:
+            max_length, bursts = self._read_params()
+            for addr, length, burst in _read_merger(addrs,
+                max_length  = max_length,
+                bursts      = bursts):
+                reads += self.comm.read(addr, length, burst)
+
+        # Replies (metrics are updated first, so they are up to date when the client gets its reply).
+        offset = 0
+        for client, t, record in requests:
+            latency = time.time() - t
+            with self.condition:
+                client.count         += 1
+                client.latency_total += latency
+                client.latency_max    = max(client.latency_max, latency)
+                self.clients_metrics[client.name] = client.metrics()
+            if record.reads != None:
+                length = len(record.reads)
+                reply  = EtherboneRecord()
+                reply.writes = EtherboneWrites(base_addr=record.reads.base_ret_addr,
+                    datas=reads[offset:offset + length])
+                reply.wcount = len(reply.writes)
+                offset += length
+
+                packet = EtherbonePacket()
+                packet.records = [reply]
+                packet.encode()
+                try:
+                    self.send_packet(client.socket, packet)
+                except OSError:
+                    pass
+
+    def _bridge_thread(self):
+        while True:
+            with self.condition:
+                while not self.ready:
+                    self.condition.wait()
+                requests = []
+                for client in self.ready:
+                    t, record = client.requests.popleft()
+                    requests.append((client, t, record))
+                self.ready = collections.deque(c for c in self.ready if c.requests)
+                self.queue_depth -= len(requests)
+            try:
+                self._serve_round(requests)
+            except Exception as e:
+                # The Comm failed: the replies of the round are lost, close its clients (they get a
+                # ConnectionError instead of waiting forever) and keep serving the others.
+                print("Bridge error: {}".format(e))
+                for client in set(client for client, t, record in requests):
+                    self._drop_client(client)
+
+    def _drop_client(self, client):
+        with self.condition:
+            if client in self.ready:
+                self.ready.remove(client)
+            self.queue_depth -= len(client.requests)
+            client.requests.clear()
+        try:
+            client.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
     def _serve_thread(self):
         while True:
-            client_socket, addr = self.socket.accept()
+            try:
+                client_socket, addr = self.socket.accept()
+            except (OSError, AttributeError):
+                return # Server closed.
             print("Connected with " + addr[0] + ":" + str(addr[1]))
+            # Replies are small and latency bound, don't let Nagle delay them.
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = RemoteServerClient(client_socket, addr)
             try:
                 while True:
                     try:
@@ -110,55 +245,23 @@ class RemoteServer(EtherboneIPC):
                         break
                     packet = EtherbonePacket(packet)
                     packet.decode()
-
-                    record = packet.records.pop()
-
-                    # Wait for lock
-                    while self.lock:
-                        time.sleep(0.01)
-
-                    # Set lock
-                    self.lock = True
-
-                    # Handle writes:
-                    if record.writes != None:
-                        self.comm.write(record.writes.base_addr, record.writes.get_datas())
-
-                    # Handle reads
-                    if record.reads != None:
-                        max_length = {
-                            "CommUART": 256,
-                            "CommUDP":    1,
-                        }.get(self.comm.__class__.__name__, 1)
-                        bursts = {
-                            "CommUART": ["incr", "fixed"]
-                        }.get(self.comm.__class__.__name__, ["incr"])
-                        reads = []
-                        for addr, length, burst in _read_merger(record.reads.get_addrs(),
-                            max_length  = max_length,
-                            bursts      = bursts):
-                            reads += self.comm.read(addr, length, burst)
-
-                        record = EtherboneRecord()
-                        record.writes = EtherboneWrites(datas=reads)
-                        record.wcount = len(record.writes)
-
-                        packet = EtherbonePacket()
-                        packet.records = [record]
-                        packet.encode()
-                        self.send_packet(client_socket, packet)
-
-                    # release lock
-                    self.lock = False
-
+                    self._enqueue(client, packet.records.pop())
             finally:
                 print("Disconnect")
+                if self.debug:
+                    metrics = client.metrics()
+                    print("{} requests, latency avg: {:.3f}ms / max: {:.3f}ms".format(
+                        metrics["requests"],
+                        metrics["latency_avg"]*1e3,
+                        metrics["latency_max"]*1e3))
                 client_socket.close()
 
     def start(self, nthreads):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._bridge_thread, daemon=True)
+            self.worker.start()
         for i in range(nthreads):
-            self.serve_thread = threading.Thread(target=self._serve_thread)
-            self.serve_thread.setDaemon(True)
+            self.serve_thread = threading.Thread(target=self._serve_thread, daemon=True)
             self.serve_thread.start()
 
 # Run ----------------------------------------------------------------------------------------------
@@ -266,7 +369,7 @@ def main():
         parser.print_help()
         exit()
 
-    server = RemoteServer(comm, args.bind_ip, int(args.bind_port))
+    server = RemoteServer(comm, args.bind_ip, int(args.bind_port), debug=args.debug)
     server.open()
     server.start(4)
     try:
@@ -124,6 +124,7 @@ class SimSoC(SoCCore):
         with_spi_flash        = False,
         spi_flash_init        = [],
         with_gpio             = False,
+        with_checkpoint       = False,
         sim_debug             = False,
         trace_reset_on        = False,
         **kwargs):
@@ -163,7 +164,7 @@ class SimSoC(SoCCore):
                 l2_cache_min_data_width = kwargs.get("min_l2_data_width", 128),
                 l2_cache_reverse        = False
             )
-            if sdram_init != []:
+            if len(sdram_init):
                 # Skip SDRAM test to avoid corrupting pre-initialized contents.
                 self.add_constant("SDRAM_TEST_DISABLE")
             else:
@@ -274,6 +275,10 @@ class SimSoC(SoCCore):
             self.submodules.gpio = GPIOTristate(platform.request("gpio"), with_irq=True)
             self.irq.add("gpio", use_loc_if_exists=True)
 
+        # Checkpoint -------------------------------------------------------------------------------
+        if with_checkpoint:
+            platform.add_checkpoint(self)
+
         # Simulation debugging ----------------------------------------------------------------------
         if sim_debug:
             platform.add_debug(self, reset=1 if trace_reset_on else 0)
@@ -324,6 +329,7 @@ def sim_args(parser):
     parser.add_argument("--threads",              default=1,               help="Set number of threads (default=1)")
     parser.add_argument("--rom-init",             default=None,            help="rom_init file")
     parser.add_argument("--ram-init",             default=None,            help="ram_init file")
+    parser.add_argument("--mem-preload",          action="store_true",     help="Load rom_init/ram_init files at simulation startup (no rebuild on changes)")
     parser.add_argument("--with-sdram",           action="store_true",     help="Enable SDRAM support")
     parser.add_argument("--sdram-module",         default="MT48LC16M16",   help="Select SDRAM chip")
     parser.add_argument("--sdram-data-width",     default=32,              help="Set SDRAM chip data width")
@@ -344,7 +350,14 @@ def sim_args(parser):
     parser.add_argument("--trace-fst",            action="store_true",     help="Enable FST tracing (default=VCD)")
     parser.add_argument("--trace-start",          default="0",             help="Time to start tracing (ps)")
     parser.add_argument("--trace-end",            default="-1",            help="Time to end tracing (ps)")
+    parser.add_argument("--checkpoint-save",      default=None,            help="Save simulation checkpoint to file")
+    parser.add_argument("--checkpoint-at-cycle",  default=None,            help="Save checkpoint after this number of sys_clk cycles")
+    parser.add_argument("--checkpoint-at-pattern", default=None,           help="Save checkpoint when the UART output matches this string")
+    parser.add_argument("--checkpoint-on-signal", action="store_true",     help="Save checkpoint when requested from software (sim_checkpoint CSR)")
+    parser.add_argument("--checkpoint-exit",      action="store_true",     help="Exit simulation once checkpoint is saved")
+    parser.add_argument("--checkpoint-restore",   default=None,            help="Restore simulation from checkpoint file")
     parser.add_argument("--opt-level",            default="O3",            help="Compilation optimization level")
+    parser.add_argument("--sim-cache-dir",        default=None,            help="Shared Verilator build cache directory (default=$LITEX_SIM_CACHE_DIR)")
     parser.add_argument("--sim-debug",            action="store_true",     help="Add simulation debugging modules")
     parser.add_argument("--gtkwave-savefile",     action="store_true",     help="Generate GTKWave savefile")
     parser.add_argument("--non-interactive",      action="store_true",     help="Run simulation without user input")
@@ -371,13 +384,13 @@ def main():
         sim_config.add_module("serial2console", "serial")
 
     # ROM.
-    if args.rom_init:
+    if args.rom_init and not args.mem_preload:
         soc_kwargs["integrated_rom_init"] = get_mem_data(args.rom_init, cpu.endianness)
 
     # RAM / SDRAM.
     soc_kwargs["integrated_main_ram_size"] = args.integrated_main_ram_size
     if args.integrated_main_ram_size:
-        if args.ram_init is not None:
+        if args.ram_init is not None and not args.mem_preload:
             soc_kwargs["integrated_main_ram_init"] = get_mem_data(args.ram_init, cpu.endianness)
     elif args.with_sdram:
         assert args.ram_init is None
@@ -395,6 +408,22 @@ def main():
     if args.with_i2c:
         sim_config.add_module("spdeeprom", "i2c")
 
+    # Checkpoints.
+    checkpoint_triggers = [args.checkpoint_at_cycle, args.checkpoint_at_pattern, args.checkpoint_on_signal]
+    if args.checkpoint_save is not None and not any(checkpoint_triggers):
+        parser.error("--checkpoint-save requires --checkpoint-at-cycle, --checkpoint-at-pattern or --checkpoint-on-signal.")
+    if args.checkpoint_save is None and (any(checkpoint_triggers) or args.checkpoint_exit):
+        parser.error("--checkpoint-at-cycle/-at-pattern/-on-signal/-exit require --checkpoint-save.")
+    savable = args.checkpoint_save is not None or args.checkpoint_restore is not None
+    if savable:
+        sim_config.add_checkpoint(
+            save    = args.checkpoint_save,
+            restore = args.checkpoint_restore,
+            cycles  = None if args.checkpoint_at_cycle is None else int(float(args.checkpoint_at_cycle)),
+            pattern = args.checkpoint_at_pattern,
+            signal  = args.checkpoint_on_signal,
+            exit    = args.checkpoint_exit)
+
     trace_start = int(float(args.trace_start))
     trace_end = int(float(args.trace_end))
 
@@ -408,6 +437,7 @@ def main():
         with_sdcard    = args.with_sdcard,
         with_spi_flash = args.with_spi_flash,
         with_gpio      = args.with_gpio,
+        with_checkpoint = args.checkpoint_on_signal,
         sim_debug      = args.sim_debug,
         trace_reset_on = trace_start > 0 or trace_end > 0,
         sdram_init     = [] if args.sdram_init is None else get_mem_data(args.sdram_init, cpu.endianness),
@@ -415,6 +445,13 @@ def main():
         **soc_kwargs)
     if args.ram_init is not None or args.sdram_init is not None:
         soc.add_constant("ROM_BOOT_ADDRESS", soc.mem_map["main_ram"])
+    if args.mem_preload:
+        # ROM/RAM contents are loaded at simulation startup (ROM size is --integrated-rom-size).
+        if args.rom_init and soc.integrated_rom_size:
+            soc.integrated_rom_initialized = True
+            sim_config.add_mem_init(soc.rom.mem, args.rom_init, cpu.endianness)
+        if args.ram_init is not None and args.integrated_main_ram_size:
+            sim_config.add_mem_init(soc.main_ram.mem, args.ram_init, cpu.endianness)
     if args.with_ethernet:
         for i in range(4):
             soc.add_constant("LOCALIP{}".format(i+1), int(args.local_ip.split(".")[i]))
@@ -435,8 +472,10 @@ def main():
             opt_level   = args.opt_level,
             trace       = args.trace,
             trace_fst   = args.trace_fst,
+            savable     = savable,
             trace_start = trace_start,
             trace_end   = trace_end,
+            cache_dir   = args.sim_cache_dir,
             interactive = not args.non_interactive
         )
         if args.with_analyzer:
@@ -18,6 +18,7 @@ import multiprocessing
 import argparse
 import json
 import socket
+import collections
 
 # Console ------------------------------------------------------------------------------------------
 
@@ -215,6 +216,11 @@ sfl_outstanding    = 128
 sfl_cmd_abort       = b"\x00"
 sfl_cmd_load        = b"\x01"
 sfl_cmd_jump        = b"\x02"
+sfl_cmd_features    = b"\x03"
+sfl_cmd_load_lz4    = b"\x04"
+
+# Features
+sfl_feature_lz4 = 0x01
 
 # Replies
 sfl_ack_success  = b"K"
@@ -238,6 +244,98 @@ class SFLFrame:
         packet += self.payload
         return packet
 
+def sfl_load_frames(data, address, chunk, compress=False):
+    """Generate the (size, frame) load frames of data, size being the number of bytes loaded.
+
+    Compressed frames are only used when they load more data than a raw frame."""
+    table  = {}
+    offset = 0
+    while offset < len(data):
+        frame = SFLFrame()
+        if compress:
+            frame.payload, end = lz4_compress(data, offset, chunk, table)
+        if compress and (end - offset) > chunk:
+            frame.cmd = sfl_cmd_load_lz4
+        else:
+            frame.cmd     = sfl_cmd_load
+            frame.payload = data[offset:offset + chunk]
+            end           = offset + len(frame.payload)
+        frame.payload = (address + offset).to_bytes(4, "big") + frame.payload
+        yield (end - offset, frame)
+        offset = end
+
+# LZ4 ----------------------------------------------------------------------------------------------
+
+# Compressed loads use the LZ4 block format: sequences of a token (literals length, match length - 4,
+# 15 extended with bytes until one is not 255), literals and a 2-byte little-endian match offset,
+# the last sequence of a frame possibly without match. Each frame decompresses independently to its
+# load address and matches reference data already loaded (in the frame or the previous ones), so
+# frames can be sent again after errors as the raw ones.
+
+lz4_min_match  = 4
+lz4_max_offset = 0xffff
+
+def _lz4_length_size(n):
+    return 0 if n < 15 else (n - 15)//255 + 1
+
+def _lz4_length(n):
+    n -= 15
+    return bytes([255]*(n//255) + [n%255])
+
+def _lz4_sequence(literals, offset=None, match=lz4_min_match):
+    m = match - lz4_min_match
+    r = bytes([(min(len(literals), 15) << 4) | min(m, 15)])
+    if len(literals) >= 15:
+        r += _lz4_length(len(literals))
+    r += literals
+    if offset is not None:
+        r += offset.to_bytes(2, "little")
+        if m >= 15:
+            r += _lz4_length(m)
+    return r
+
+def lz4_compress(data, start, size, table):
+    """Compress data from start to a payload of at most size bytes, return (payload, end).
+
+    table maps the 4-byte sequences to their last position in data and is kept between calls."""
+    payload = bytearray()
+    literals = position = start
+    misses   = 0
+    while position <= len(data) - lz4_min_match:
+        key   = data[position:position + lz4_min_match]
+        match = table.get(key, None)
+        table[key] = position
+        if match is None or not (0 < position - match <= lz4_max_offset):
+            # Skip faster in incompressible data.
+            misses   += 1
+            position += 1 + (misses >> 6)
+            continue
+        length = lz4_min_match
+        while position + length + 8 <= len(data) and \
+            data[position + length:position + length + 8] == data[match + length:match + length + 8]:
+            length += 8
+        while position + length < len(data) and data[position + length] == data[match + length]:
+            length += 1
+        n = position - literals
+        if len(payload) + 1 + _lz4_length_size(n) + n + 2 + _lz4_length_size(length - lz4_min_match) > size:
+            table[key] = match # Position not compressed in this frame.
+            break
+        payload += _lz4_sequence(data[literals:position], position - match, length)
+        misses    = 0
+        position += length
+        literals  = position
+    else:
+        position = len(data)
+
+    # Last literals (as much as the payload allows).
+    n = min(position - literals, size - len(payload) - 1)
+    while n > 0 and n + _lz4_length_size(n) > size - len(payload) - 1:
+        n -= 1
+    if n > 0:
+        payload += _lz4_sequence(data[literals:literals + n])
+        literals += n
+    return bytes(payload), literals
+
 # CRC16 --------------------------------------------------------------------------------------------
 
 crc16_table = [
@@ -285,8 +383,9 @@ def crc16(l):
 # LiteXTerm ----------------------------------------------------------------------------------------
 
 class LiteXTerm:
-    def __init__(self, serial_boot, kernel_image, kernel_address, json_images):
+    def __init__(self, serial_boot, kernel_image, kernel_address, json_images, compress=False):
         self.serial_boot = serial_boot
+        self.compress    = compress
         assert not (kernel_image is not None and json_images is not None)
         self.mem_regions = {}
         if kernel_image is not None:
@@ -359,75 +458,142 @@ class LiteXTerm:
                 return 0
         return 1
 
-    def receive_upload_response(self):
-        reply = self.port.read()
-        if reply == sfl_ack_success:
-            return True
-        elif reply == sfl_ack_crcerror:
-            print("[LXTERM] Upload to device failed due to data corruption (CRC error)")
-        else:
-            print(f"[LXTERM] Got unexpected response from device '{reply}'")
-        sys.exit(1)
+    def negotiate(self):
+        # Request the compressed loads support (the BIOSes without it reply unknown command).
+        frame = SFLFrame()
+        frame.cmd = sfl_cmd_features
+        frame.payload = bytes([sfl_feature_lz4])
+        reply = sfl_ack_crcerror
+        while reply == sfl_ack_crcerror:
+            self.port.write(frame.encode())
+            reply = self.port.read()
+        if reply != sfl_ack_success:
+            print("[LXTERM] Compression not supported by the device, uploading uncompressed images.")
+            self.compress = False
+
+    def _drain(self, quiet=0.1):
+        # Discard the incoming data until the link is quiet (when the port supports timeouts).
+        if not hasattr(self.port, "timeout"):
+            return
+        timeout = self.port.timeout
+        self.port.timeout = quiet
+        while len(self.port.read(1024)):
+            pass
+        self.port.timeout = timeout
+
+    def _read_replies(self):
+        # Blocking read of the available replies (at least one byte, unless the port timeouts).
+        in_waiting = getattr(self.port, "in_waiting", 0)
+        return self.port.read(in_waiting if isinstance(in_waiting, int) and in_waiting > 1 else 1)
 
     def upload(self, filename, address):
         f = open(filename, "rb")
-        f.seek(0, 2)
-        length = f.tell()
-        f.seek(0, 0)
+        data = f.read()
+        f.close()
+        length = len(data)
 
         print(f"[LXTERM] Uploading {filename} to 0x{address:08x} ({length} bytes)...")
 
-        # Prepare parameters
-        current_address = address
-        position        = 0
-        start           = time.time()
-        remaining       = length
-        outstanding     = 0
-        while remaining:
-            # Show progress
-            sys.stdout.write("|{}>{}| {}%\r".format(
-                "=" * (20*position//length),
-                " " * (20-20*position//length),
-                100*position//length))
-            sys.stdout.flush()
-
-            # Send frame if max outstanding not reached.
-            if outstanding <= sfl_outstanding:
-                # Prepare frame.
-                frame      = SFLFrame()
-                frame.cmd  = sfl_cmd_load
-                frame_data = f.read(min(remaining, self.payload_length-4))
-                frame.payload = current_address.to_bytes(4, "big")
-                frame.payload += frame_data
-
-                # Encode frame and send it.
-                self.port.write(frame.encode())
-
-                # Update parameters
-                current_address += len(frame_data)
-                position        += len(frame_data)
-                remaining       -= len(frame_data)
-                outstanding     += 1
-
-                # Inter-frame delay.
-                time.sleep(self.delay)
-
-            # Read response if available.
-            while self.port.in_waiting:
-                ack = self.receive_upload_response()
-                if ack:
-                    outstanding -= 1
+        # Frames (encoded when sent).
+        chunk  = self.payload_length - 4
+        sent   = 0
+        def frames():
+            nonlocal sent
+            for size, frame in sfl_load_frames(data, address, chunk, self.compress):
+                sent += len(frame.payload) - 4
+                yield (size, frame.encode())
+        frames = frames()
+
+        # Link parameters.
+        baudrate   = getattr(self.port, "baudrate", None)
+        frame_time = (chunk + 8)*10/baudrate if baudrate else 0 # Time to transmit a full frame.
+        timeout    = getattr(self.port, "timeout", None)
+        if timeout is None and hasattr(self.port, "timeout"):
+            self.port.timeout = 1.0 # Detect lost frames.
+
+        # Window: frames in flight, sized from the minimum ACK latency (twice the frames needed to keep
+        # the link busy while waiting for the ACKs, absorbing host scheduling jitter), halved on errors.
+        # The inter-frame delay is only used after errors, until the link keeps up again.
+        pending    = collections.deque() # Frames sent and not acknowledged yet: (size, frame, time).
+        resend     = collections.deque() # Frames to send again: (size, frame).
+        window     = 1
+        window_max = sfl_outstanding
+        latency    = None
+        paced      = False
+        clean      = 0
+        errors     = 0
+        position   = 0
+        start      = time.time()
+        progress   = 0
+        while True:
+            # Send frames while the window allows it.
+            while len(pending) < window:
+                frame = resend.popleft() if resend else next(frames, None)
+                if frame is None:
+                    break
+                self.port.write(frame[1])
+                pending.append(frame + (time.time(),))
+                if paced:
+                    time.sleep(self.delay)
+            if not pending:
+                break
+
+            # Handle replies.
+            replies = self._read_replies()
+            if not len(replies):
+                replies = sfl_ack_crcerror # Timeout, frames lost: handled as a CRC error.
+            for reply in [replies[i:i+1] for i in range(len(replies))]:
+                if reply == sfl_ack_success:
+                    size, frame, t = pending.popleft()
+                    position += size
+                    latency   = min(latency or 1e9, time.time() - t)
+                    window    = min(window_max, int(2*latency/frame_time) + 2 if frame_time else window_max)
+                    clean    += 1
+                    if clean % 64 == 0:
+                        paced      = False
+                        window_max = min(2*window_max, sfl_outstanding)
+                elif reply == sfl_ack_crcerror:
+                    # The device flushes its RX buffer on errors: frames in flight are lost, send them
+                    # again once the link is quiet.
+                    errors += 1
+                    self._drain()
+                    resend.extendleft(reversed([frame[:2] for frame in pending]))
+                    pending.clear()
+                    window_max = max(1, window_max//2)
+                    window     = min(window, window_max)
+                    paced      = True
+                    clean      = 0
                     break
+                else:
+                    print(f"[LXTERM] Got unexpected response from device '{reply}'")
+                    sys.exit(1)
+
+            # Show progress (throttled).
+            if time.time() - progress > 0.1:
+                progress = time.time()
+                sys.stdout.write("|{}>{}| {}%\r".format(
+                    "=" * (20*position//length),
+                    " " * (20-20*position//length),
+                    100*position//length))
+                sys.stdout.flush()
 
-        # Get remaining responses.
-        for _ in range(outstanding):
-            self.receive_upload_response()
+        if hasattr(self.port, "timeout"):
+            self.port.timeout = timeout
 
         # Compute speed.
         end     = time.time()
         elapsed = end - start
-        print("[LXTERM] Upload complete ({0:.1f}KB/s).".format(length/(elapsed*1024)))
-        f.close()
+        speed   = "{0:.1f}KB/s".format(length/(elapsed*1024))
+        if baudrate:
+            # Theoretical: line rate (10 bits per byte) minus the SFL overhead of each frame.
+            line = (baudrate/10)*chunk/(chunk + 8)
+            speed += ", {:.0f}% of the {:.1f}KB/s theoretical at {} bauds".format(
+                100*length/(elapsed*line), line/1024, baudrate)
+        if self.compress:
+            speed += ", compression ratio {:.2f}".format(length/max(sent, 1))
+        if errors:
+            speed += ", {} retransmission(s)".format(errors)
+        print("[LXTERM] Upload complete ({}).".format(speed))
         return length
 
     def boot(self):
@@ -459,6 +625,8 @@ class LiteXTerm:
         print("[LXTERM] Received firmware download request from the device.")
         if(len(self.mem_regions)):
             self.port.write(sfl_magic_ack)
+        if self.compress:
+            self.negotiate()
         for filename, base in self.mem_regions.items():
             self.upload(filename, int(base, 16))
         self.boot()
@@ -543,6 +711,7 @@ def _get_args():
     parser.add_argument("--kernel",       default=None,                       help="Kernel image")
     parser.add_argument("--kernel-adr",   default="0x40000000",               help="Kernel address")
     parser.add_argument("--images",       default=None,                       help="JSON description of the images to load to memory")
+    parser.add_argument("--compress",     default=False, action='store_true', help="Compress the images during upload (when supported by the BIOS)")
 
     parser.add_argument("--csr-csv",      default=None,                       help="SoC CSV file")
     parser.add_argument("--base-address", default=None,                       help="CSR base address")
@@ -555,7 +724,7 @@ def _get_args():
 
 def main():
     args = _get_args()
-    term = LiteXTerm(args.serial_boot, args.kernel, args.kernel_adr, args.images)
+    term = LiteXTerm(args.serial_boot, args.kernel, args.kernel_adr, args.images, args.compress)
 
     if sys.platform == "win32":
         if args.port in ["bridge", "jtag"]:
@@ -0,0 +1,84 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import struct
+
+# CommBulk -----------------------------------------------------------------------------------------
+
+class CommBulk:
+    """Bulk memory accesses for the Comm classes.
+
+    read_bytes/write_bytes transfer memory regions as bytes, split in accesses of max_burst
+    (reads) / max_write_burst (writes) 32-bit words, the maximums of each transport. Words are
+    (un)packed chunk by chunk with a single struct call, and regions can be streamed to/from files
+    without holding them in memory. Transports able to keep several accesses in flight override
+    _read_chunks.
+    """
+    max_burst       = 1    # In 32-bit words.
+    max_write_burst = None # In 32-bit words, max_burst when None.
+
+    def _read_chunks(self, addr, length):
+        # Yield the datas of the length words at addr, in order.
+        for offset in range(0, length, self.max_burst):
+            yield self.read(addr + 4*offset, min(self.max_burst, length - offset))
+
+    def _write_chunk(self, addr, datas):
+        max_write_burst = self.max_write_burst or self.max_burst
+        for offset in range(0, len(datas), max_write_burst):
+            self.write(addr + 4*offset, list(datas[offset:offset + max_write_burst]))
+
+    @staticmethod
+    def _format(endianness):
+        return {"little": "<", "big": ">"}[endianness]
+
+    def read_bytes(self, addr, length, file=None, endianness="little"):
+        """Read length bytes at addr.
+
+        Return them as bytes or, when file (a filename or file object) is specified, write them to
+        it as they are received and return the number of bytes.
+        """
+        if addr % 4:
+            raise ValueError("Address 0x{:08x} is not 32-bit aligned.".format(addr))
+        fmt = self._format(endianness)
+        f   = open(file, "wb") if isinstance(file, str) else file
+        r   = bytearray()
+        remaining = length
+        try:
+            for datas in self._read_chunks(addr, (length + 3)//4):
+                chunk = struct.pack(fmt + "{}I".format(len(datas)), *datas)[:remaining]
+                remaining -= len(chunk)
+                if f is None:
+                    r += chunk
+                else:
+                    f.write(chunk)
+        finally:
+            if isinstance(file, str):
+                f.close()
+        return bytes(r) if f is None else length
+
+    def write_bytes(self, addr, data, endianness="little", chunk_size=1 << 20):
+        """Write data (bytes-like, filename or file object) at addr, return the number of bytes.
+
+        The length must be a multiple of 4 bytes.
+        """
+        if addr % 4:
+            raise ValueError("Address 0x{:08x} is not 32-bit aligned.".format(addr))
+        fmt = self._format(endianness)
+        if isinstance(data, str):
+            with open(data, "rb") as f:
+                return self.write_bytes(addr, f, endianness, chunk_size)
+        if hasattr(data, "read"):
+            chunks = iter(lambda: data.read(chunk_size), b"")
+        else:
+            data   = memoryview(data).cast("B")
+            chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+        length = 0
+        for chunk in chunks:
+            if len(chunk) % 4:
+                raise ValueError("Length is not a multiple of 4 bytes.")
+            datas = struct.unpack(fmt + "{}I".format(len(chunk)//4), chunk)
+            self._write_chunk(addr + length, datas)
+            length += len(chunk)
+        return length
@@ -7,12 +7,16 @@
 import os
 import ctypes
 import mmap
+import array
 
 from litex.tools.remote.csr_builder import CSRBuilder
+from litex.tools.remote.comm_bulk import CommBulk
 
 # CommPCIe -----------------------------------------------------------------------------------------
 
-class CommPCIe(CSRBuilder):
+class CommPCIe(CSRBuilder, CommBulk):
+    max_burst = 4096
+
     def __init__(self, bar, csr_csv=None, debug=False):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
         if "/sys/bus/pci/devices" not in bar:
@@ -63,3 +67,15 @@ class CommPCIe(CSRBuilder):
             ctypes.c_uint32.from_buffer(self.mmap, addr + 4*i).value = value
             if self.debug:
                 print("write 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
+
+    def _read_chunks(self, addr, length):
+        # Bulk reads: 32-bit copies from the BAR mapping.
+        for offset in range(0, length, self.max_burst):
+            n = min(self.max_burst, length - offset)
+            with memoryview(self.mmap)[addr + 4*offset:addr + 4*(offset + n)] as m:
+                datas = m.cast("I").tolist()
+            yield datas
+
+    def _write_chunk(self, addr, datas):
+        with memoryview(self.mmap)[addr:addr + 4*len(datas)] as m:
+            m.cast("I")[:] = array.array("I", datas)
@@ -4,10 +4,13 @@
 # Copyright (c) 2015-2020 Florent Kermarrec <florent@enjoy-digital.fr>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import time
 import serial
 import struct
+import collections
 
 from litex.tools.remote.csr_builder import CSRBuilder
+from litex.tools.remote.comm_bulk import CommBulk
 
 # Constants ----------------------------------------------------------------------------------------
 
@@ -18,12 +21,18 @@ CMD_READ_BURST_FIXED  = 0x04
 
 # CommUART -----------------------------------------------------------------------------------------
 
-class CommUART(CSRBuilder):
-    def __init__(self, port, baudrate=115200, csr_csv=None, debug=False):
+class CommUART(CSRBuilder, CommBulk):
+    max_burst = 255 # Length field of the UART bridge commands.
+
+    def __init__(self, port, baudrate=115200, csr_csv=None, debug=False, window=1):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
         self.port     = serial.serial_for_url(port, baudrate)
         self.baudrate = str(baudrate)
         self.debug    = debug
+        # Number of read commands in flight: > 1 requires an UARTBone with an RX FIFO able to store
+        # the queued commands (rx_fifo_depth >= 6*(window - 1)).
+        self.window   = window
+        self.reset_stats()
 
     def open(self):
         if hasattr(self, "port"):
@@ -36,59 +45,96 @@ class CommUART(CSRBuilder):
         self.port.close()
         del self.port
 
+    def reset_stats(self):
+        self.tx_bytes    = 0
+        self.rx_bytes    = 0
+        self.stats_start = time.time()
+
+    def get_stats(self):
+        """Return the achieved throughput since reset_stats: bytes/s in each direction and line
+        utilization (of the fastest direction, 10 bits per byte)."""
+        elapsed   = max(time.time() - self.stats_start, 1e-9)
+        line_rate = int(float(self.baudrate))/10
+        tx_rate   = self.tx_bytes/elapsed
+        rx_rate   = self.rx_bytes/elapsed
+        return {"tx": tx_rate, "rx": rx_rate, "utilization": max(tx_rate, rx_rate)/line_rate}
+
     def _read(self, length):
-        r = bytes()
+        r = bytearray()
         while len(r) < length:
             r += self.port.read(length - len(r))
+        self.rx_bytes += length
         return r
 
     def _write(self, data):
+        data      = memoryview(bytes(data))
         remaining = len(data)
         pos = 0
         while remaining:
             written = self.port.write(data[pos:])
             remaining -= written
             pos += written
+        self.tx_bytes += len(data)
 
     def _flush(self):
         if self.port.inWaiting() > 0:
             self.port.read(self.port.inWaiting())
 
-    def read(self, addr, length=None, burst="incr"):
-        self._flush()
-        data       = []
-        length_int = 1 if length is None else length
-        cmd        = {
+    @staticmethod
+    def _command(cmd, length, addr):
+        return struct.pack(">BBI", cmd, length, addr//4)
+
+    def _read_bursts(self, addr, length, burst="incr"):
+        # Yield the datas of the length words at addr, by bursts of max_burst words with up to window
+        # read commands in flight.
+        cmd = {
             "incr" : CMD_READ_BURST_INCR,
             "fixed": CMD_READ_BURST_FIXED,
         }[burst]
-        self._write([cmd, length_int])
-        self._write(list((addr//4).to_bytes(4, byteorder="big")))
-        for i in range(length_int):
-            value = int.from_bytes(self._read(4), "big")
-            if self.debug:
-                print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
-            if length is None:
-                return value
-            data.append(value)
-        return data
+        self._flush()
+        pending = collections.deque()
+        offset  = 0
+        while offset < length or pending:
+            commands = bytearray()
+            while offset < length and len(pending) < self.window:
+                size = min(self.max_burst, length - offset)
+                commands += self._command(cmd, size, addr + (4*offset if burst == "incr" else 0))
+                pending.append(size)
+                offset += size
+            if commands:
+                self._write(commands)
+            size = pending.popleft()
+            yield struct.unpack(">{}I".format(size), self._read(4*size))
+
+    def _read_chunks(self, addr, length):
+        return self._read_bursts(addr, length)
+
+    def read(self, addr, length=None, burst="incr"):
+        data       = []
+        length_int = 1 if length is None else length
+        for datas in self._read_bursts(addr, length_int, burst):
+            data += datas
+        if self.debug:
+            for i, value in enumerate(data):
+                print("read 0x{:08x} @ 0x{:08x}".format(value, addr + (4*i if burst == "incr" else 0)))
+        return data[0] if length is None else data
 
     def write(self, addr, data, burst="incr"):
-        self._flush()
-        data   = data if isinstance(data, list) else [data]
+        data   = data if isinstance(data, (list, tuple)) else [data]
         length = len(data)
         offset = 0
+        cmd    = {
+            "incr" : CMD_WRITE_BURST_INCR,
+            "fixed": CMD_WRITE_BURST_FIXED,
+        }[burst]
+        # Commands are written back-to-back (no response), each with a single port write.
         while length:
-            size = min(length, 8)
-            cmd = {
-                "incr" : CMD_WRITE_BURST_INCR,
-                "fixed": CMD_WRITE_BURST_FIXED,
-            }[burst]
-            self._write([cmd, size])
-            self._write(list(((addr//4 + offset).to_bytes(4, byteorder="big"))))
-            for i, value in enumerate(data[offset:offset+size]):
-                self._write(list(value.to_bytes(4, byteorder="big")))
-                if self.debug:
-                    print("write 0x{:08x} @ 0x{:08x}".format(value, addr + offset, 4*i))
+            size = min(length, self.max_burst)
+            base = addr + (4*offset if burst == "incr" else 0)
+            self._write(self._command(cmd, size, base) +
+                struct.pack(">{}I".format(size), *data[offset:offset+size]))
+            if self.debug:
+                for i, value in enumerate(data[offset:offset+size]):
+                    print("write 0x{:08x} @ 0x{:08x}".format(value, base + (4*i if burst == "incr" else 0)))
             offset += size
             length -= size
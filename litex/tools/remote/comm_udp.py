@@ -6,20 +6,26 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import socket
+import collections
 
 from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
 from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
 
 from litex.tools.remote.csr_builder import CSRBuilder
+from litex.tools.remote.comm_bulk import CommBulk
 
 # CommUDP ------------------------------------------------------------------------------------------
 
-class CommUDP(CSRBuilder):
-    def __init__(self, server="192.168.100.50", port=1234, csr_csv=None, debug=False):
+class CommUDP(CSRBuilder, CommBulk):
+    max_write_burst = 255 # Writes per record (8-bit wcount).
+
+    def __init__(self, server="192.168.100.50", port=1234, csr_csv=None, debug=False, max_burst=1, window=16):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
-        self.server = server
-        self.port   = port
-        self.debug  = debug
+        self.server    = server
+        self.port      = port
+        self.debug     = debug
+        self.max_burst = max_burst # Maximum reads per record supported by the Etherbone core.
+        self.window    = window    # Maximum number of bulk read packets awaiting a reply.
 
     def open(self, probe=True):
         if hasattr(self, "socket"):
@@ -88,6 +94,46 @@ class CommUDP(CSRBuilder):
                 print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
         return datas[0] if length is None else datas
 
+    def _read_chunks(self, addr, length):
+        # Bulk reads: keep up to window packets in flight. Replies are matched to their request with
+        # the base return address (set to the address of the chunk), or taken in order otherwise.
+        chunks  = [(addr + 4*offset, min(self.max_burst, length - offset))
+            for offset in range(0, length, self.max_burst)]
+        pending = collections.OrderedDict()
+        replies = dict()
+        for chunk_addr, chunk_length in chunks:
+            while len(pending) >= self.window:
+                yield from self._receive_chunks(pending, replies)
+            record = EtherboneRecord()
+            record.reads  = EtherboneReads(base_ret_addr=chunk_addr,
+                addrs=[chunk_addr + 4*j for j in range(chunk_length)])
+            record.rcount = len(record.reads)
+            packet = EtherbonePacket()
+            packet.records = [record]
+            packet.encode()
+            self.socket.sendto(packet.bytes, (self.server, self.port))
+            pending[chunk_addr] = False
+        while pending:
+            yield from self._receive_chunks(pending, replies)
+
+    def _receive_chunks(self, pending, replies):
+        datas, dummy = self.socket.recvfrom(8192)
+        packet = EtherbonePacket(datas)
+        packet.decode()
+        writes = packet.records.pop().writes
+        base   = writes.base_addr
+        if base not in pending or pending[base]:
+            base = next(a for a, received in pending.items() if not received)
+        pending[base] = True
+        replies[base] = writes.get_datas()
+        # Yield the chunks received in order.
+        while pending:
+            base, received = next(iter(pending.items()))
+            if not received:
+                break
+            del pending[base]
+            yield replies.pop(base)
+
     def write(self, addr, datas):
         datas = datas if isinstance(datas, list) else [datas]
         length = len(datas)
@@ -8,6 +8,7 @@ import usb.core
 import time
 
 from litex.tools.remote.csr_builder import CSRBuilder
+from litex.tools.remote.comm_bulk import CommBulk
 
 # Wishbone USB Protocol Bridge
 # ============================
@@ -61,7 +62,9 @@ from litex.tools.remote.csr_builder import CSRBuilder
 
 # CommUSB ------------------------------------------------------------------------------------------
 
-class CommUSB(CSRBuilder):
+class CommUSB(CSRBuilder, CommBulk):
+    max_write_burst = 255 # Words per write call (written one at a time by write).
+
     def __init__(self, vid=None, pid=None, max_retries=10, csr_csv=None, debug=False):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
         self.vid         = vid
@@ -6,6 +6,7 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import csv
+import json
 
 # CSR Elements -------------------------------------------------------------------------------------
 
@@ -25,7 +26,7 @@ class CSRElements:
         raise AttributeError("No such element " + attr)
 
 class CSRRegister:
-    def __init__(self, readfn, writefn, name, addr, length, data_width, mode):
+    def __init__(self, readfn, writefn, name, addr, length, data_width, mode, fields=None):
         self.readfn     = readfn
         self.writefn    = writefn
         self.name       = name
@@ -33,6 +34,12 @@ class CSRRegister:
         self.length     = length
         self.data_width = data_width
         self.mode       = mode
+        self.fields     = fields # List of (name, offset, size), from csr.json.
+
+    def decode(self, value):
+        if not self.fields:
+            return value
+        return {name: (value >> offset) & (2**size - 1) for name, offset, size in self.fields}
 
     def read(self):
         if self.mode not in ["rw", "ro"]:
@@ -55,6 +62,80 @@ class CSRRegister:
             datas.append((value >> ((self.length-1-i)*self.data_width)) & (2**self.data_width-1))
         self.writefn(self.addr, datas)
 
+class CSRRegisters(CSRElements):
+    """CSR registers with bulk read accesses.
+
+    Reads of several registers are planned as a minimal set of burst reads over the CSR address
+    map (registers at consecutive addresses are read in a single burst) and issued through the
+    Comm's batch() when it provides one (pipelined) or sequentially otherwise.
+    """
+    __slots__ = ("_readfn", "_batchfn") # Keep them out of __dict__ (the registers).
+
+    def __init__(self, d, readfn, batchfn=None):
+        CSRElements.__init__(self, d)
+        self._readfn  = readfn
+        self._batchfn = batchfn
+
+    def _get(self, register):
+        register = self.__dict__[register] if isinstance(register, str) else register
+        if register.mode not in ["rw", "ro"]:
+            raise KeyError(register.name + "register not readable")
+        return register
+
+    @staticmethod
+    def plan(registers, max_burst=255):
+        """Return the (addr, length) burst reads covering registers."""
+        addrs = sorted({r.addr + 4*i for r in registers for i in range(r.length)})
+        bursts = []
+        for addr in addrs:
+            if bursts and addr == bursts[-1][0] + 4*bursts[-1][1] and bursts[-1][1] < max_burst:
+                bursts[-1][1] += 1
+            else:
+                bursts.append([addr, 1])
+        return [tuple(burst) for burst in bursts]
+
+    def read_many(self, registers, decode=False, numpy=False, max_burst=255):
+        """Read registers (names or CSRRegister), return a {name: value} dict.
+
+        With decode, registers with fields return a {field: value} dict. With numpy, return a
+        NumPy structured array record instead (decode is then ignored).
+        """
+        registers = [self._get(r) for r in registers]
+        bursts    = self.plan(registers, max_burst)
+        if self._batchfn is not None:
+            with self._batchfn() as batch:
+                futures = [batch.read(addr, length) for addr, length in bursts]
+            results = [future.result() for future in futures]
+        else:
+            results = [self._readfn(addr, length=length) for addr, length in bursts]
+        words = {}
+        for (addr, length), datas in zip(bursts, results):
+            for i, data in enumerate(datas):
+                words[addr + 4*i] = data
+
+        values = {}
+        for register in registers:
+            value = 0
+            for i in range(register.length):
+                value = value << register.data_width
+                value |= words[register.addr + 4*i]
+            values[register.name] = value
+
+        if numpy:
+            import numpy as np
+            dtype = [(r.name, "<u8" if r.length*r.data_width <= 64 else object) for r in registers]
+            return np.array([tuple(values[r.name] for r in registers)], dtype=dtype)[0]
+        if decode:
+            return {r.name: r.decode(values[r.name]) for r in registers}
+        return values
+
+    def snapshot(self, bank=None, **kwargs):
+        """Read all readable registers (of a CSR bank when specified), see read_many."""
+        registers = [r for r in self.__dict__.values() if r.mode in ["rw", "ro"]]
+        if bank is not None:
+            registers = [r for r in registers if r.name.startswith(bank + "_")]
+        return self.read_many(registers, **kwargs)
+
 class CSRMemoryRegion:
     def __init__(self, base, size, type):
         self.base = base
@@ -64,9 +145,10 @@ class CSRMemoryRegion:
 # CSR Builder --------------------------------------------------------------------------------------
 
 class CSRBuilder:
-    def __init__(self, comm, csr_csv, csr_data_width=None):
+    def __init__(self, comm, csr_csv, csr_data_width=None, csr_json=None):
         if csr_csv is not None:
             self.items     = self.get_csr_items(csr_csv)
+            self.fields    = self.get_csr_fields(csr_json)
             self.constants = self.build_constants()
 
             # Load csr_data_width from the constants, otherwise it must be provided
@@ -81,13 +163,22 @@ class CSRBuilder:
 
             self.csr_data_width = csr_data_width
             self.bases = self.build_bases()
-            self.regs  = self.build_registers(comm.read, comm.write)
+            self.regs  = self.build_registers(comm.read, comm.write, getattr(comm, "batch", None))
             self.mems  = self.build_memories()
 
     @staticmethod
     def get_csr_items(csr_csv):
         return list(csv.reader(filter(lambda row: row[0] != "#", open(csr_csv))))
 
+    @staticmethod
+    def get_csr_fields(csr_json):
+        if csr_json is None:
+            return {}
+        with open(csr_json) as f:
+            registers = json.load(f)["csr_registers"]
+        return {name: [(f["name"], f["offset"], f["size"]) for f in register["fields"]]
+            for name, register in registers.items() if register.get("fields")}
+
     def build_bases(self):
         d = {}
         for item in self.items:
@@ -96,15 +187,16 @@ class CSRBuilder:
                 d[name] = int(addr.replace("0x", ""), 16)
         return CSRElements(d)
 
-    def build_registers(self, readfn, writefn):
+    def build_registers(self, readfn, writefn, batchfn=None):
         d = {}
         for item in self.items:
             group, name, addr, length, mode = item
             if group == "csr_register":
                 addr = int(addr.replace("0x", ""), 16)
                 length = int(length)
-                d[name] = CSRRegister(readfn, writefn, name, addr, length, self.csr_data_width, mode)
-        return CSRElements(d)
+                d[name] = CSRRegister(readfn, writefn, name, addr, length, self.csr_data_width, mode,
+                    fields=self.fields.get(name, None))
+        return CSRRegisters(d, readfn, batchfn)
 
     def build_constants(self):
         d = {}
@@ -5,8 +5,10 @@
 # Copyright (c) 2017 Tim Ansell <mithro@mithis.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import sys
 import math
 import struct
+from array import array
 
 from litex.soc.interconnect.packet import HeaderField, Header
 
@@ -57,8 +59,26 @@ def get_field_data(field, datas):
     v = int.from_bytes(datas[field.byte:field.byte+math.ceil(field.width/8)], "big")
     return (v >> field.offset) & (2**field.width-1)
 
-pack_to_uint32 = struct.Struct('>I').pack
-unpack_uint32_from = struct.Struct('>I').unpack
+# Words (datas/addresses) are kept in array("I") buffers, converted from/to the big-endian wire
+# format with a single copy/byteswap: no Python object is created per word when encoding/decoding.
+_packet_header = struct.Struct(">HBBxxxx")
+_record_header = struct.Struct(">BBBB")
+_uint32        = struct.Struct(">I")
+_swap_words    = (sys.byteorder == "little")
+assert array("I").itemsize == 4
+
+def _words_to_bytes(words):
+    if _swap_words:
+        words = array("I", words)
+        words.byteswap()
+    return words
+
+def _words_from_bytes(data):
+    words = array("I")
+    words.frombytes(data)
+    if _swap_words:
+        words.byteswap()
+    return words
 
 # Packet -------------------------------------------------------------------------------------------
 
@@ -93,43 +113,40 @@ class EtherboneWrites(Packet):
             raise ValueError(f"Burst size of {len(datas)} exceeds maximum of 255 allowed by Etherbone.")
         Packet.__init__(self, init)
         self.base_addr = base_addr
-        self.writes    = []
+        self.datas     = array("I", datas)
         self.encoded   = init != []
-        for data in datas:
-            self.add(EtherboneWrite(data))
+
+    def __len__(self):
+        return len(self.datas)
+
+    # EtherboneWrite views, for compatibility (read-only: use add() or the writes setter).
+    @property
+    def writes(self):
+        return tuple(EtherboneWrite(data) for data in self.datas)
+
+    @writes.setter
+    def writes(self, writes):
+        self.datas = array("I", [write.data for write in writes])
 
     def add(self, write):
-        self.writes.append(write)
+        self.datas.append(write.data)
 
     def get_datas(self):
-        datas = []
-        for write in self.writes:
-            datas.append(write.data)
-        return datas
+        return self.datas.tolist()
 
     def encode(self):
         if self.encoded:
             raise ValueError
-        ba = bytearray()
-        ba += pack_to_uint32(self.base_addr)
-        for write in self.writes:
-            ba += pack_to_uint32(write.data)
-        self.bytes   = ba
+        self.bytes   = bytearray(_uint32.pack(self.base_addr)) + _words_to_bytes(self.datas)
         self.encoded = True
 
     def decode(self):
         if not self.encoded:
             raise ValueError
-        ba = self.bytes
-        self.base_addr = unpack_uint32_from(ba[:4])[0]
-        writes = []
-        offset = 4
-        length = len(ba)
-        while length > offset:
-            writes.append(EtherboneWrite(unpack_uint32_from(ba[offset:offset+4])[0]))
-            offset += 4
-        self.writes  = writes
-        self.encoded = False
+        ba = memoryview(self.bytes)
+        self.base_addr = _uint32.unpack_from(ba)[0]
+        self.datas     = _words_from_bytes(ba[4:len(ba) & ~0x3])
+        self.encoded   = False
 
     def __repr__(self):
         r = "Writes\n"
@@ -147,43 +164,40 @@ class EtherboneReads(Packet):
             raise ValueError(f"Burst size of {len(addrs)} exceeds maximum of 255 allowed by Etherbone.")
         Packet.__init__(self, init)
         self.base_ret_addr = base_ret_addr
-        self.reads   = []
-        self.encoded = init != []
-        for addr in addrs:
-            self.add(EtherboneRead(addr))
+        self.addrs         = array("I", addrs)
+        self.encoded       = init != []
+
+    def __len__(self):
+        return len(self.addrs)
+
+    # EtherboneRead views, for compatibility (read-only: use add() or the reads setter).
+    @property
+    def reads(self):
+        return tuple(EtherboneRead(addr) for addr in self.addrs)
+
+    @reads.setter
+    def reads(self, reads):
+        self.addrs = array("I", [read.addr for read in reads])
 
     def add(self, read):
-        self.reads.append(read)
+        self.addrs.append(read.addr)
 
     def get_addrs(self):
-        addrs = []
-        for read in self.reads:
-            addrs.append(read.addr)
-        return addrs
+        return self.addrs.tolist()
 
     def encode(self):
         if self.encoded:
             raise ValueError
-        ba = bytearray()
-        ba += pack_to_uint32(self.base_ret_addr)
-        for read in self.reads:
-            ba += pack_to_uint32(read.addr)
-        self.bytes   = ba
+        self.bytes   = bytearray(_uint32.pack(self.base_ret_addr)) + _words_to_bytes(self.addrs)
         self.encoded = True
 
     def decode(self):
         if not self.encoded:
             raise ValueError
-        ba = self.bytes
-        base_ret_addr = unpack_uint32_from(ba[:4])[0]
-        reads  = []
-        offset = 4
-        length = len(ba)
-        while length > offset:
-            reads.append(EtherboneRead(unpack_uint32_from(ba[offset:offset+4])[0]))
-            offset += 4
-        self.reads   = reads
-        self.encoded = False
+        ba = memoryview(self.bytes)
+        self.base_ret_addr = _uint32.unpack_from(ba)[0]
+        self.addrs         = _words_from_bytes(ba[4:len(ba) & ~0x3])
+        self.encoded       = False
 
     def __repr__(self):
         r = "Reads\n"
@@ -214,56 +228,62 @@ class EtherboneRecord(Packet):
     def decode(self):
         if not self.encoded:
             raise ValueError
+        self.decode_from(memoryview(self.bytes))
 
+    def decode_from(self, ba, offset=0):
         # Decode header
-        header = list(self.bytes[:etherbone_record_header.length])
-        for k, v in sorted(etherbone_record_header.fields.items()):
-            setattr(self, k, get_field_data(v, header))
-        offset = etherbone_record_header.length
+        flags, self.byte_enable, self.wcount, self.rcount = _record_header.unpack_from(ba, offset)
+        self.bca = (flags >> 0) & 0b1
+        self.rca = (flags >> 1) & 0b1
+        self.rff = (flags >> 2) & 0b1
+        self.cyc = (flags >> 4) & 0b1
+        self.wca = (flags >> 5) & 0b1
+        self.wff = (flags >> 6) & 0b1
+        offset += etherbone_record_header_length
 
         # Decode writes
         if self.wcount:
-            self.writes = EtherboneWrites(self.bytes[offset:offset + 4*(self.wcount+1)])
-            offset += 4*(self.wcount+1)
-            self.writes.decode()
+            self.writes = EtherboneWrites()
+            self.writes.base_addr = _uint32.unpack_from(ba, offset)[0]
+            self.writes.datas     = _words_from_bytes(ba[offset + 4:offset + 4*(self.wcount + 1)])
+            offset += 4*(self.wcount + 1)
 
         # Decode reads
         if self.rcount:
-            self.reads = EtherboneReads(self.bytes[offset:offset + 4*(self.rcount+1)])
-            offset += 4*(self.rcount+1)
-            self.reads.decode()
+            self.reads = EtherboneReads()
+            self.reads.base_ret_addr = _uint32.unpack_from(ba, offset)[0]
+            self.reads.addrs         = _words_from_bytes(ba[offset + 4:offset + 4*(self.rcount + 1)])
+            offset += 4*(self.rcount + 1)
 
         self.encoded = False
+        return offset
 
     def encode(self):
         if self.encoded:
             raise ValueError
+        self.bytes = bytearray()
+        self.encode_into(self.bytes)
+        self.encoded = True
 
+    def encode_into(self, ba):
         # Set writes/reads count
-        self.wcount = 0 if self.writes is None else len(self.writes.writes)
-        self.rcount = 0 if self.reads  is None else len(self.reads.reads)
-
-        ba = bytearray()
+        self.wcount = 0 if self.writes is None else len(self.writes)
+        self.rcount = 0 if self.reads  is None else len(self.reads)
 
         # Encode header
-        header = 0
-        for k, v in sorted(etherbone_record_header.fields.items()):
-            value = int.from_bytes(getattr(self, k).to_bytes(math.ceil(v.width/8), "big"), "little")
-            header += (value << v.offset+(v.byte*8))
-        ba += header.to_bytes(etherbone_record_header.length, "little")
+        flags = ((self.bca << 0) | (self.rca << 1) | (self.rff << 2) |
+                 (self.cyc << 4) | (self.wca << 5) | (self.wff << 6))
+        ba += _record_header.pack(flags, self.byte_enable, self.wcount, self.rcount)
 
         # Encode writes
         if self.wcount:
-            self.writes.encode()
-            ba += self.writes.bytes
+            ba += _uint32.pack(self.writes.base_addr)
+            ba += _words_to_bytes(self.writes.datas)
 
         # Encode reads
         if self.rcount:
-            self.reads.encode()
-            ba += self.reads.bytes
-
-        self.bytes   = ba
-        self.encoded = True
+            ba += _uint32.pack(self.reads.base_ret_addr)
+            ba += _words_to_bytes(self.reads.addrs)
 
     def __repr__(self, n=0):
         r = "Record {}\n".format(n)
@@ -300,27 +320,24 @@ class EtherbonePacket(Packet):
         if not self.encoded:
             raise ValueError
 
-        ba = self.bytes
-        if isinstance(ba, int):
-            print(f'ba: 0x{ba:02x} {ba}')
+        ba = memoryview(self.bytes)
 
         # Decode header
-        header = list(ba[:etherbone_packet_header.length])
-        for k, v in sorted(etherbone_packet_header.fields.items()):
-            setattr(self, k, get_field_data(v, header))
+        self.magic, flags, sizes = _packet_header.unpack_from(ba)
+        self.version   = (flags >> 4) & 0xf
+        self.nr        = (flags >> 2) & 0b1
+        self.pr        = (flags >> 1) & 0b1
+        self.pf        = (flags >> 0) & 0b1
+        self.addr_size = (sizes >> 4) & 0xf
+        self.port_size = (sizes >> 0) & 0xf
         offset = etherbone_packet_header.length
 
         # Decode records
         length = len(ba)
         while length > offset:
-            record = EtherboneRecord(ba[offset:])
-            record.decode()
+            record = EtherboneRecord()
+            offset = record.decode_from(ba, offset)
             self.records.append(record)
-            offset += etherbone_record_header.length
-            if record.wcount:
-                offset += 4*(record.wcount + 1)
-            if record.rcount:
-                offset += 4*(record.rcount + 1)
 
         self.encoded = False
 
@@ -328,19 +345,14 @@ class EtherbonePacket(Packet):
         if self.encoded:
             raise ValueError
 
-        ba = bytearray()
-
         # Encode header
-        header = 0
-        for k, v in sorted(etherbone_packet_header.fields.items()):
-            value = int.from_bytes(getattr(self, k).to_bytes(math.ceil(v.width/8), "big"), "little")
-            header += (value << v.offset+(v.byte*8))
-        ba += header.to_bytes(etherbone_packet_header.length, "little")
+        flags = (self.version << 4) | (self.nr << 2) | (self.pr << 1) | (self.pf << 0)
+        sizes = (self.addr_size << 4) | (self.port_size << 0)
+        ba    = bytearray(_packet_header.pack(self.magic, flags, sizes))
 
         # Encode records
         for record in self.records:
-            record.encode()
-            ba += record.bytes
+            record.encode_into(ba)
 
         self.bytes   = ba
         self.encoded = True
@@ -364,22 +376,27 @@ class EtherboneIPC:
     def send_packet(self, socket, packet):
         socket.sendall(packet.bytes)
 
+    def _receive_into(self, socket, view):
+        while len(view):
+            n = socket.recv_into(view)
+            if n == 0:
+                return False
+            view = view[n:]
+        return True
+
     def receive_packet(self, socket):
         header_length = etherbone_packet_header_length + etherbone_record_header_length
-        packet        = bytes()
-        while len(packet) < header_length:
-            chunk = socket.recv(header_length - len(packet))
-            if len(chunk) == 0:
-                return 0
-            else:
-                packet += chunk
-        wcount, rcount = struct.unpack(">BB", packet[header_length-2:])
-        counts = wcount + rcount
-        packet_size = header_length + 4*(counts + 1)
-        while len(packet) < packet_size:
-            chunk = socket.recv(packet_size - len(packet))
-            if len(chunk) == 0:
-                return 0
-            else:
-                packet += chunk
+        header        = bytearray(header_length)
+        if not self._receive_into(socket, memoryview(header)):
+            return 0
+        wcount, rcount = header[header_length-2], header[header_length-1]
+        # Writes and reads each carry a base address before their datas/addresses.
+        packet_size = header_length
+        if wcount:
+            packet_size += 4*(wcount + 1)
+        if rcount:
+            packet_size += 4*(rcount + 1)
+        packet = header + bytes(packet_size - header_length)
+        if not self._receive_into(socket, memoryview(packet)[header_length:]):
+            return 0
         return packet
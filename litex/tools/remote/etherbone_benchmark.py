@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Etherbone codec micro-benchmark: packets/second for the encode/decode of the records exchanged
+# between litex_client and litex_server, and comparison of the writes/reads codec with the previous
+# one (one EtherboneWrite/EtherboneRead object and struct call per word, kept here as reference).
+
+import time
+import struct
+import argparse
+
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
+from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+from litex.tools.remote.etherbone import EtherboneRead, EtherboneWrite, Packet
+
+# Packets ------------------------------------------------------------------------------------------
+
+def read_request(length):
+    record = EtherboneRecord()
+    record.reads  = EtherboneReads(addrs=[0x1000 + 4*i for i in range(length)])
+    record.rcount = len(record.reads)
+    packet = EtherbonePacket()
+    packet.records = [record]
+    return packet
+
+def write_request(length):
+    record = EtherboneRecord()
+    record.writes = EtherboneWrites(base_addr=0x1000, datas=[i for i in range(length)])
+    record.wcount = len(record.writes)
+    packet = EtherbonePacket()
+    packet.records = [record]
+    return packet
+
+# Previous Codec -----------------------------------------------------------------------------------
+
+_pack_to_uint32     = struct.Struct(">I").pack
+_unpack_uint32_from = struct.Struct(">I").unpack
+
+class PreviousWrites(Packet):
+    # Writes codec before the array-based one: one EtherboneWrite object and struct call per word.
+    def __init__(self, init=[], base_addr=0, datas=[]):
+        Packet.__init__(self, init)
+        self.base_addr = base_addr
+        self.writes    = [EtherboneWrite(data) for data in datas]
+
+    def get_datas(self):
+        return [write.data for write in self.writes]
+
+    def encode(self):
+        ba  = bytearray()
+        ba += _pack_to_uint32(self.base_addr)
+        for write in self.writes:
+            ba += _pack_to_uint32(write.data)
+        self.bytes = ba
+
+    def decode(self):
+        ba = self.bytes
+        self.base_addr = _unpack_uint32_from(ba[:4])[0]
+        writes = []
+        offset = 4
+        while len(ba) > offset:
+            writes.append(EtherboneWrite(_unpack_uint32_from(ba[offset:offset+4])[0]))
+            offset += 4
+        self.writes = writes
+
+class PreviousReads(Packet):
+    # Reads codec before the array-based one: one EtherboneRead object and struct call per word.
+    def __init__(self, init=[], base_ret_addr=0, addrs=[]):
+        Packet.__init__(self, init)
+        self.base_ret_addr = base_ret_addr
+        self.reads         = [EtherboneRead(addr) for addr in addrs]
+
+    def get_addrs(self):
+        return [read.addr for read in self.reads]
+
+    def encode(self):
+        ba  = bytearray()
+        ba += _pack_to_uint32(self.base_ret_addr)
+        for read in self.reads:
+            ba += _pack_to_uint32(read.addr)
+        self.bytes = ba
+
+    def decode(self):
+        ba = self.bytes
+        self.base_ret_addr = _unpack_uint32_from(ba[:4])[0]
+        reads  = []
+        offset = 4
+        while len(ba) > offset:
+            reads.append(EtherboneRead(_unpack_uint32_from(ba[offset:offset+4])[0]))
+            offset += 4
+        self.reads = reads
+
+# Benchmarks ---------------------------------------------------------------------------------------
+
+def bench_encode(make_packet, length, duration):
+    n     = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for i in range(100):
+            make_packet(length).encode()
+        n += 100
+    return n/(time.perf_counter() - start)
+
+def bench_decode(make_packet, length, duration):
+    packet = make_packet(length)
+    packet.encode()
+    data  = bytes(packet.bytes)
+    n     = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for i in range(100):
+            packet = EtherbonePacket(data)
+            packet.decode()
+            record = packet.records[0]
+            if record.writes is not None:
+                record.writes.get_datas()
+            if record.reads is not None:
+                record.reads.get_addrs()
+        n += 100
+    return n/(time.perf_counter() - start)
+
+def bench_codec(writes_cls, reads_cls, name, length, duration):
+    words = [0x1000 + 4*i for i in range(length)]
+    if name == "writes":
+        encoder = lambda: writes_cls(base_addr=0x1000, datas=words)
+        decoder = lambda data: writes_cls(data)
+        words_of = lambda payload: payload.get_datas()
+    else:
+        encoder = lambda: reads_cls(base_ret_addr=0x1000, addrs=words)
+        decoder = lambda data: reads_cls(data)
+        words_of = lambda payload: payload.get_addrs()
+    payload = encoder()
+    payload.encode()
+    data    = bytes(payload.bytes)
+    n     = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for i in range(100):
+            encoder().encode()
+            payload = decoder(data)
+            payload.decode()
+            assert len(words_of(payload)) == length
+        n += 100
+    return n/(time.perf_counter() - start)
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Etherbone codec micro-benchmark.")
+    parser.add_argument("--duration", default=0.5, type=float, help="Duration of each benchmark (s).")
+    args = parser.parse_args()
+
+    print("{:<8} {:>6} {:>16} {:>16}".format("record", "words", "encode (pkt/s)", "decode (pkt/s)"))
+    for name, make_packet in [("reads", read_request), ("writes", write_request)]:
+        for length in [1, 16, 255]:
+            print("{:<8} {:>6} {:>16.0f} {:>16.0f}".format(name, length,
+                bench_encode(make_packet, length, args.duration),
+                bench_decode(make_packet, length, args.duration)))
+
+    print()
+    print("{:<8} {:>6} {:>16} {:>16} {:>8}".format("payload", "words", "previous (/s)", "current (/s)", "speedup"))
+    for name in ["reads", "writes"]:
+        for length in [1, 16, 255]:
+            previous = bench_codec(PreviousWrites, PreviousReads,  name, length, args.duration)
+            current  = bench_codec(EtherboneWrites, EtherboneReads, name, length, args.duration)
+            print("{:<8} {:>6} {:>16.0f} {:>16.0f} {:>7.1f}x".format(name, length,
+                previous, current, current/previous))
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,7 @@ setup(
             "litex_json2renode=litex.tools.litex_json2renode:main",
             "litex_bare_metal_demo=litex.soc.software.demo.demo:main",
             "litex_contributors=litex.tools.litex_contributors:main",
+            "litex_batch=litex.tools.litex_batch:main",
             # short names
             "lxterm=litex.tools.litex_term:main",
             "lxserver=litex.tools.litex_server:main",
@@ -0,0 +1,173 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import tempfile
+import time
+import os
+from unittest import mock
+
+from litex.soc.integration import export
+from litex.soc.integration.builder import Builder, BuildVariant, TargetBuildVariant, build_variants
+
+
+def make_builder(base_dir, cache_dir, csr="#define CSR_BASE 0x0\n"):
+    # Builder with its generated files, without SoC.
+    builder = Builder.__new__(Builder)
+    builder.include_dir        = os.path.join(base_dir, "software", "include")
+    builder.generated_dir      = os.path.join(builder.include_dir, "generated")
+    builder.software_dir       = os.path.join(base_dir, "software")
+    builder.software_packages  = [("bios", "/src/bios")]
+    builder.software_cache_dir = cache_dir
+    os.makedirs(builder.generated_dir)
+    os.makedirs(os.path.join(builder.software_dir, "bios"))
+    with open(os.path.join(builder.generated_dir, "variables.mak"), "w") as f:
+        f.write("BUILDINC_DIRECTORY={}\n".format(builder.include_dir))
+    with open(os.path.join(builder.generated_dir, "csr.h"), "w") as f:
+        f.write(csr)
+    return builder
+
+
+def write_headers(builder, t, constants={"CONFIG_CLOCK_FREQUENCY": 100000000}):
+    # Generated headers as written by Builder._generate_includes (with their banner) at time t.
+    with mock.patch("time.time", return_value=t):
+        headers = {
+            "csr.h" : export.get_csr_header({}, constants, csr_base=0x0),
+            "soc.h" : export.get_soc_header(constants),
+            "mem.h" : export.get_mem_header({}),
+            "git.h" : export.get_git_header(),
+        }
+    for name, contents in headers.items():
+        with open(os.path.join(builder.generated_dir, name), "w") as f:
+            f.write(contents)
+    return headers
+
+
+class SoftwareVariant(BuildVariant):
+    # Variant only building its software (through the software cache), the compilation writes the
+    # generated directory it was done for to bios.bin.
+    def __init__(self, name, csr="#define CSR_BASE 0x0\n", headers_time=None):
+        self.name         = name
+        self.csr          = csr
+        self.headers_time = headers_time
+
+    def build(self, build_dir, software_cache_dir, jobs):
+        builder = make_builder(build_dir, software_cache_dir, self.csr)
+        if self.headers_time is not None:
+            write_headers(builder, self.headers_time)
+        def compile():
+            with open(os.path.join(builder.software_dir, "bios", "bios.bin"), "w") as f:
+                f.write(builder.generated_dir)
+        builder._cached_rom_software(compile)
+        return {"software": 0.0}
+
+
+class TestBuilder(unittest.TestCase):
+    def test_software_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = os.path.join(tmp, "share")
+            builds    = []
+            def compile_software(builder):
+                def compile():
+                    builds.append(builder)
+                    with open(os.path.join(builder.software_dir, "bios", "bios.bin"), "w") as f:
+                        f.write(builder.generated_dir)
+                    with open(os.path.join(builder.software_dir, "bios", "main.d"), "w") as f:
+                        f.write("main.o: {}/csr.h ../libbase/libbase.a\n".format(builder.generated_dir))
+                return compile
+            def dependencies(builder):
+                with open(os.path.join(builder.software_dir, "bios", "main.d")) as f:
+                    return f.read()
+            def bios(builder):
+                with open(os.path.join(builder.software_dir, "bios", "bios.bin")) as f:
+                    return f.read()
+
+            # Same generated files (in other directories): built once, shared.
+            a = make_builder(os.path.join(tmp, "a"), cache_dir)
+            b = make_builder(os.path.join(tmp, "b"), cache_dir)
+            a._cached_rom_software(compile_software(a))
+            b._cached_rom_software(compile_software(b))
+            self.assertEqual(builds, [a])
+            self.assertEqual(bios(b), a.generated_dir)
+            # Make dependencies point to the generated files of the SoC using the build.
+            self.assertEqual(dependencies(a), "main.o: {}/csr.h ../libbase/libbase.a\n".format(a.generated_dir))
+            self.assertEqual(dependencies(b), "main.o: {}/csr.h ../libbase/libbase.a\n".format(b.generated_dir))
+
+            # Other generated files: built.
+            c = make_builder(os.path.join(tmp, "c"), cache_dir, csr="#define CSR_BASE 0x1\n")
+            c._cached_rom_software(compile_software(c))
+            self.assertEqual(builds, [a, c])
+            self.assertEqual(bios(c), c.generated_dir)
+            self.assertEqual(sorted(os.listdir(cache_dir)), sorted([a._get_software_key(), c._get_software_key()]))
+
+            # Rebuild of a SoC with unchanged software (in a clean directory): restored from cache.
+            d = make_builder(os.path.join(tmp, "d"), cache_dir)
+            d._cached_rom_software(compile_software(d))
+            self.assertEqual(builds, [a, c])
+            self.assertEqual(bios(d), a.generated_dir)
+
+    def test_software_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = make_builder(os.path.join(tmp, "a"), None)
+            key = a._get_software_key()
+            self.assertEqual(a._get_software_key(), key)
+
+            # Other toolchain: other key.
+            a._get_toolchain_version = lambda variables: "gcc 0.0"
+            self.assertNotEqual(a._get_software_key(), key)
+
+    def test_software_key_banner(self):
+        # The banners of the generated headers (generation date) are not part of the key.
+        with tempfile.TemporaryDirectory() as tmp:
+            a = make_builder(os.path.join(tmp, "a"), None)
+            t = time.time()
+            headers = write_headers(a, t)
+            key = a._get_software_key()
+            self.assertNotEqual(write_headers(a, t + 1.5)["git.h"], headers["git.h"])
+            self.assertEqual(a._get_software_key(), key)
+            self.assertNotEqual(write_headers(a, t + 3600)["soc.h"], headers["soc.h"])
+            self.assertEqual(a._get_software_key(), key)
+
+            # Other constants: other key.
+            write_headers(a, t, constants={"CONFIG_CLOCK_FREQUENCY": 50000000})
+            self.assertNotEqual(a._get_software_key(), key)
+
+    def test_build_variants(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            variants = [
+                SoftwareVariant("a"),
+                SoftwareVariant("b"),
+                SoftwareVariant("c", csr="#define CSR_BASE 0x1\n"),
+                TargetBuildVariant("failed", "litex.tools.litex_batch", args=["missing.json"]),
+            ]
+            results = build_variants(variants, jobs=2, output_dir=tmp)
+            self.assertEqual(sorted(results.keys()), ["a", "b", "c", "failed"])
+            self.assertIsInstance(results["failed"], OSError)
+            for name in ["a", "b", "c"]:
+                self.assertIn("total", results[name])
+                self.assertIn("software", results[name])
+
+            # a and b share the same software build (compiled by one of them), c has its own.
+            def bios(name):
+                with open(os.path.join(tmp, name, "software", "bios", "bios.bin")) as f:
+                    return f.read()
+            generated_dir = lambda name: os.path.join(tmp, name, "software", "include", "generated")
+            self.assertEqual(bios("a"), bios("b"))
+            self.assertIn(bios("a"), [generated_dir("a"), generated_dir("b")])
+            self.assertEqual(bios("c"), generated_dir("c"))
+            self.assertEqual(len(os.listdir(os.path.join(tmp, ".software"))), 2)
+
+    def test_build_variants_headers_time(self):
+        # Variants generating the same headers at different times share the same software build.
+        with tempfile.TemporaryDirectory() as tmp:
+            t = time.time()
+            variants = [SoftwareVariant(name, headers_time=t + 60*i) for i, name in enumerate("ab")]
+            results = build_variants(variants, jobs=2, output_dir=tmp)
+            self.assertEqual(sorted(results.keys()), ["a", "b"])
+            def bios(name):
+                with open(os.path.join(tmp, name, "software", "bios", "bios.bin")) as f:
+                    return f.read()
+            self.assertEqual(bios("a"), bios("b"))
+            self.assertEqual(len(os.listdir(os.path.join(tmp, ".software"))), 1)
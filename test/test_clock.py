@@ -137,3 +137,58 @@ class TestClock(unittest.TestCase):
         for i in range(pll.nclkouts_max):
             pll.create_clkout(ClockDomain("clkout{}".format(i)), 200e6)
         pll.compute_config()
+
+    # Solver
+    def test_clkdiv_lookup(self):
+        from litex.soc.cores.clock.common import clkdiv_range, clkdiv_lookup
+        for vco_freq in [600e6, 800e6, 1000e6, 1200e6]:
+            for f, m in [(100e6, 1e-2), (33.333e6, 1e-3), (74.25e6, 1e-4), (25e6, 0)]:
+                for d_range in [(1, 128+1), (1, 128+1/8, 1/8), (2, 10)]:
+                    first = None
+                    for d in clkdiv_range(*d_range):
+                        if abs(vco_freq/d - f) <= f*m:
+                            first = (d, vco_freq/d)
+                            break
+                    self.assertEqual(clkdiv_lookup(vco_freq, f, m, d_range), first)
+
+    def s7mmcm_config(self, optimize=False):
+        mmcm = S7MMCM()
+        mmcm.optimize = optimize
+        mmcm.register_clkin(Signal(), 100e6)
+        for i, f in enumerate([125e6, 100e6, 200e6, 33.333e6]):
+            mmcm.create_clkout(ClockDomain("clkout{}".format(i)), f)
+        return mmcm, mmcm.compute_config()
+
+    def test_optimize(self):
+        from litex.soc.cores.clock.common import config_error
+        mmcm, config     = self.s7mmcm_config()
+        mmcm, opt_config = self.s7mmcm_config(optimize=True)
+        self.assertLess(config_error(opt_config, mmcm.clkouts, "clkout{}_freq"),
+                        config_error(config,     mmcm.clkouts, "clkout{}_freq"))
+
+    def test_config_cache(self):
+        from litex.soc.cores.clock import common
+        common.clear_config_cache()
+        mmcm, config = self.s7mmcm_config()
+        self.assertEqual(len(common._configs), 1)
+        mmcm, config_cached = self.s7mmcm_config()
+        self.assertEqual(len(common._configs), 1)
+        self.assertEqual(config_cached, config)
+        mmcm, config = self.s7mmcm_config(optimize=True)
+        self.assertEqual(len(common._configs), 2)
+        common.clear_config_cache()
+        self.assertEqual(len(common._configs), 0)
+
+    def test_config_cache_key(self):
+        from litex.soc.cores.clock import common
+        common.clear_config_cache()
+        mmcm, config = self.s7mmcm_config()
+        # Non-scalar attributes are part of the key.
+        mmcm = S7MMCM()
+        mmcm.vco_freq_range = [600e6, 800e6]
+        mmcm.register_clkin(Signal(), 100e6)
+        for i, f in enumerate([125e6, 100e6, 200e6, 33.333e6]):
+            mmcm.create_clkout(ClockDomain("clkout{}".format(i)), f)
+        config_range = mmcm.compute_config()
+        self.assertEqual(len(common._configs), 2)
+        self.assertLessEqual(config_range["vco"], 800e6)
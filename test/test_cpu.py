@@ -0,0 +1,51 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import subprocess
+import sys
+
+
+def import_times(code):
+    # Run code in a fresh interpreter, return {module: cumulative import time (us)}.
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE, check=True).stderr.decode()
+    times = {}
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestCPU(unittest.TestCase):
+    def cpu_modules(self, times):
+        return sorted(m for m in times if m.startswith("litex.soc.cores.cpu."))
+
+    def test_lazy_import(self):
+        # Importing the CPU package (or listing the CPUs) does not import any CPU wrapper...
+        times = import_times("from litex.soc.cores import cpu; list(cpu.CPUS.keys())")
+        self.assertIn("litex.soc.cores.cpu", times)
+        self.assertEqual(self.cpu_modules(times), [])
+
+        # ...only the selected CPU is imported.
+        times = import_times("from litex.soc.cores import cpu; cpu.CPUS['serv']")
+        self.assertEqual({m.split(".")[4] for m in self.cpu_modules(times)}, {"serv"})
+        times = import_times("from litex.soc.cores.cpu import VexRiscv")
+        self.assertEqual({m.split(".")[4] for m in self.cpu_modules(times)}, {"vexriscv"})
+
+    def test_registry(self):
+        from litex.soc.cores import cpu
+        self.assertIs(cpu.CPUS["None"], cpu.CPUNone)
+        self.assertIsNone(cpu.CPUS["external"])
+        self.assertIs(cpu.CPUS["vexriscv"], cpu.VexRiscv)
+        self.assertEqual(cpu.CPUS["vexriscv"].name, "vexriscv")
+        self.assertIsNone(cpu.CPUS.get("foo"))
+        for name, cls in cpu.CPUS.items():
+            if cls is not None:
+                self.assertTrue(issubclass(cls, cpu.CPU))
+        with self.assertRaises(AttributeError):
+            cpu.Foo
@@ -0,0 +1,46 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import tempfile
+import json
+import os
+
+from migen import Memory
+
+from litex.soc.integration.common import get_mem_data
+
+
+class TestIntegration(unittest.TestCase):
+    def test_get_mem_data(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            def write(name, content):
+                filename = os.path.join(tmp, name)
+                with open(filename, "wb") as f:
+                    f.write(content)
+                return filename
+
+            # Single file (last word zero-padded).
+            image = write("image.bin", bytes(range(1, 11)))
+            self.assertEqual(list(get_mem_data(image, "big")), [0x01020304, 0x05060708, 0x090a0000])
+            self.assertEqual(list(get_mem_data(image, "little")), [0x04030201, 0x08070605, 0x00000a09])
+
+            # Regions (with a gap and an empty file).
+            regions = os.path.join(tmp, "regions.json")
+            with open(regions, "w") as f:
+                json.dump({
+                    image                                 : "0x00000000",
+                    write("dtb.bin", b"\xd0\x0d\xfe\xed") : "0x00000018",
+                    write("empty.bin", b"")               : "0x00000020",
+                }, f)
+            data = get_mem_data(regions, "big")
+            self.assertEqual(list(data), [0x01020304, 0x05060708, 0x090a0000, 0, 0, 0, 0xd00dfeed, 0])
+
+            # Accepted as Memory init.
+            mem = Memory(32, len(data), init=data)
+            self.assertEqual([mem.init[i] for i in range(len(data))], list(data))
+
+            with self.assertRaises(AssertionError):
+                get_mem_data(image, mem_size=8)
@@ -0,0 +1,206 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import io
+import unittest
+import random
+import tempfile
+import contextlib
+from unittest import mock
+
+from litex.tools import litex_term
+from litex.tools.litex_term import sfl_load_frames, sfl_cmd_load, sfl_cmd_load_lz4
+from litex.tools.litex_term import SFLFrame, crc16
+
+
+def sfl_load(mem, frame):
+    # SFL load frames handling of the BIOS (serialboot).
+    address = int.from_bytes(frame.payload[:4], "big")
+    payload = frame.payload[4:]
+    if frame.cmd == sfl_cmd_load:
+        mem[address:address + len(payload)] = payload
+        return
+    assert frame.cmd == sfl_cmd_load_lz4
+    i = 0
+    def length(n):
+        nonlocal i
+        if n == 15:
+            while True:
+                n += payload[i]
+                i += 1
+                if payload[i - 1] != 255:
+                    break
+        return n
+    while i < len(payload):
+        token = payload[i]
+        i += 1
+        n = length(token >> 4)
+        mem[address:address + n] = payload[i:i + n]
+        address += n
+        i       += n
+        if i >= len(payload):
+            break
+        offset = payload[i] | (payload[i + 1] << 8)
+        i     += 2
+        n = length(token & 0xf) + 4
+        for k in range(n):
+            mem[address] = mem[address - offset]
+            address += 1
+
+
+class FakePort:
+    """Serial port connected to a BIOS handling the SFL load frames.
+
+    Frames whose index (in reception order) is in crc_errors get a CRC error reply, the ones in lost
+    are never received. After an error, the BIOS flushes its RX buffer: the following frames are
+    dropped until the host reads the replies (CRC error) or a read times out (lost frames).
+    """
+    def __init__(self, size, crc_errors=[], lost=[]):
+        self.mem        = bytearray(size)
+        self.crc_errors = set(crc_errors)
+        self.lost       = set(lost)
+        self.received   = 0
+        self.replies    = bytearray()
+        self.flush      = None
+
+    @property
+    def in_waiting(self):
+        return len(self.replies)
+
+    def write(self, data):
+        frame         = SFLFrame()
+        frame.cmd     = data[3:4]
+        frame.payload = data[4:]
+        assert len(frame.payload) == data[0]
+        assert int.from_bytes(data[1:3], "big") == crc16(data[3:])
+        index = self.received
+        self.received += 1
+        if self.flush is not None:
+            return
+        if index in self.crc_errors:
+            self.replies += litex_term.sfl_ack_crcerror
+            self.flush    = "crc"
+        elif index in self.lost:
+            self.flush = "lost"
+        else:
+            sfl_load(self.mem, frame)
+            self.replies += litex_term.sfl_ack_success
+
+    def read(self, n=1):
+        if not len(self.replies):
+            # Read timeout (the host would block forever on ports without timeouts).
+            assert getattr(self, "timeout", None) is not None
+            self.flush = None
+            return b""
+        if self.flush == "crc":
+            self.flush = None
+        data = bytes(self.replies[:n])
+        del self.replies[:n]
+        return data
+
+
+class FakeSerialPort(FakePort):
+    baudrate = 115200
+    timeout  = None
+
+
+class TestLiteXTerm(unittest.TestCase):
+    def images(self):
+        prng = random.Random(42)
+        text = " ".join(prng.choice(["litex", "migen", "soc", "bios", "sfl", "uart"]) for _ in range(4000))
+        return {
+            "text"   : text.encode(),
+            "random" : bytes(prng.getrandbits(8) for _ in range(3000)),
+            "zeros"  : bytes(5000),
+            "mixed"  : bytes(prng.getrandbits(8) for _ in range(600)) + text.encode()[:2000] + bytes(1000),
+            "short"  : b"abc",
+        }
+
+    def load(self, frames, length, address=0x100):
+        mem = bytearray(address + length)
+        for size, frame in frames:
+            self.assertLessEqual(len(frame.payload), 255)
+            sfl_load(mem, frame)
+        return bytes(mem[address:])
+
+    def test_load_frames(self):
+        for name, data in self.images().items():
+            for compress in [False, True]:
+                frames = list(sfl_load_frames(data, 0x100, 251, compress))
+                self.assertEqual(sum(size for size, frame in frames), len(data))
+                self.assertEqual(self.load(frames, len(data)), data, name)
+                if not compress:
+                    self.assertTrue(all(frame.cmd == sfl_cmd_load for size, frame in frames))
+
+        # Compressible images are sent in less frames.
+        images = self.images()
+        for name in ["text", "zeros"]:
+            raw        = list(sfl_load_frames(images[name], 0x100, 251))
+            compressed = list(sfl_load_frames(images[name], 0x100, 251, compress=True))
+            self.assertLess(2*len(compressed), len(raw))
+        # Incompressible ones are sent raw.
+        frames = list(sfl_load_frames(images["random"], 0x100, 251, compress=True))
+        self.assertTrue(all(frame.cmd == sfl_cmd_load for size, frame in frames))
+
+    def test_load_frames_retransmission(self):
+        # Frames received after a lost one are sent again (go-back-N): the final memory is correct
+        # even when frames are decompressed before the data they reference is loaded.
+        data   = self.images()["text"]
+        frames = list(sfl_load_frames(data, 0x100, 251, compress=True))
+        order  = frames[:3] + frames[4:6] + frames[3:]
+        self.assertEqual(self.load(order, len(data)), data)
+
+    def upload(self, port, data, compress=False, address=0x100):
+        with mock.patch.object(litex_term, "Console"), mock.patch("signal.signal"):
+            term = litex_term.LiteXTerm(False, None, None, None, compress)
+        term.port           = port
+        term.payload_length = 255
+        term.delay          = 0
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "image.bin")
+            with open(filename, "wb") as f:
+                f.write(data)
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                self.assertEqual(term.upload(filename, address), len(data))
+        self.assertEqual(bytes(port.mem[address:]), data)
+        return stdout.getvalue()
+
+    def test_upload(self):
+        data = self.images()["text"]
+        for compress in [False, True]:
+            port   = FakeSerialPort(0x100 + len(data))
+            output = self.upload(port, data, compress)
+            self.assertEqual(port.received, len(list(sfl_load_frames(data, 0x100, 251, compress))))
+            self.assertNotIn("retransmission", output)
+            self.assertIsNone(port.timeout)
+
+    def test_upload_crc_error(self):
+        # The frame with the error and the following ones in flight are sent again.
+        data   = self.images()["random"] + self.images()["text"]
+        frames = len(list(sfl_load_frames(data, 0x100, 251)))
+        port   = FakeSerialPort(0x100 + len(data), crc_errors=[3, 20, 21])
+        output = self.upload(port, data)
+        self.assertIn("retransmission", output)
+        self.assertGreater(port.received, frames)
+
+    def test_upload_timeout(self):
+        # Lost frames are detected by the read timeout (set during the upload) and sent again.
+        data   = self.images()["random"] + self.images()["text"]
+        frames = len(list(sfl_load_frames(data, 0x100, 251)))
+        port   = FakeSerialPort(0x100 + len(data), lost=[0, 5, 30])
+        output = self.upload(port, data)
+        self.assertIn("3 retransmission(s)", output)
+        self.assertGreater(port.received, frames)
+        self.assertIsNone(port.timeout)
+
+    def test_upload_minimal_port(self):
+        # Ports without baudrate/timeout (JTAG UART, crossover UART, ...).
+        data = self.images()["mixed"]
+        port = FakePort(0x100 + len(data), crc_errors=[2])
+        self.assertFalse(hasattr(port, "baudrate") or hasattr(port, "timeout"))
+        output = self.upload(port, data, compress=True)
+        self.assertIn("1 retransmission(s)", output)
+        self.assertNotIn("theoretical", output)
@@ -0,0 +1,334 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import threading
+import tempfile
+import json
+import random
+import io
+import os
+import struct
+
+from litex.tools.litex_server import RemoteServer
+from litex.tools.litex_client import RemoteClient
+from litex.tools.remote.comm_bulk import CommBulk
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
+from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites, EtherboneWrite, EtherboneRead
+
+# Memory Comm --------------------------------------------------------------------------------------
+
+class MemoryComm:
+    """Comm backed by a dict, standing in for a UART/UDP/PCIe bridge."""
+    def __init__(self):
+        self.mem      = {}
+        self.accesses = 0
+        self.lock     = threading.Lock()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self, addr, length=None, burst="incr"):
+        with self.lock:
+            self.accesses += 1
+            length_int = 1 if length is None else length
+            incr  = (burst == "incr")
+            datas = [self.mem.get(addr + 4*incr*i, 0) for i in range(length_int)]
+            return datas[0] if length is None else datas
+
+    def write(self, addr, datas, burst="incr"):
+        with self.lock:
+            self.accesses += 1
+            datas = datas if isinstance(datas, list) else [datas]
+            for i, data in enumerate(datas):
+                self.mem[addr + 4*i] = data
+
+class BulkMemoryComm(MemoryComm, CommBulk):
+    max_burst = 7
+
+class UARTBridgePort:
+    """Serial port answering the UART bridge commands (UARTBone with an RX FIFO) from a MemoryComm."""
+    def __init__(self, comm):
+        self.comm   = comm
+        self.rx     = bytearray() # Host -> Bridge.
+        self.tx     = bytearray() # Bridge -> Host.
+        self.writes = 0
+        self.max_tx = 0           # Max of pending response bytes (read commands in flight).
+
+    def inWaiting(self):
+        return len(self.tx)
+
+    def read(self, length):
+        r, self.tx = bytes(self.tx[:length]), self.tx[length:]
+        return r
+
+    def write(self, data):
+        self.writes += 1
+        self.rx += data
+        while len(self.rx) >= 6:
+            cmd, length, addr = struct.unpack(">BBI", self.rx[:6])
+            incr = cmd in [0x01, 0x02]
+            if cmd in [0x01, 0x03]:
+                if len(self.rx) < 6 + 4*length:
+                    break
+                datas = struct.unpack(">{}I".format(length), self.rx[6:6 + 4*length])
+                for i, value in enumerate(datas):
+                    self.comm.write(4*(addr + incr*i), value)
+                self.rx = self.rx[6 + 4*length:]
+            else:
+                datas = [self.comm.read(4*(addr + incr*i)) for i in range(length)]
+                self.tx += struct.pack(">{}I".format(length), *datas)
+                self.rx = self.rx[6:]
+        self.max_tx = max(self.max_tx, len(self.tx))
+        return len(data)
+
+class EtherboneSocket:
+    """UDP socket applying the Etherbone writes it is sent to a MemoryComm."""
+    def __init__(self, comm):
+        self.comm    = comm
+        self.packets = []
+
+    def sendto(self, data, address):
+        packet = EtherbonePacket(data)
+        packet.decode()
+        self.packets.append(packet)
+        for record in packet.records:
+            self.comm.write(record.writes.base_addr, list(record.writes.get_datas()))
+
+csr_csv = """\
+csr_base,ctrl,0x00000000,,
+csr_base,timer0,0x00000800,,
+csr_register,ctrl_reset,0x00000000,1,rw
+csr_register,ctrl_scratch,0x00000004,4,rw
+csr_register,ctrl_bus_errors,0x00000014,4,ro
+csr_register,timer0_load,0x00000800,4,rw
+csr_register,timer0_en,0x00000810,1,rw
+csr_register,timer0_update_value,0x00000814,1,wo
+csr_register,timer0_value,0x00000818,4,ro
+constant,config_csr_data_width,8,,
+"""
+
+csr_json = {"csr_registers": {
+    "timer0_en": {"addr": 0x810, "size": 1, "type": "rw", "fields": [
+        {"name": "enable", "offset": 0, "size": 1},
+        {"name": "mode",   "offset": 1, "size": 3},
+    ]},
+}}
+
+# Test Remote --------------------------------------------------------------------------------------
+
+class TestEtherbone(unittest.TestCase):
+    def test_codec(self):
+        record = EtherboneRecord()
+        record.writes = EtherboneWrites(base_addr=0x1000, datas=[0x01020304, 0xffffffff])
+        record.writes.add(EtherboneWrite(0xdeadbeef))
+        record.reads  = EtherboneReads(base_ret_addr=0x2000, addrs=[0x10, 0x14])
+        packet = EtherbonePacket()
+        packet.records = [record, EtherboneRecord()]
+        packet.encode()
+        self.assertEqual(bytes(packet.bytes[:12]), bytes([0x4e, 0x6f, 0x10, 0x44, 0, 0, 0, 0, 0, 0x0f, 3, 2]))
+        self.assertEqual(bytes(packet.bytes[16:20]), bytes([1, 2, 3, 4]))
+
+        packet = EtherbonePacket(bytes(packet.bytes))
+        packet.decode()
+        self.assertEqual(len(packet.records), 2)
+        record = packet.records[0]
+        self.assertEqual((record.wcount, record.rcount), (3, 2))
+        self.assertEqual(record.writes.base_addr, 0x1000)
+        self.assertEqual(record.writes.get_datas(), [0x01020304, 0xffffffff, 0xdeadbeef])
+        self.assertEqual([w.data for w in record.writes.writes], record.writes.get_datas())
+        self.assertEqual(record.reads.base_ret_addr, 0x2000)
+        self.assertEqual([r.addr for r in record.reads.reads], [0x10, 0x14])
+        # Compatibility views are read-only.
+        with self.assertRaises(AttributeError):
+            record.writes.writes.append(EtherboneWrite(0))
+        record.reads.add(EtherboneRead(0x18))
+        self.assertEqual(record.reads.get_addrs(), [0x10, 0x14, 0x18])
+        self.assertEqual(packet.records[1].writes, None)
+
+
+class TestRemote(unittest.TestCase):
+    def setUp(self):
+        self.comm   = BulkMemoryComm()
+        self.server = RemoteServer(self.comm, "localhost", 0)
+        self.server.open()
+        self.server.start(2)
+        self.port = self.server.socket.getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+
+    def client(self, **kwargs):
+        wb = RemoteClient(port=self.port, csr_csv=None, **kwargs)
+        wb.open()
+        return wb
+
+    def test_read_write(self):
+        wb = self.client()
+        wb.write(0x100, 0x12345678)
+        wb.write(0x200, list(range(600)))
+        self.assertEqual(wb.read(0x100), 0x12345678)
+        self.assertEqual(wb.read(0x200, 600), list(range(600)))
+        self.assertEqual(wb.read(0x200, 4, burst="fixed"), [0]*4)
+        wb.close()
+
+    def test_pipelined_reads(self):
+        wb = self.client(window=4)
+        wb.write(0x0, list(range(64)))
+        futures = [wb.read_async(4*i) for i in range(64)]
+        self.assertTrue(len(wb.pending) <= 4)
+        self.assertEqual([f.result() for f in futures], list(range(64)))
+        wb.close()
+
+    def test_batch(self):
+        wb = self.client()
+        with wb.batch() as batch:
+            for i in range(300):
+                batch.write(4*i, i)
+            f0 = batch.read(0x0)
+            f1 = batch.read(0x10, 300)
+            batch.write(0x0, 0xdeadbeef)
+            f2 = batch.read(0x0)
+            self.assertEqual(f0.result(), 0)
+        self.assertEqual(f1.result(), list(range(4, 300)) + [0]*4)
+        self.assertEqual(f2.result(), 0xdeadbeef)
+        wb.close()
+
+    def test_concurrent_clients(self):
+        def poller(n, results):
+            wb = self.client()
+            for i in range(100):
+                wb.write(0x1000*n + 4*(i % 16), i)
+                results.append(wb.read(0x1000*n + 4*(i % 16)) == i)
+            wb.close()
+
+        results = []
+        threads = [threading.Thread(target=poller, args=(n, results)) for n in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [True]*200)
+        metrics = self.server.metrics()
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(len(metrics["clients"]), 2)
+        for m in metrics["clients"].values():
+            self.assertEqual(m["requests"], 200)
+
+    def test_comm_error(self):
+        read = self.comm.read
+        def failing_read(addr, *args, **kwargs):
+            if addr == 0xbad0:
+                raise OSError("Comm failure")
+            return read(addr, *args, **kwargs)
+        self.comm.read = failing_read
+        wb = self.client()
+        with self.assertRaises(ConnectionError):
+            wb.read(0xbad0)
+        wb.close()
+        # The bridge worker keeps serving.
+        wb = self.client()
+        wb.write(0x100, 0x12345678)
+        self.assertEqual(wb.read(0x100), 0x12345678)
+        wb.close()
+        self.assertEqual(self.server.metrics()["queue_depth"], 0)
+
+    def test_csr_read_many(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "csr.csv"), "w") as f:
+                f.write(csr_csv)
+            with open(os.path.join(d, "csr.json"), "w") as f:
+                json.dump(csr_json, f)
+            wb = RemoteClient(port=self.port,
+                csr_csv  = os.path.join(d, "csr.csv"),
+                csr_json = os.path.join(d, "csr.json"))
+        wb.open()
+        for i in range(0x820//4):
+            wb.write(4*i, (7*i + 3) & 0xff)
+        names  = ["ctrl_scratch", "ctrl_bus_errors", "timer0_en", "timer0_value", "ctrl_reset"]
+        values = wb.regs.read_many(names)
+        self.assertEqual(values, {n: getattr(wb.regs, n).read() for n in names})
+
+        # ctrl registers are contiguous: one burst, timer0_en/value are split by a wo register.
+        registers = [getattr(wb.regs, n) for n in names]
+        self.assertEqual(wb.regs.plan(registers), [(0x0, 9), (0x810, 1), (0x818, 4)])
+
+        snapshot = wb.regs.snapshot("timer0", decode=True)
+        self.assertEqual(sorted(snapshot.keys()), ["timer0_en", "timer0_load", "timer0_value"])
+        en = wb.regs.timer0_en.read()
+        self.assertEqual(snapshot["timer0_en"], {"enable": en & 0b1, "mode": (en >> 1) & 0b111})
+        with self.assertRaises(KeyError):
+            wb.regs.read_many(["timer0_update_value"])
+        wb.close()
+
+    def test_bulk(self):
+        prng = random.Random(42)
+        data = bytes(prng.randrange(256) for i in range(4*1000))
+        for comm in [BulkMemoryComm(), self.client(window=4)]:
+            self.assertEqual(comm.write_bytes(0x1000, data), len(data))
+            self.assertEqual(comm.read_bytes(0x1000, len(data)), data)
+            self.assertEqual(comm.read(0x1000), int.from_bytes(data[:4], "little"))
+            # Unaligned length and endianness.
+            self.assertEqual(comm.read_bytes(0x1000, 6, endianness="big"),
+                data[3::-1] + data[7:5:-1])
+            # Streaming to/from files.
+            f = io.BytesIO()
+            self.assertEqual(comm.read_bytes(0x1000, len(data), file=f), len(data))
+            self.assertEqual(f.getvalue(), data)
+            comm.write_bytes(0x8000, io.BytesIO(data), chunk_size=64)
+            self.assertEqual(comm.read_bytes(0x8000, len(data)), data)
+            with self.assertRaises(ValueError):
+                comm.write_bytes(0x1000, data[:6])
+            with self.assertRaises(ValueError):
+                comm.read_bytes(0x1002, 4)
+        # Remote reads are merged by the server up to the max_burst of its comm.
+        self.assertLess(self.comm.accesses, 1500)
+
+
+class TestCommUDP(unittest.TestCase):
+    def test_write_bytes(self):
+        from litex.tools.remote.comm_udp import CommUDP
+        comm = CommUDP()
+        comm.socket = EtherboneSocket(MemoryComm())
+        data = bytes(range(256))*16
+        self.assertEqual(comm.write_bytes(0x8000, data), len(data))
+        # Bursts of 255 writes: one single record datagram per burst.
+        packets = comm.socket.packets
+        self.assertEqual(len(packets), 5)
+        self.assertTrue(all(len(packet.records) == 1 for packet in packets))
+        self.assertEqual([packet.records[0].wcount for packet in packets], [255]*4 + [4])
+        mem = comm.socket.comm.mem
+        self.assertEqual(b"".join(mem[0x8000 + 4*i].to_bytes(4, "little") for i in range(1024)), data)
+
+
+class TestCommUART(unittest.TestCase):
+    def comm(self, window):
+        from litex.tools.remote.comm_uart import CommUART
+        comm = CommUART("loop://", 3e6, window=window)
+        comm.port = UARTBridgePort(MemoryComm())
+        return comm
+
+    def test_read_write(self):
+        for window in [1, 4]:
+            comm = self.comm(window)
+            datas = list(range(2000))
+            comm.write(0x1000, datas)
+            # Writes: a single port write per burst of 255 words.
+            self.assertEqual(comm.port.writes, 8)
+            self.assertEqual(comm.read(0x1000, len(datas)), datas)
+            # Reads: up to window bursts in flight.
+            self.assertEqual(comm.port.max_tx, 4*255*window)
+            self.assertEqual(comm.read(0x1000 + 4*10), 10)
+            comm.write(0x100, [1, 2, 3], burst="fixed")
+            self.assertEqual(comm.read(0x100, 2, burst="fixed"), [3, 3])
+            data = bytes(range(256))*16
+            comm.write_bytes(0x8000, data)
+            self.assertEqual(comm.read_bytes(0x8000, len(data)), data)
+            stats = comm.get_stats()
+            self.assertGreater(stats["rx"], 0)
+            self.assertGreater(stats["tx"], 0)
@@ -0,0 +1,396 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import random
+import tempfile
+import gzip
+import os
+from shutil import which
+
+from migen import *
+from migen.sim import run_simulation as migen_run_simulation
+
+from litex.gen.sim import Simulator, run_simulation, passive
+from litex.gen.sim.core import Evaluator
+from litex.gen.sim.vcd import VCDWriter
+
+# Test DUT -----------------------------------------------------------------------------------------
+
+class SimDUT(Module):
+    def __init__(self):
+        self.i      = i      = Signal(8)
+        self.j      = j      = Signal((8, True))
+        self.sel    = sel    = Signal(2)
+        self.count  = count  = Signal(16)
+        self.scount = scount = Signal((12, True))
+        self.cat    = cat    = Signal(24)
+        self.mux    = mux    = Signal(8)
+        self.case   = case   = Signal(8)
+        self.arr    = arr    = Signal(8)
+        self.rep    = rep    = Signal(12)
+        self.part   = part   = Signal(16)
+        self.cmp    = cmp    = Signal(6)
+        self.rdata  = rdata  = Signal(8)
+        self.slow   = slow   = Signal(8)
+
+        # # #
+
+        regs = Array(Signal(8, reset=k) for k in range(4))
+        self.sync += [
+            count.eq(count + 1),
+            scount.eq(scount - j),
+            regs[sel].eq(i ^ count[:8]),
+            If(count[0],
+                part[4:12].eq(i),
+            ).Else(
+                part[0:4].eq(j),
+                part[12:].eq(~i),
+            )
+        ]
+        self.comb += [
+            cat.eq(Cat(i, j, count[3:11])),
+            mux.eq(Mux(sel == 2, i + j, i - j)),
+            arr.eq(regs[sel]),
+            rep.eq(Replicate(sel, 6)),
+            cmp.eq(Cat(i < j, i <= j, i == j, i != j, i > j, i >= j)),
+            Case(sel, {
+                0         : case.eq(i >> 2),
+                1         : case.eq(i << 1),
+                "default" : case.eq(-j),
+            }),
+        ]
+
+        mem  = Memory(8, 16, init=[k*3 for k in range(16)])
+        port = mem.get_port(write_capable=True)
+        self.specials += mem, port
+        self.comb += [
+            port.adr.eq(count[:4]),
+            port.dat_w.eq(i),
+            port.we.eq(sel == 3),
+            rdata.eq(port.dat_r),
+        ]
+
+        self.clock_domains.cd_slow = ClockDomain()
+        self.sync.slow += slow.eq(slow + Mux(ResetSignal("slow"), 0, 1) + ClockSignal("sys"))
+
+    def observed(self):
+        return [self.count, self.scount, self.cat, self.mux, self.case, self.arr, self.rep,
+            self.part, self.cmp, self.rdata, self.slow]
+
+
+def run_dut(run_simulation=run_simulation, clocks={"sys": 10, "slow": 26}, **kwargs):
+    prng  = random.Random(42)
+    dut   = SimDUT()
+    trace = []
+
+    def generator():
+        for n in range(200):
+            yield dut.i.eq(prng.randrange(256))
+            yield dut.j.eq(prng.randrange(-128, 128))
+            yield dut.sel.eq(prng.randrange(4))
+            yield
+            trace.append((yield dut.observed()))
+
+    run_simulation(dut, generator(), clocks=clocks, **kwargs)
+    return trace
+
+def parse_vcd(filename):
+    # Returns {name: [(time, value), ...]} with only actual value changes.
+    opener  = gzip.open if filename.endswith(".gz") else open
+    names   = {}
+    changes = {}
+    t       = 0
+    with opener(filename, "rt") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("$var"):
+                _, _, _, code, name, _ = line.split()
+                names[code]   = name
+                changes[name] = []
+            elif line.startswith("#"):
+                t = int(line[1:])
+            elif line.startswith("b"):
+                value, code = line[1:].split()
+                changes[names[code]].append((t, int(value, 2)))
+            elif line[:1] in ["0", "1"]:
+                changes[names[line[1:]]].append((t, int(line[0])))
+    for name, values in changes.items():
+        r = []
+        for t, v in values:
+            if r and r[-1][0] == t:
+                r.pop()
+            if not r or r[-1][1] != v:
+                r.append((t, v))
+        changes[name] = r
+    return changes
+
+# Test Sim -----------------------------------------------------------------------------------------
+
+class TestSim(unittest.TestCase):
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Simulator(Module(), [], engine="foo")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            run_simulation(Module(), [], backend="foo")
+
+    def test_compiled_engine_bit_exact(self):
+        reference = run_dut(engine="interpretive")
+        self.assertEqual(len(reference), 200)
+        self.assertEqual(run_dut(engine="compiled"), reference)
+
+    def test_matches_migen_simulator(self):
+        self.assertEqual(run_dut(), run_dut(run_simulation=migen_run_simulation))
+
+    def test_comb_chain(self):
+        class DUT(Module):
+            def __init__(self, n):
+                self.i = Signal(8)
+                o = Signal(8)
+                self.comb += o.eq(self.i)
+                for k in range(n):
+                    x = Signal(8)
+                    self.comb += If(o[0], x.eq(o + k)).Else(x.eq(o))
+                    o = x
+                self.o = o
+
+        def generator(dut):
+            for v in [1, 2, 3, 255]:
+                yield dut.i.eq(v)
+                yield
+                o = v
+                for k in range(64):
+                    o = (o + k if o & 1 else o) & 0xff
+                self.assertEqual((yield dut.o), o)
+
+        for engine in Simulator.engines:
+            dut = DUT(64)
+            run_simulation(dut, generator(dut), engine=engine)
+
+    def test_generator_write_to_comb_signal(self):
+        class DUT(Module):
+            def __init__(self):
+                self.i = Signal(8)
+                self.o = Signal(8)
+                self.comb += self.o.eq(self.i + 1)
+
+        def generator(dut):
+            yield dut.i.eq(1)
+            yield dut.o.eq(42)
+            yield
+            # comb logic drives o again once the generator write is committed.
+            self.assertEqual((yield dut.o), 2)
+
+        for engine in Simulator.engines:
+            dut = DUT()
+            run_simulation(dut, generator(dut), engine=engine)
+
+    def test_vcd(self):
+        class DUT(Module):
+            def __init__(self):
+                # Enough signals for VCD codes to use all printable characters.
+                self.counters = [Signal(8, name="counter{}".format(k)) for k in range(128)]
+                self.sync += [c.eq(c + k + 1) for k, c in enumerate(self.counters)]
+
+        def generator():
+            for n in range(32):
+                yield
+
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "sim.vcd")
+            run_simulation(DUT(), generator(), vcd_name=filename)
+            changes = parse_vcd(filename)
+            for k in range(128):
+                values = [v for t, v in changes["counter{}".format(k)]]
+                self.assertEqual(values, [n*(k + 1) & 0xff for n in range(len(values))])
+
+            # Filters, time window and compression.
+            filename = os.path.join(d, "sim.vcd.gz")
+            vcd = VCDWriter(filename, include=["counter1*"], exclude=["counter12*"], start=100, end=200)
+            run_simulation(DUT(), generator(), vcd_name=vcd)
+            changes = parse_vcd(filename)
+            names = ["counter{}".format(k) for k in range(128)]
+            names = [n for n in names if n.startswith("counter1") and not n.startswith("counter12")]
+            self.assertEqual(sorted(changes.keys()), sorted(names))
+            # First value is from $dumpvars at window start.
+            times = [t for t, v in changes["counter1"]][1:]
+            self.assertEqual(len(times), 10)
+            self.assertTrue(all(100 <= t <= 200 for t in times))
+
+    def test_delay(self):
+        class DUT(Module):
+            def __init__(self):
+                self.count = Signal(16)
+                self.i     = Signal(8)
+                self.o     = Signal(8)
+                self.sync += self.count.eq(self.count + 1)
+                self.comb += self.o.eq(self.i + 1)
+
+        def generator(dut):
+            # sys rising edges at 5, 15, 25...; first resumed at the edge at 5.
+            yield ("delay", 23)
+            self.assertEqual((yield dut.count), 3)
+            yield dut.i.eq(41)
+            yield ("delay", 1)
+            self.assertEqual((yield dut.o), 42)
+            # Back to clock cycles: resumed at the edge at 35, before the sync update.
+            yield
+            self.assertEqual((yield dut.count), 3)
+            yield ("delay", 1001)
+            self.assertEqual((yield dut.count), 104)
+
+        for engine in Simulator.engines:
+            dut = DUT()
+            run_simulation(dut, generator(dut), clocks={"sys": 10, "eth": 8}, engine=engine)
+
+    def test_delay_negative(self):
+        def generator():
+            yield ("delay", -1)
+
+        with self.assertRaises(ValueError):
+            run_simulation(Module(), generator())
+
+
+# Test Evaluator -----------------------------------------------------------------------------------
+
+class TestEvaluator(unittest.TestCase):
+    def test_index(self):
+        # Dense indices: signals given at construction first, in order, then on first access.
+        a, b, c = Signal(8, reset=1), Signal(8, reset=2), Signal(8, reset=3)
+        evaluator = Evaluator({}, {}, [b, a])
+        self.assertEqual(evaluator.signals, [b, a])
+        self.assertEqual((evaluator.index(a), evaluator.index(b)), (1, 0))
+        self.assertEqual(evaluator.eval(c), 3)
+        self.assertEqual(evaluator.index(c), 2)
+        self.assertEqual(evaluator.index(c), 2)
+        self.assertEqual(evaluator.signal_values, [2, 1, 3])
+        self.assertEqual(len(evaluator.modifications), 3)
+        self.assertEqual(len(evaluator.dirty), 3)
+
+    def test_simulator_index(self):
+        # Signals of the design are indexed at elaboration (by duid), testbench-only ones lazily.
+        dut = SimDUT()
+        tb  = Signal(8, reset=42)
+        def generator():
+            n = len(sim.evaluator.signals)
+            self.assertNotIn(tb, sim.evaluator.signal_index)
+            self.assertEqual((yield tb), 42)
+            self.assertEqual(sim.evaluator.index(tb), n)
+            yield tb.eq(43)
+            yield
+            self.assertEqual((yield tb), 43)
+            self.assertEqual(len(sim.evaluator.signals), n + 1)
+        sim = Simulator(dut, [generator()], clocks={"sys": 10, "slow": 26})
+        signals = sim.evaluator.signals
+        self.assertEqual(signals, sorted(signals, key=lambda s: s.duid))
+        self.assertEqual([sim.evaluator.index(s) for s in signals], list(range(len(signals))))
+        self.assertIn(dut.count, signals)
+        sim.run()
+
+    def test_commit(self):
+        a, b = Signal(8), Signal(8, reset=5)
+        evaluator = Evaluator({}, {}, [a, b])
+        evaluator.assign(a, 1)
+        evaluator.assign(a, 2)
+        # Pending modifications: only visible postcommit, each index dirty once.
+        self.assertEqual(evaluator.eval(a), 0)
+        self.assertEqual(evaluator.eval(a, postcommit=True), 2)
+        self.assertEqual(evaluator.dirty_indices, [0])
+        self.assertEqual(evaluator.commit(), [0])
+        self.assertEqual(evaluator.eval(a), 2)
+        self.assertEqual((evaluator.dirty[0], evaluator.dirty_indices), (0, []))
+        # Assignments to the current value are not reported as modifications, including the first
+        # assignment of a signal to its reset value.
+        evaluator.assign(a, 2)
+        evaluator.assign(b, 5)
+        self.assertEqual(evaluator.commit(), [])
+        self.assertEqual(evaluator.dirty, bytearray(2))
+        evaluator.assign(b, 6)
+        evaluator.assign(a, 2 + 256) # Truncated.
+        self.assertEqual(evaluator.commit(), [1])
+
+    def test_vcd_reset_value(self):
+        # Testbench-only signals are only dumped once they leave their reset value.
+        class DUT(Module):
+            def __init__(self):
+                self.count = Signal(8)
+                self.sync += self.count.eq(self.count + 1)
+
+        changed   = Signal(8, name="tb_changed")
+        unchanged = Signal(8, name="tb_unchanged")
+        def generator():
+            yield changed.eq(0)
+            yield unchanged.eq(0)
+            yield
+            yield changed.eq(5)
+            for n in range(4):
+                yield
+
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "sim.vcd")
+            run_simulation(DUT(), generator(), vcd_name=filename)
+            changes = parse_vcd(filename)
+            self.assertEqual([v for t, v in changes["tb_changed"]], [0, 5])
+            self.assertNotIn("tb_unchanged", changes)
+
+# Test Verilator Backend ---------------------------------------------------------------------------
+
+@unittest.skipIf(which("verilator") is None, "Verilator not found")
+class TestVerilatorBackend(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def run_simulation(self, *args, **kwargs):
+        run_simulation(*args, backend="verilator", cache_dir=self.cache_dir.name, **kwargs)
+
+    def test_matches_python_backend(self):
+        # Clock edges of sys and slow never coincide (simultaneous edges follow Verilog scheduling).
+        clocks = {"sys": 10, "slow": (20, 3)}
+        reference = run_dut(clocks=clocks)
+        self.assertEqual(run_dut(run_simulation=self.run_simulation, clocks=clocks), reference)
+
+    def test_generators(self):
+        class DUT(Module):
+            def __init__(self):
+                self.count = Signal(8)
+                self.i     = Signal(72)
+                self.o     = Signal(72)
+                self.mem   = Memory(16, 8)
+                self.specials += self.mem
+                self.sync += self.count.eq(self.count + 1)
+                self.comb += self.o.eq(self.i + 1)
+
+        def generators(dut, trace):
+            @passive
+            def monitor():
+                while True:
+                    trace.append(("count", (yield dut.count)))
+                    yield
+
+            def driver():
+                for n in range(8):
+                    yield dut.i.eq(2**70 + n)
+                    yield dut.mem[n].eq(n*3)
+                    yield
+                    trace.append(("o", (yield dut.o), (yield dut.mem[n])))
+                yield ("delay", 13)
+                trace.append(("delay", (yield dut.count)))
+
+            return [monitor(), driver()]
+
+        traces = []
+        for backend in ["python", "verilator"]:
+            dut   = DUT()
+            trace = []
+            kwargs = {"cache_dir": self.cache_dir.name} if backend == "verilator" else {}
+            run_simulation(dut, generators(dut, trace), backend=backend, **kwargs)
+            traces.append(trace)
+        self.assertEqual(len(traces[0]), 18)
+        self.assertEqual(traces[1], traces[0])
@@ -0,0 +1,215 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import tempfile
+import json
+import os
+
+from migen import *
+from migen.fhdl.verilog import convert
+
+from litex.soc.interconnect.csr_bus import CSRBank
+
+from litex.build.sim.config import SimConfig
+from litex.build.sim.common import SimMemory, sim_special_overrides
+from litex.build.sim.platform import SimCheckpoint
+
+
+class MemDUT(Module):
+    def __init__(self, widths):
+        self.mems  = []
+        self.ports = []
+        for i, width in enumerate(widths):
+            mem  = Memory(width, 16, name="mem{}".format(i))
+            port = mem.get_port()
+            self.specials += mem, port
+            self.mems.append(mem)
+            self.ports.append(port)
+        self.o = Signal(sum(widths))
+        self.comb += self.o.eq(Cat(*[port.dat_r for port in self.ports]))
+
+
+class TestSimConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for i in range(2):
+            filename = os.path.join(self.tmp.name, "image{}.bin".format(i))
+            with open(filename, "wb") as f:
+                f.write(bytes(16))
+            self.files.append(filename)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def config(self):
+        config = SimConfig()
+        config.add_clocker("sys_clk", int(1e6))
+        return config
+
+    def images(self, config, ns=None):
+        modules = json.loads(config.get_json(ns))
+        meminit = [m for m in modules if m.get("module") == "meminit"]
+        self.assertEqual(len(meminit), 1)
+        return meminit[0]["args"]["images"]
+
+    def test_mem_init_file(self):
+        config = self.config()
+        config.add_mem_init("rom", self.files[0])
+        self.assertEqual(self.images(config), [
+            {"mem": "rom", "file": self.files[0], "base": 0, "endianness": "big"}])
+
+    def test_mem_init_regions(self):
+        config = self.config()
+        config.add_mem_init("main_ram", {self.files[0]: "0x00000000", self.files[1]: 0x100}, "little")
+        self.assertEqual(self.images(config), [
+            {"mem": "main_ram", "file": self.files[0], "base": 0x000, "endianness": "little"},
+            {"mem": "main_ram", "file": self.files[1], "base": 0x100, "endianness": "little"}])
+
+    def test_mem_init_json(self):
+        # Files of the JSON are relative to the current directory, as for get_mem_data.
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with open("images.json", "w") as f:
+                json.dump({"image0.bin": "0x00000000", "image1.bin": "0x00000010"}, f)
+            config = self.config()
+            config.add_mem_init("rom", "images.json")
+        finally:
+            os.chdir(cwd)
+        self.assertEqual([(i["file"], i["base"]) for i in self.images(config)],
+            [(os.path.realpath(self.files[0]), 0x00), (os.path.realpath(self.files[1]), 0x10)])
+
+    def test_mem_init_errors(self):
+        config = self.config()
+        with self.assertRaises(OSError):
+            config.add_mem_init("rom", os.path.join(self.tmp.name, "missing.bin"))
+        with self.assertRaises(AssertionError):
+            config.add_mem_init("rom", self.files[0], endianness="middle")
+        self.assertEqual(config.mem_inits, [])
+        # No meminit module without images.
+        self.assertNotIn("meminit", config.get_json())
+
+    def test_mem_init_namespace(self):
+        dut    = MemDUT([32, 32])
+        ns     = convert(dut, ios={dut.o}).ns
+        config = self.config()
+        config.add_mem_init(dut.mems[1], self.files[0])
+        config.add_mem_init("mem0", self.files[1])
+        self.assertEqual([i["mem"] for i in self.images(config, ns)], [ns.get_name(dut.mems[1]), "mem0"])
+        # Memory objects can only be resolved with the namespace.
+        with self.assertRaises(AssertionError):
+            config.get_json()
+
+
+class TestSimMemory(unittest.TestCase):
+    def verilog(self, widths):
+        dut = MemDUT(widths)
+        v   = convert(dut, ios={dut.o}, special_overrides={Memory: SimMemory})
+        return dut, v.ns, str(v)
+
+    def test_override(self):
+        # Only used by the simulations with images to preload (SimVerilatorToolchain.build).
+        self.assertNotIn(Memory, sim_special_overrides)
+
+    def test_emit_verilog(self):
+        dut, ns, v = self.verilog([32])
+        name = ns.get_name(dut.mems[0])
+        self.assertIn("reg [31:0] " + name + "[0:15];", v)
+        self.assertIn("import \"DPI-C\" litex_sim_mem_preload = function int " + name + "_preload(", v)
+        self.assertIn("import \"DPI-C\" litex_sim_mem_read = function int " + name + "_read(", v)
+        self.assertIn("initial begin : " + name + "_preload_block", v)
+        self.assertIn("handle = " + name + "_preload(\"" + name + "\", 32, 16);", v)
+        self.assertIn("reg [31:0] word;", v)
+        self.assertIn("word[31:0] = " + name + "_read(handle, index, 0);", v)
+        self.assertNotIn(", 1);", v)
+        self.assertIn(name + "[index] = word[31:0];", v)
+
+    def test_emit_verilog_wide(self):
+        # Words over 32 bits are read in 32-bit chunks.
+        dut, ns, v = self.verilog([72, 8])
+        wide, narrow = [ns.get_name(mem) for mem in dut.mems]
+        self.assertIn("handle = " + wide + "_preload(\"" + wide + "\", 72, 16);", v)
+        self.assertIn("reg [95:0] word;", v)
+        for chunk in range(3):
+            self.assertIn("word[{}:{}] = {}_read(handle, index, {});".format(
+                32*chunk + 31, 32*chunk, wide, chunk), v)
+        self.assertIn(wide + "[index] = word[71:0];", v)
+        # Each memory has its own DPI functions, block and (uniquified) variables.
+        self.assertRegex(v, r"handle_\d+ = " + narrow + r"_preload\(\"" + narrow + r"\", 8, 16\);")
+        self.assertRegex(v, narrow + r"\[index_\d+\] = word_\d+\[7:0\];")
+        self.assertEqual(v.count("_preload_block"), 2)
+
+
+class TestSimCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save    = os.path.join(self.tmp.name, "save.ckpt")
+        self.restore = os.path.join(self.tmp.name, "restore.ckpt")
+        open(self.restore, "wb").close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def checkpoint(self, **kwargs):
+        config = SimConfig()
+        config.add_clocker("sys_clk", int(1e6))
+        config.add_checkpoint(**kwargs)
+        modules = [m for m in json.loads(config.get_json()) if m.get("module") == "checkpoint"]
+        self.assertEqual(len(modules), 1)
+        return modules[0]
+
+    def test_save(self):
+        module = self.checkpoint(save=self.save, cycles=1e6, exit=True)
+        self.assertEqual(module["args"], {"save": self.save, "exit": True, "cycles": 1000000})
+        self.assertEqual(module["interface"], ["sys_clk"])
+        module = self.checkpoint(save=self.save, pattern="Booting", signal=True)
+        self.assertEqual(module["args"], {"save": self.save, "exit": False, "pattern": "Booting"})
+        self.assertEqual(module["interface"], ["serial", "sim_checkpoint", "sys_clk"])
+
+    def test_restore(self):
+        module = self.checkpoint(restore=self.restore)
+        self.assertEqual(module["args"], {"restore": self.restore})
+        module = self.checkpoint(save=self.save, restore=self.restore, signal=True)
+        self.assertEqual(module["args"], {"save": self.save, "exit": False, "restore": self.restore})
+
+    def test_errors(self):
+        config = SimConfig()
+        with self.assertRaises(ValueError):
+            config.add_checkpoint()
+        with self.assertRaises(ValueError):
+            config.add_checkpoint(save=self.save)
+        with self.assertRaises(ValueError):
+            config.add_checkpoint(restore=self.restore, signal=True)
+        with self.assertRaises(OSError):
+            config.add_checkpoint(restore=os.path.join(self.tmp.name, "missing.ckpt"))
+        self.assertFalse(config.has_module("checkpoint"))
+
+    def test_gateware(self):
+        # Writing the CSR sets the sim_checkpoint pin for one cycle.
+        class DUT(Module):
+            def __init__(self):
+                self.pin = Signal()
+                self.submodules.checkpoint = SimCheckpoint(self.pin)
+                self.submodules.bank = CSRBank(self.checkpoint.get_csrs())
+
+        def generator(dut):
+            for i in range(4):
+                yield
+            yield from dut.bank.bus.write(0, 1)
+            for i in range(4):
+                yield
+
+        @passive
+        def monitor(dut, pins):
+            while True:
+                pins.append((yield dut.pin))
+                yield
+
+        dut  = DUT()
+        pins = []
+        run_simulation(dut, [generator(dut), monitor(dut, pins)])
+        self.assertEqual(sum(pins), 1)
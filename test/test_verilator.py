@@ -0,0 +1,96 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import tempfile
+import tarfile
+import os
+
+from litex.build.sim.verilator import _build_hash, _compile_sim
+
+
+class TestVerilatorBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def generate(self, directory, verilog="module sim(); endmodule", opt_level="O3"):
+        # Generated files as written by SimVerilatorToolchain.build, with a build script standing in
+        # for verilator/make.
+        os.makedirs(directory, exist_ok=True)
+        os.chdir(directory)
+        for filename, content in [("sim.v", verilog), ("sim_header.h", ""), ("sim_init.cpp", "")]:
+            with open(filename, "w") as f:
+                f.write(content)
+        with open("build_sim.sh", "w") as f:
+            f.write("mkdir -p obj_dir modules\n")
+            f.write("echo build >> builds\n")
+            f.write("echo Vsim > obj_dir/Vsim\n")
+            f.write("echo module > modules/clocker.so\n")
+        _build_hash("sim", [("sim.v", "verilog", "work")], [], 1, False, opt_level, False)
+
+    def builds(self):
+        if not os.path.exists("builds"):
+            return 0
+        with open("builds") as f:
+            return len(f.readlines())
+
+    def test_build_cache(self):
+        build_dir = os.path.join(self.tmp.name, "build")
+        cache_dir = os.path.join(self.tmp.name, "cache")
+
+        # Same inputs: built once.
+        self.generate(build_dir)
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        self.assertEqual(self.builds(), 1)
+
+        # Changed Verilog: rebuilt, objects kept.
+        with open(os.path.join("obj_dir", "object.o"), "w") as f:
+            f.write("")
+        self.generate(build_dir, verilog="module sim(input a); endmodule")
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        self.assertEqual(self.builds(), 2)
+        self.assertTrue(os.path.exists(os.path.join("obj_dir", "object.o")))
+
+        # Changed compilation flags: clean rebuild.
+        self.generate(build_dir, verilog="module sim(input a); endmodule", opt_level="O0")
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        self.assertEqual(self.builds(), 3)
+        self.assertFalse(os.path.exists(os.path.join("obj_dir", "object.o")))
+
+        # Other build directory: restored from the shared cache.
+        self.generate(os.path.join(self.tmp.name, "other"))
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        self.assertEqual(self.builds(), 0)
+        with open(os.path.join("obj_dir", "Vsim")) as f:
+            self.assertEqual(f.read(), "Vsim\n")
+        self.assertTrue(os.path.exists(os.path.join("modules", "clocker.so")))
+
+    def test_build_cache_invalid_archive(self):
+        build_dir = os.path.join(self.tmp.name, "build")
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        self.generate(build_dir)
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        archive = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+
+        # Archive with a member outside of the build directory: ignored, simulation rebuilt.
+        evil = os.path.join(self.tmp.name, "evil")
+        with open(evil, "w") as f:
+            f.write("evil\n")
+        with tarfile.open(archive, "w:gz") as tar:
+            tar.add(evil, arcname=os.path.join("..", "evil"))
+            tar.add(evil, arcname=os.path.join("obj_dir", "Vsim"))
+        os.remove(evil)
+        self.generate(os.path.join(self.tmp.name, "other"))
+        _compile_sim("sim", verbose=False, cache_dir=cache_dir)
+        self.assertEqual(self.builds(), 1)
+        self.assertFalse(os.path.exists(evil))
+        with open(os.path.join("obj_dir", "Vsim")) as f:
+            self.assertEqual(f.read(), "Vsim\n")
@@ -0,0 +1,18 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import sys
+import unittest
+import subprocess
+
+
+class TestVerilog(unittest.TestCase):
+    def test_reference_output(self):
+        # The emitter output is byte-identical to the one of the reference emitter. Ran in a fresh
+        # process: the output also depends on the signals created before by the other tests.
+        p = subprocess.run(
+            [sys.executable, "-m", "litex.gen.fhdl.verilog_benchmark", "--cores", "2", "--n", "8", "--check"],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.assertEqual(p.returncode, 0, p.stdout.decode())
@@ -8,7 +8,8 @@ import unittest
 
 from migen import *
 
-from litex.soc.interconnect import wishbone
+from litex.soc.interconnect import wishbone, csr_bus
+from litex.soc.interconnect.csr import CSR
 
 # TestWishbone -------------------------------------------------------------------------------------
 
@@ -56,3 +57,173 @@ class TestWishbone(unittest.TestCase):
 
         dut = DUT()
         run_simulation(dut, generator(dut))
+
+    # Bursts ---------------------------------------------------------------------------------------
+
+    class BurstDUT(Module):
+        def __init__(self, master, slaves):
+            self.master = master
+            self.cycles = Signal(32)
+            self.sync += self.cycles.eq(self.cycles + 1)
+            self.submodules += slaves
+
+    def burst_read(self, dut, adr, length, bte=wishbone.BTE_LINEAR):
+        start = (yield dut.cycles)
+        datas = (yield from dut.master.burst_read(adr, length, bte))
+        return datas, (yield dut.cycles) - start
+
+    def test_sram_burst(self):
+        def generator(dut):
+            yield from dut.master.burst_write(0x0004, list(range(0x100, 0x110)))
+            datas, cycles = (yield from self.burst_read(dut, 0x0004, 16))
+            self.assertEqual(datas, list(range(0x100, 0x110)))
+            self.assertLessEqual(cycles, 16 + 1)
+            self.assertEqual((yield from dut.master.read(0x0003)), 0)
+            self.assertEqual((yield from dut.master.read(0x0005)), 0x101)
+
+        master = wishbone.Interface()
+        dut    = self.BurstDUT(master, wishbone.SRAM(128, bus=master))
+        run_simulation(dut, generator(dut))
+
+    def test_sram_burst_wrap(self):
+        def generator(dut):
+            for i in range(16):
+                yield from dut.master.write(i, i)
+            datas, cycles = (yield from self.burst_read(dut, 0x0006, 8, wishbone.BTE_WRAP_4))
+            self.assertEqual(datas, [6, 7, 4, 5, 6, 7, 4, 5])
+            self.assertLessEqual(cycles, 8 + 1)
+            datas, cycles = (yield from self.burst_read(dut, 0x0005, 8, wishbone.BTE_WRAP_8))
+            self.assertEqual(datas, [5, 6, 7, 0, 1, 2, 3, 4])
+            self.assertLessEqual(cycles, 8 + 1)
+
+        master = wishbone.Interface()
+        dut    = self.BurstDUT(master, wishbone.SRAM(64, bus=master))
+        run_simulation(dut, generator(dut))
+
+    def test_sram_burst_unexpected_address(self):
+        def generator(dut):
+            for i in range(16):
+                yield from dut.master.write(i, 0x100 + i)
+            # Incrementing burst hint with another next address: data must not be the predicted one.
+            yield dut.master.cti.eq(wishbone.CTI_BURST_INCREMENTING)
+            for adr in [3, 9, 10, 2]:
+                self.assertEqual((yield from dut.master.read(adr)), 0x100 + adr)
+
+        master = wishbone.Interface()
+        dut    = self.BurstDUT(master, wishbone.SRAM(64, bus=master))
+        run_simulation(dut, generator(dut))
+
+    def test_downconverter_burst(self):
+        def generator(dut):
+            datas = [0x0123456789abcdef*(i + 1) & (2**64 - 1) for i in range(8)]
+            yield from dut.master.burst_write(0x0002, datas)
+            self.assertEqual((yield from dut.master.read(0x0003)), datas[1])
+            burst_datas, cycles = (yield from self.burst_read(dut, 0x0002, 8))
+            self.assertEqual(burst_datas, datas)
+            self.assertLessEqual(cycles, 2*8 + 1)
+
+        master = wishbone.Interface(data_width=64)
+        slave  = wishbone.Interface(data_width=32)
+        dut    = self.BurstDUT(master, [wishbone.DownConverter(master, slave), wishbone.SRAM(128, bus=slave)])
+        run_simulation(dut, generator(dut))
+
+    def test_upconverter_burst(self):
+        def generator(dut):
+            yield from dut.master.burst_write(0x0003, list(range(0x100, 0x108)))
+            self.assertEqual((yield from dut.master.read(0x0004)), 0x101)
+            datas, cycles = (yield from self.burst_read(dut, 0x0003, 8))
+            self.assertEqual(datas, list(range(0x100, 0x108)))
+            self.assertLessEqual(cycles, 8 + 1)
+
+        master = wishbone.Interface(data_width=16)
+        slave  = wishbone.Interface(data_width=32)
+        dut    = self.BurstDUT(master, [wishbone.UpConverter(master, slave), wishbone.SRAM(64, bus=slave)])
+        run_simulation(dut, generator(dut))
+
+    def test_decoder_burst(self):
+        def generator(dut):
+            yield from dut.master.burst_write(0x000c, list(range(0x100, 0x108)))
+            self.assertEqual((yield from dut.master.read(0x0010)), 0x104)
+            datas, cycles = (yield from self.burst_read(dut, 0x000c, 8))
+            self.assertEqual(datas, list(range(0x100, 0x108)))
+            self.assertLessEqual(cycles, 8 + 2)
+
+        master = wishbone.Interface()
+        slaves = [wishbone.Interface() for i in range(2)]
+        dut    = self.BurstDUT(master, [
+            wishbone.Decoder(master, [
+                (lambda a: a[4:] == 0, slaves[0]),
+                (lambda a: a[4:] == 1, slaves[1])]),
+            wishbone.SRAM(64, bus=slaves[0]),
+            wishbone.SRAM(64, bus=slaves[1])])
+        run_simulation(dut, generator(dut))
+
+    def test_arbiter_burst(self):
+        def generator(dut, n):
+            master = dut.masters[n]
+            yield from master.burst_write(0x0010*n, [0x100*n + i for i in range(16)])
+            datas = (yield from master.burst_read(0x0010*n, 16))
+            self.assertEqual(datas, [0x100*n + i for i in range(16)])
+
+        class DUT(Module):
+            def __init__(self):
+                self.masters = [wishbone.Interface() for i in range(2)]
+                slave        = wishbone.Interface()
+                self.submodules += wishbone.Arbiter(self.masters, slave)
+                self.submodules += wishbone.SRAM(128, bus=slave)
+
+        dut = DUT()
+        run_simulation(dut, [generator(dut, 0), generator(dut, 1)])
+
+    def test_wishbone2csr_burst(self):
+        # CSRs are not read ahead (reads can have side effects): bursts are done with classic reads.
+        def generator(dut):
+            self.assertEqual((yield from dut.master.read(0x0002)), 0x42)
+            datas = (yield from dut.master.burst_read(0x0004, 8))
+            self.assertEqual(datas, list(range(0x44, 0x4c)))
+            # Incrementing burst hint with another next address.
+            yield dut.master.cti.eq(wishbone.CTI_BURST_INCREMENTING)
+            for adr in [3, 9, 10, 2]:
+                self.assertEqual((yield from dut.master.read(adr)), 0x40 + adr)
+
+        for register in [False, True]:
+            master = wishbone.Interface()
+            csr    = csr_bus.Interface()
+            dut    = self.BurstDUT(master, wishbone.Wishbone2CSR(master, csr, register=register))
+            # CSR read latency: 1 cycle.
+            dut.sync += csr.dat_r.eq(0x40 + csr.adr)
+            run_simulation(dut, generator(dut))
+
+    def test_wishbone2csr_read_strobes(self):
+        # Each CSR read by the master gets exactly one read strobe (FIFOs pop, flags clear on it).
+        class DUT(Module):
+            def __init__(self, register):
+                self.master  = wishbone.Interface()
+                self.csrs    = [CSR(8, name="csr{}".format(i)) for i in range(16)]
+                self.strobes = [Signal(8) for i in range(16)]
+                self.submodules.bank   = csr_bus.CSRBank(self.csrs)
+                self.submodules.bridge = wishbone.Wishbone2CSR(self.master, self.bank.bus, register=register)
+                for i, c in enumerate(self.csrs):
+                    self.comb += c.w.eq(0x40 + i)
+                    self.sync += If(c.we, self.strobes[i].eq(self.strobes[i] + 1))
+
+        def generator(dut):
+            # Single read with an incrementing burst hint, then end of cycle.
+            yield dut.master.cti.eq(wishbone.CTI_BURST_INCREMENTING)
+            self.assertEqual((yield from dut.master.read(2)), 0x42)
+            yield dut.master.cti.eq(wishbone.CTI_BURST_NONE)
+            for i in range(4):
+                yield
+            # Burst read.
+            self.assertEqual((yield from dut.master.burst_read(8, 4)), [0x48, 0x49, 0x4a, 0x4b])
+            for i in range(4):
+                yield
+            # (CSR 0 is also strobed when the CSR bus is idle, at address 0).
+            strobes = []
+            for strobe in dut.strobes[1:]:
+                strobes.append((yield strobe))
+            self.assertEqual(strobes, [0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 0, 0, 0, 0])
+
+        for register in [False, True]:
+            dut = DUT(register)
+            run_simulation(dut, generator(dut))